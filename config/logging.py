@@ -1,20 +1,151 @@
+import atexit
 import logging
+import queue
+import random
+import sys
+import threading
+from typing import Any, Optional
+
 import structlog
 
+from config.settings import Settings
+
+# Never sampled, whatever the configured rates
+_UNSAMPLED_LEVELS = frozenset({"warning", "warn", "error", "critical", "exception", "fatal"})
+
+
+class EventSampler:
+    """structlog processor that keeps only a fraction of selected high-volume events.
+
+    ``rates`` maps an event name to the fraction of its info/debug lines to
+    keep (0 drops them all). Kept lines carry ``sample_rate`` so counts can be
+    scaled back up. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        self._rates = rates
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        rate = self._rates.get(event_dict.get("event"))
+        if rate is None or rate >= 1 or method_name in _UNSAMPLED_LEVELS:
+            return event_dict
+        if rate <= 0 or random.random() >= rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
+
+class BackgroundLogWriter:
+    """Renders and writes log events on a daemon thread, off the event loop.
+
+    The calling side only enqueues the event dict. When the queue is full,
+    info/debug events are dropped (and counted); warnings and errors wait for
+    room instead.
+    """
+
+    def __init__(self, queue_size: int, stream=None):
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stream = stream or sys.stdout
+        self._render = structlog.processors.JSONRenderer()
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def put(self, method_name: str, event_dict: dict[str, Any]) -> None:
+        if method_name in _UNSAMPLED_LEVELS:
+            self._queue.put(event_dict)
+            return
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            self._dropped += 1
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            events = [self._queue.get()]
+            # Drain whatever else is queued so a burst costs one write and one flush
+            while len(events) < 1000:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for event_dict in events:
+                try:
+                    lines.append(self._render(None, None, event_dict))
+                except Exception as exc:
+                    lines.append(f'{{"event": "log_render_failed", "error": {str(exc)!r}}}')
+            if self._dropped:
+                dropped, self._dropped = self._dropped, 0
+                lines.append(f'{{"event": "log_events_dropped", "count": {dropped}, "level": "warning"}}')
+            try:
+                self._stream.write("\n".join(lines) + "\n")
+                self._stream.flush()
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+
+class QueueLogger:
+    """structlog logger that hands the (unrendered) event dict to the background writer."""
+
+    def __init__(self, writer: BackgroundLogWriter):
+        self._writer = writer
+
+    def __getattr__(self, method_name: str):
+        def log(event_dict: dict[str, Any]) -> None:
+            self._writer.put(method_name, event_dict)
+
+        return log
+
+
+_writer: Optional[BackgroundLogWriter] = None
+
+
+def _pass_event_dict(logger: Any, method_name: str, event_dict: dict[str, Any]) -> tuple:
+    """Final processor in background mode: give the logger the dict itself, rendering happens on the writer thread."""
+    return (event_dict,), {}
+
+
+def setup_logging(settings: Optional[Settings] = None) -> None:
+    """Configure structlog for JSON-formatted structured logging.
+
+    Without settings (or with the defaults) every call renders and prints
+    synchronously. ``log_sample_rates`` thins out high-volume events and
+    ``log_background_writer`` moves rendering and I/O to a writer thread.
+    """
+    global _writer
+    level = settings.log_level if settings else "INFO"
+    processors: list = []
+    if settings and settings.log_sample_rates:
+        # First, so dropped events cost nothing else
+        processors.append(EventSampler(settings.log_sample_rates))
+    processors += [
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+        structlog.processors.StackInfoRenderer(),
+        structlog.dev.set_exc_info,
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
+
+    if settings and settings.log_background_writer:
+        if _writer is None:
+            _writer = BackgroundLogWriter(settings.log_queue_size)
+        processors.append(_pass_event_dict)
+        logger_factory = lambda *args: QueueLogger(_writer)  # noqa: E731
+    else:
+        processors.append(structlog.processors.JSONRenderer())
+        logger_factory = structlog.PrintLoggerFactory()
 
-def setup_logging(level: str = "INFO") -> None:
-    """Configure structlog for JSON-formatted structured logging."""
     structlog.configure(
-        processors=[
-            structlog.contextvars.merge_contextvars,
-            structlog.processors.add_log_level,
-            structlog.processors.StackInfoRenderer(),
-            structlog.dev.set_exc_info,
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
-        ],
-        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, level, logging.INFO)),
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, level.upper(), logging.INFO)),
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=logger_factory,
         cache_logger_on_first_use=True,
     )
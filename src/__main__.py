@@ -1,39 +1,93 @@
-"""Component dispatcher: selects and runs the appropriate component based on DOCPROC_COMPONENT_NAME."""
+"""Component dispatcher: selects and runs the appropriate component based on DOCPROC_COMPONENT_NAME.
+
+``DOCPROC_COMPONENT_NAME=all`` runs every component, the API gateway and the
+back office in a single process and event loop (use with DOCPROC_TRANSPORT=memory
+to run without RabbitMQ).
+"""
 
 import asyncio
-import importlib
+import contextlib
+import signal
 import sys
 
+import uvicorn
+
 from config.logging import setup_logging
 from config.settings import Settings
+from src.components.registry import COMPONENT_REGISTRY, load_component_class
+
+ALL_COMPONENTS = "all"
+
+# FastAPI apps started in "all" mode: (import path, port), same ports as docker-compose
+EMBEDDED_APPS = [
+    ("src.components.api_gateway.app:app", 8000),
+    ("src.components.backoffice.app:app", 8001),
+]
+
+
+class _EmbeddedServer(uvicorn.Server):
+    """Uvicorn server that leaves signal handling to the dispatcher."""
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
+
+    def install_signal_handlers(self) -> None:
+        pass
 
-COMPONENT_REGISTRY: dict[str, str] = {
-    "workflow_router": "src.components.workflow_router.component.WorkflowRouterComponent",
-    "splitter": "src.components.splitter.component.SplitterComponent",
-    "ocr": "src.components.ocr.component.OCRComponent",
-    "classifier": "src.components.classifier.component.ClassifierComponent",
-    "classification_aggregator": "src.components.classification_aggregator.component.ClassificationAggregatorComponent",
-    "extractor": "src.components.extractor.component.ExtractorComponent",
-    "extraction_aggregator": "src.components.extraction_aggregator.component.ExtractionAggregatorComponent",
-    "consolidator": "src.components.consolidator.component.ConsolidatorComponent",
-    "sla_monitor": "src.components.sla_monitor.component.SLAMonitorComponent",
-}
+
+async def run_all(settings: Settings) -> None:
+    """Run every registered component plus the HTTP apps until SIGTERM/SIGINT.
+
+    Each component gets its own health port: ``health_port + <registry index>``.
+    """
+    components = [
+        load_component_class(name)(
+            settings.model_copy(update={"component_name": name, "health_port": settings.health_port + index})
+        )
+        for index, name in enumerate(COMPONENT_REGISTRY)
+    ]
+    servers = [
+        _EmbeddedServer(uvicorn.Config(app_path, host="0.0.0.0", port=port, log_config=None))
+        for app_path, port in EMBEDDED_APPS
+    ]
+
+    def stop_all() -> None:
+        for component in components:
+            component.stop()
+        for server in servers:
+            server.should_exit = True
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_all)
+
+    await asyncio.gather(
+        *(component.run(handle_signals=False) for component in components),
+        *(server.serve() for server in servers),
+    )
 
 
 def main() -> None:
-    setup_logging()
     settings = Settings()
+    setup_logging(settings)
     component_name = settings.component_name
 
+    if component_name == ALL_COMPONENTS:
+        asyncio.run(run_all(settings))
+        return
+
     if component_name not in COMPONENT_REGISTRY:
-        print(f"Unknown component: '{component_name}'. Available: {list(COMPONENT_REGISTRY.keys())}")
+        print(
+            f"Unknown component: '{component_name}'. Available: {list(COMPONENT_REGISTRY.keys())} or '{ALL_COMPONENTS}'"
+        )
         sys.exit(1)
 
-    import_path = COMPONENT_REGISTRY[component_name]
-    module_path, class_name = import_path.rsplit(".", 1)
-    module = importlib.import_module(module_path)
-    component_class = getattr(module, class_name)
+    if settings.transport == "memory":
+        print(f"DOCPROC_TRANSPORT=memory only works with DOCPROC_COMPONENT_NAME={ALL_COMPONENTS}")
+        sys.exit(1)
 
+    component_class = load_component_class(component_name)
     component = component_class(settings)
     asyncio.run(component.run())
 
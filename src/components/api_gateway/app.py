@@ -5,16 +5,20 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
-import aio_pika
 import structlog
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Response, UploadFile
 
 from config.logging import setup_logging
 from config.settings import Settings
-from src.core.database import create_db_engine, create_session_factory
-from src.core.models import Request
-from src.core.rabbitmq import setup_rabbitmq_topology
-from src.core.schemas import JobStatusResponse, PipelineMessage, ProcessResponse
+from src.core.database import create_db_engine, create_session_factory, engine_stats, register_pool_metrics
+from src.core.metrics import CONTENT_TYPE, REGISTRY
+from src.core.models import Request, StageTiming
+from src.core.outbox import OutboxRelay, stage_outbox
+from src.core.publisher import Publisher
+from src.core.rabbitmq import DEFAULT_PRIORITY, MAX_PRIORITY
+from src.core.schemas import JobStatusResponse, PipelineMessage, ProcessResponse, TimelineResponse
+from src.core.timeline import build_timeline
+from src.core.transport import create_transport
 
 logger = structlog.get_logger()
 settings = Settings()
@@ -23,18 +27,27 @@ settings = Settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup/shutdown lifecycle management."""
-    setup_logging()
+    setup_logging(settings)
 
     # Database
-    engine = create_db_engine(settings)
+    engine = create_db_engine(settings, name="api_gateway")
+    app.state.db_engine = engine
+    register_pool_metrics(engine, "api_gateway")
     app.state.session_factory = create_session_factory(engine)
 
-    # RabbitMQ
-    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
-    channel = await connection.channel()
-    app.state.exchanges = await setup_rabbitmq_topology(channel)
-    app.state.rmq_channel = channel
-    app.state.rmq_connection = connection
+    # Message transport (RabbitMQ, or the in-process broker)
+    app.state.transport = create_transport(settings)
+    await app.state.transport.connect()
+    app.state.publisher = Publisher.from_settings("api_gateway", settings, app.state.transport)
+    app.state.outbox_relay = None
+    if settings.outbox_enabled:
+        app.state.outbox_relay = OutboxRelay(
+            app.state.session_factory,
+            app.state.publisher,
+            batch_size=settings.outbox_batch_size,
+            poll_interval_s=settings.outbox_poll_interval_ms / 1000,
+        )
+        app.state.outbox_relay.start()
 
     # Storage directory
     Path(settings.storage_path).mkdir(parents=True, exist_ok=True)
@@ -43,7 +56,9 @@ async def lifespan(app: FastAPI):
     yield
 
     # Cleanup
-    await connection.close()
+    if app.state.outbox_relay:
+        await app.state.outbox_relay.stop()
+    await app.state.transport.close()
     await engine.dispose()
     logger.info("api_gateway_stopped")
 
@@ -58,6 +73,7 @@ async def process_document(
     channel: str = Form(default="api"),
     workflow: str = Form(default="default"),
     external_id: str | None = Form(default=None),
+    priority: int | None = Form(default=None),
 ):
     """Receive a document for processing.
 
@@ -69,6 +85,8 @@ async def process_document(
         meta = json.loads(metadata)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in metadata field")
+    if priority is not None and not 0 <= priority <= MAX_PRIORITY:
+        raise HTTPException(status_code=400, detail=f"priority must be between 0 and {MAX_PRIORITY}")
 
     request_id = uuid.uuid4()
 
@@ -79,7 +97,22 @@ async def process_document(
     content = await file.read()
     file_path.write_bytes(content)
 
-    # Create DB record
+    message = PipelineMessage(
+        request_id=request_id,
+        workflow_name=workflow,
+        priority=priority,
+        payload={
+            "channel": channel,
+            "file_path": str(file_path),
+            "original_filename": file.filename,
+            "content_type": file.content_type,
+            "metadata": meta,
+        },
+        source_component="api_gateway",
+    )
+
+    # Create DB record (and, with the outbox enabled, the pipeline message in the same transaction)
+    outbox_relay = app.state.outbox_relay
     async with app.state.session_factory() as session:
         async with session.begin():
             request = Request(
@@ -88,6 +121,7 @@ async def process_document(
                 channel=channel,
                 workflow_name=workflow,
                 status="received",
+                priority=priority if priority is not None else DEFAULT_PRIORITY,
                 original_filename=file.filename,
                 file_storage_path=str(file_path),
                 metadata_=meta,
@@ -95,30 +129,14 @@ async def process_document(
                 updated_at=datetime.now(timezone.utc),
             )
             session.add(request)
+            if outbox_relay:
+                await stage_outbox(session, [("doc.direct", "request.new", message)], "api_gateway")
 
     # Publish to pipeline
-    message = PipelineMessage(
-        request_id=request_id,
-        workflow_name=workflow,
-        payload={
-            "channel": channel,
-            "file_path": str(file_path),
-            "original_filename": file.filename,
-            "metadata": meta,
-        },
-        source_component="api_gateway",
-    )
-
-    exchange = app.state.exchanges["doc.direct"]
-    await exchange.publish(
-        aio_pika.Message(
-            body=message.model_dump_json().encode(),
-            content_type="application/json",
-            message_id=str(uuid.uuid4()),
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-        ),
-        routing_key="request.new",
-    )
+    if outbox_relay:
+        outbox_relay.notify()
+    else:
+        await app.state.publisher.publish("doc.direct", "request.new", message)
 
     logger.info("request_created", request_id=str(request_id), workflow=workflow, channel=channel)
     return ProcessResponse(request_id=request_id, status="received")
@@ -150,6 +168,33 @@ async def get_status(request_id: uuid.UUID):
     )
 
 
+@app.get("/timeline/{request_id}", response_model=TimelineResponse)
+async def get_timeline(request_id: uuid.UUID):
+    """Per-stage timings of a request: queue wait vs service time, and its critical path."""
+    from sqlalchemy import select
+
+    async with app.state.session_factory() as session:
+        result = await session.execute(select(Request).where(Request.id == request_id))
+        request = result.scalar_one_or_none()
+        if not request:
+            raise HTTPException(status_code=404, detail="Request not found")
+        timings = await session.execute(select(StageTiming).where(StageTiming.request_id == request_id))
+
+    return build_timeline(request.id, request.created_at, request.completed_at, list(timings.scalars()))
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/stats/db")
+async def db_stats():
+    """Connection pool occupancy, checkout wait and query latency."""
+    return engine_stats(app.state.db_engine)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this process."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
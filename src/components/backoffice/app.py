@@ -5,9 +5,8 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
-import aio_pika
 import structlog
-from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi import FastAPI, Form, HTTPException, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -15,10 +14,14 @@ from sqlalchemy import select
 
 from config.logging import setup_logging
 from config.settings import Settings
-from src.core.database import create_db_engine, create_session_factory
+from src.core.claim_check import ClaimCheckStore
+from src.core.database import create_db_engine, create_session_factory, engine_stats, register_pool_metrics
+from src.core.metrics import CONTENT_TYPE, REGISTRY
 from src.core.models import BackofficeTask, Operator, Page, Document
-from src.core.rabbitmq import setup_rabbitmq_topology
+from src.core.outbox import OutboxRelay, stage_outbox
+from src.core.publisher import Publisher
 from src.core.schemas import PipelineMessage
+from src.core.transport import create_transport
 from src.core.workflow_loader import WorkflowLoader
 
 logger = structlog.get_logger()
@@ -30,22 +33,36 @@ STATIC_DIR = Path(__file__).parent / "static"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    setup_logging()
+    setup_logging(settings)
 
-    engine = create_db_engine(settings)
+    engine = create_db_engine(settings, name="backoffice")
+    app.state.db_engine = engine
+    register_pool_metrics(engine, "backoffice")
     app.state.session_factory = create_session_factory(engine)
 
-    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
-    channel = await connection.channel()
-    app.state.exchanges = await setup_rabbitmq_topology(channel)
-    app.state.rmq_channel = channel
-    app.state.rmq_connection = connection
-    app.state.workflow_loader = WorkflowLoader(settings.workflows_dir)
+    app.state.transport = create_transport(settings)
+    await app.state.transport.connect()
+    app.state.publisher = Publisher.from_settings("backoffice", settings, app.state.transport)
+    app.state.outbox_relay = None
+    if settings.outbox_enabled:
+        app.state.outbox_relay = OutboxRelay(
+            app.state.session_factory,
+            app.state.publisher,
+            batch_size=settings.outbox_batch_size,
+            poll_interval_s=settings.outbox_poll_interval_ms / 1000,
+        )
+        app.state.outbox_relay.start()
+    app.state.workflow_loader = WorkflowLoader(
+        settings.workflows_dir, settings.workflow_reload_interval_s, settings.storage_path
+    )
+    app.state.claim_checks = ClaimCheckStore(settings.storage_path, settings.claim_check_threshold_bytes)
 
     logger.info("backoffice_started")
     yield
 
-    await connection.close()
+    if app.state.outbox_relay:
+        await app.state.outbox_relay.stop()
+    await app.state.transport.close()
     await engine.dispose()
 
 
@@ -84,10 +101,14 @@ async def task_detail(request: Request, task_id: uuid.UUID, operator: str = "def
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    # Older tasks may still hold a claim-check reference instead of the OCR texts
+    ocr_texts = await app.state.claim_checks.resolve(task.input_data.get("ocr_texts", {}))
+
     return templates.TemplateResponse("task.html", {
         "request": request,
         "task": task,
         "operator": operator,
+        "ocr_texts": ocr_texts,
     })
 
 
@@ -136,14 +157,12 @@ async def submit_task(
             task.status = "completed"
             task.completed_at = datetime.now(timezone.utc)
 
-            # Resolve next stage from workflow for re-injection
+            # Workflow context for re-injection (the next stage is resolved on the corrected message)
             workflow_loader: WorkflowLoader = app.state.workflow_loader
             workflow_name = task.workflow_name or "default"
+            workflow_version = (task.input_data or {}).get("workflow_version")
+            priority = (task.input_data or {}).get("priority")
             source_stage = task.source_stage
-            next_stage = None
-
-            if source_stage:
-                next_stage = workflow_loader.get_next_stage(workflow_name, source_stage)
 
             if task.task_type == "classification":
                 # Update the page with the operator's classification
@@ -159,15 +178,12 @@ async def submit_task(
                 page.status = "classified"
                 page.updated_at = datetime.now(timezone.utc)
 
-                # Resolve routing key from workflow (fallback for legacy tasks)
-                routing_key = next_stage.routing_key if next_stage else "page.classified"
-                stage_name = next_stage.name if next_stage else None
-
                 # Publish back to pipeline
                 message = PipelineMessage(
                     request_id=task.request_id,
                     workflow_name=workflow_name,
-                    current_stage=stage_name,
+                    workflow_version=workflow_version,
+                    priority=priority,
                     page_index=page.page_index,
                     source_component="backoffice",
                     payload={
@@ -178,15 +194,7 @@ async def submit_task(
                         "origin": "backoffice",
                     },
                 )
-                exchange = app.state.exchanges["doc.direct"]
-                await exchange.publish(
-                    aio_pika.Message(
-                        body=message.model_dump_json().encode(),
-                        content_type="application/json",
-                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                    ),
-                    routing_key=routing_key,
-                )
+                await _reinject(session, workflow_loader, source_stage, message, fallback_routing_key="page.classified")
 
             elif task.task_type == "extraction":
                 # Update document with operator's extraction
@@ -202,16 +210,14 @@ async def submit_task(
                 doc.status = "extracted"
                 doc.updated_at = datetime.now(timezone.utc)
 
-                # Resolve routing key from workflow (fallback for legacy tasks)
-                routing_key = next_stage.routing_key if next_stage else "doc.extracted"
-                stage_name = next_stage.name if next_stage else None
-
                 # Publish back to pipeline
                 message = PipelineMessage(
                     request_id=task.request_id,
                     workflow_name=workflow_name,
-                    current_stage=stage_name,
+                    workflow_version=workflow_version,
+                    priority=priority,
                     document_id=doc.id,
+                    document_index=task.input_data.get("document_index"),
                     source_component="backoffice",
                     payload={
                         "document_id": str(doc.id),
@@ -221,25 +227,63 @@ async def submit_task(
                         "origin": "backoffice",
                     },
                 )
-                exchange = app.state.exchanges["doc.direct"]
-                await exchange.publish(
-                    aio_pika.Message(
-                        body=message.model_dump_json().encode(),
-                        content_type="application/json",
-                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                    ),
-                    routing_key=routing_key,
-                )
+                await _reinject(session, workflow_loader, source_stage, message, fallback_routing_key="doc.extracted")
+
+    if app.state.outbox_relay:
+        app.state.outbox_relay.notify()
 
     logger.info("task_submitted", task_id=str(task_id), task_type=task.task_type, operator=operator)
     return RedirectResponse(url=f"/?operator={operator}", status_code=303)
 
 
+async def _reinject(
+    session,
+    workflow_loader: WorkflowLoader,
+    source_stage: str | None,
+    message: PipelineMessage,
+    fallback_routing_key: str,
+) -> None:
+    """Send the corrected message to the stage after ``source_stage`` that applies to it.
+
+    Stages whose ``when`` conditions the corrected message does not meet are
+    skipped, as in :func:`src.core.routing.resolve_routing`. Legacy tasks
+    without a source stage use the fallback routing key. The message is staged
+    in the outbox (relayed after commit), or published right away.
+    """
+    if source_stage:
+        workflow = workflow_loader.compiled(message.workflow_name, message.workflow_version)
+        next_stage = workflow.next_applicable_stage(source_stage, message)
+        if next_stage is None:
+            logger.info("reinjection_terminal", request_id=str(message.request_id), source_stage=source_stage)
+            return
+        routing_key = next_stage.routing_key
+        message = message.model_copy(update={"current_stage": next_stage.name})
+    else:
+        routing_key = fallback_routing_key
+
+    if app.state.outbox_relay:
+        await stage_outbox(session, [("doc.direct", routing_key, message)], "backoffice")
+    else:
+        await app.state.publisher.publish("doc.direct", routing_key, message)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/stats/db")
+async def db_stats():
+    """Connection pool occupancy, checkout wait and query latency."""
+    return engine_stats(app.state.db_engine)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this process."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 # --- API Endpoints for programmatic access ---
 
 @app.get("/api/tasks")
@@ -1,12 +1,15 @@
-"""Classification Aggregator: fan-in for classified pages, groups into logical documents."""
+"""Classification Aggregator: fan-in for classified pages, groups them into logical documents as they close."""
 
 import uuid
 from datetime import datetime, timezone
+from typing import Sequence
 
-from sqlalchemy import select, text
+from sqlalchemy import Row, insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.aggregation import FanInProgress, group_by_request, mark_received
 from src.core.base_component import BaseComponent
+from src.core.metrics import FANIN_COMPLETED, FANIN_DUPLICATES, FANIN_PARTS
 from src.core.models import AggregationState, Document, Page, Request
 from src.core.schemas import PipelineMessage
 
@@ -20,119 +23,212 @@ class ClassificationAggregatorComponent(BaseComponent):
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
+        return await self._aggregate([message], session)
+
+    async def process_batch(
+        self,
+        messages: list[PipelineMessage],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        # One aggregation UPDATE per request instead of one per page
+        outgoing: list[tuple[str, PipelineMessage]] = []
+        for group in group_by_request(messages).values():
+            outgoing.extend(await self._aggregate(group, session))
+        return outgoing
+
+    async def _aggregate(
+        self,
+        messages: list[PipelineMessage],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Record classified pages of one request and emit the documents they close."""
+        message = messages[-1]
         request_id = message.request_id
 
-        # Atomically increment received_count and check completion
-        result = await session.execute(
-            text("""
-                UPDATE aggregation_state
-                SET received_count = received_count + 1,
-                    updated_at = NOW()
-                WHERE request_id = :request_id AND stage = 'classification'
-                RETURNING received_count, expected_count
-            """),
-            {"request_id": str(request_id)},
+        # Atomically set the pages' bits and check completion; redelivered pages change nothing.
+        # While a TIFF is being split the total is unknown; the splitter sets it before the last page.
+        progress = await mark_received(
+            session,
+            request_id,
+            "classification",
+            [m.page_index for m in messages],
+            expected_count=next((m.page_count for m in messages if m.page_count is not None), None),
         )
-        row = result.fetchone()
-        if not row:
+        if progress is None:
             self.logger.error("aggregation_state_not_found", request_id=str(request_id))
             return []
 
-        received, expected = row[0], row[1]
+        FANIN_PARTS.labels(self.component_name).inc(progress.new_parts)
+        if progress.new_parts < len(messages):
+            FANIN_DUPLICATES.labels(self.component_name).inc(len(messages) - progress.new_parts)
         self.logger.info(
             "classification_progress",
             request_id=str(request_id),
-            received=received,
-            expected=expected,
+            received=progress.received,
+            expected=progress.expected,
+            contiguous=progress.contiguous,
         )
 
-        if received < expected:
-            return []  # Still waiting for more pages
+        if progress.already_complete:
+            return []  # Duplicate after every document was emitted
+        if progress.completed:
+            FANIN_COMPLETED.labels(self.component_name).inc()
+        return await self._emit_closed_documents(message, progress, session)
 
-        # All pages classified! Mark aggregation complete
-        await session.execute(
-            text("""
-                UPDATE aggregation_state
-                SET is_complete = true, updated_at = NOW()
-                WHERE request_id = :request_id AND stage = 'classification'
-            """),
-            {"request_id": str(request_id)},
+    async def _emit_closed_documents(
+        self,
+        message: PipelineMessage,
+        progress: FanInProgress,
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Create and fan out the documents of the classified prefix that can no longer grow.
+
+        Documents only merge consecutive pages of the same type, so once pages
+        0..k are classified every document in them is final except the last,
+        which may continue on page k+1. When the whole request is classified the
+        last one is closed too. The classification state row is locked by
+        ``mark_received`` for the rest of the transaction, so concurrent
+        deliveries of the same request emit each document exactly once.
+        """
+        request_id = message.request_id
+        state_result = await session.execute(
+            select(AggregationState.grouped_until, AggregationState.documents_emitted).where(
+                AggregationState.request_id == request_id,
+                AggregationState.stage == "classification",
+            )
         )
+        state = state_result.one()
+        prefix_end = progress.expected if progress.completed else progress.contiguous
+        if prefix_end <= state.grouped_until:
+            return []  # No page joined the classified prefix
 
-        # Load all pages and group them into logical documents by doc_type
+        # Load only the columns grouping needs (plain rows, no ORM objects to track)
         pages_result = await session.execute(
-            select(Page)
-            .where(Page.request_id == request_id)
+            select(Page.page_index, Page.doc_type, Page.ocr_text)
+            .where(
+                Page.request_id == request_id,
+                Page.page_index >= state.grouped_until,
+                Page.page_index < prefix_end,
+            )
             .order_by(Page.page_index)
         )
-        pages = list(pages_result.scalars().all())
+        pages = pages_result.all()
+        ocr_text_by_index = {page.page_index: page.ocr_text for page in pages}
 
         # Group consecutive pages of the same type into documents
         documents = self._group_pages_into_documents(pages)
+        if not progress.completed:
+            documents = documents[:-1]  # Still open: the next page may have the same type
+        if not documents:
+            return []
+
+        first_index = state.documents_emitted
+        documents_emitted = first_index + len(documents)
+        doc_count = documents_emitted if progress.completed else None
 
-        # Create document records and aggregation state for extraction
-        doc_count = len(documents)
         request_result = await session.execute(select(Request).where(Request.id == request_id))
         request = request_result.scalar_one()
-        request.document_count = doc_count
         request.status = "extracting"
         request.updated_at = datetime.now(timezone.utc)
+        if first_index == 0:
+            # Open the extraction fan-in with the first documents; its total comes with the last ones
+            session.add(AggregationState(request_id=request_id, stage="extraction", expected_count=doc_count))
+        elif doc_count is not None:
+            # The last emission always carries at least one document, so extraction cannot have completed yet
+            await session.execute(
+                text("""
+                    UPDATE aggregation_state
+                    SET expected_count = :doc_count, updated_at = NOW()
+                    WHERE request_id = :request_id AND stage = 'extraction'
+                """),
+                {"request_id": str(request_id), "doc_count": doc_count},
+            )
+        if doc_count is not None:
+            request.document_count = doc_count
 
-        # Create extraction aggregation state
-        ext_agg = AggregationState(
-            request_id=request_id,
-            stage="extraction",
-            expected_count=doc_count,
+        await session.execute(
+            text("""
+                UPDATE aggregation_state
+                SET grouped_until = :grouped_until, documents_emitted = :documents_emitted, updated_at = NOW()
+                WHERE request_id = :request_id AND stage = 'classification'
+            """),
+            {
+                "request_id": str(request_id),
+                "grouped_until": documents[-1][1][-1] + 1,
+                "documents_emitted": documents_emitted,
+            },
         )
-        session.add(ext_agg)
 
-        # Create document records and fan-out messages
-        outgoing: list[tuple[str, PipelineMessage]] = []
-        for doc_type, page_indices in documents:
-            doc = Document(
-                id=uuid.uuid4(),
-                request_id=request_id,
-                doc_type=doc_type,
-                page_indices=page_indices,
-                status="created",
-            )
-            session.add(doc)
+        # Create all document records in one multi-row insert
+        document_ids = [uuid.uuid4() for _ in documents]
+        await session.execute(
+            insert(Document),
+            [
+                {
+                    "id": document_id,
+                    "request_id": request_id,
+                    "doc_type": doc_type,
+                    "page_indices": page_indices,
+                    "status": "created",
+                }
+                for document_id, (doc_type, page_indices) in zip(document_ids, documents)
+            ],
+        )
 
-            # Link pages to this document
-            for pi in page_indices:
-                page = next(p for p in pages if p.page_index == pi)
-                page.document_id = doc.id
-                page.status = "grouped"
-                page.updated_at = datetime.now(timezone.utc)
+        # Link every page to its document with one set-based UPDATE
+        linked_indices: list[int] = []
+        linked_documents: list[uuid.UUID] = []
+        for document_id, (_, page_indices) in zip(document_ids, documents):
+            linked_indices.extend(page_indices)
+            linked_documents.extend([document_id] * len(page_indices))
+        await session.execute(
+            text("""
+                UPDATE pages
+                SET document_id = link.document_id, status = 'grouped', updated_at = NOW()
+                FROM unnest(CAST(:page_indices AS integer[]), CAST(:document_ids AS uuid[]))
+                     AS link(page_index, document_id)
+                WHERE pages.request_id = :request_id AND pages.page_index = link.page_index
+            """),
+            {"request_id": str(request_id), "page_indices": linked_indices, "document_ids": linked_documents},
+        )
 
-            # Fan-out: one message per document for extraction
+        # Fan-out: one message per document for extraction. document_count is only
+        # known (and set) on the documents of the last emission.
+        outgoing: list[tuple[str, PipelineMessage]] = []
+        for offset, (document_id, (doc_type, page_indices)) in enumerate(zip(document_ids, documents)):
             doc_message = message.model_copy(
                 update={
-                    "document_id": doc.id,
+                    "document_id": document_id,
                     "document_count": doc_count,
+                    "document_index": first_index + offset,
                     "source_component": self.component_name,
                     "payload": {
                         "doc_type": doc_type,
                         "page_indices": page_indices,
-                        "document_id": str(doc.id),
-                        "ocr_texts": {
-                            pi: next(p.ocr_text for p in pages if p.page_index == pi)
-                            for pi in page_indices
-                        },
+                        "document_id": str(document_id),
+                        "ocr_texts": {pi: ocr_text_by_index[pi] for pi in page_indices},
                     },
                 }
             )
             outgoing.append(("__next__", doc_message))
 
         self.logger.info(
-            "classification_aggregation_complete",
+            "documents_emitted",
             request_id=str(request_id),
-            documents_created=doc_count,
+            documents_created=len(documents),
+            documents_emitted=documents_emitted,
+            complete=progress.completed,
         )
+        if progress.completed:
+            self.logger.info(
+                "classification_aggregation_complete",
+                request_id=str(request_id),
+                documents_created=documents_emitted,
+            )
         return outgoing
 
-    def _group_pages_into_documents(self, pages: list[Page]) -> list[tuple[str, list[int]]]:
-        """Group consecutive pages of the same doc_type into logical documents.
+    def _group_pages_into_documents(self, pages: Sequence[Row]) -> list[tuple[str, list[int]]]:
+        """Group consecutive pages (rows with page_index and doc_type, in order) of the same doc_type into documents.
 
         Returns list of (doc_type, [page_indices]).
         """
@@ -11,25 +11,54 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.base_component import BaseComponent
 from src.core.models import BackofficeTask, Page
+from src.core.result_cache import normalize_text
 from src.core.schemas import PipelineMessage
 
 DOC_TYPES = ["invoice", "id_card", "payslip", "receipt", "contract"]
 
+# Bump when the classifier model or its settings change: cached results of other versions are not reused
+CLASSIFIER_ENGINE_VERSION = "stub-1"
+
+
+def classify_text(ocr_text: str) -> tuple[str, float]:
+    """Classify a page from its OCR text. Runs in the process pool, so it must stay a pure, picklable function.
+
+    Returns (doc_type, confidence).
+    """
+    # --- STUB: Classify based on keywords in OCR text, with random confidence ---
+    return _stub_classify(ocr_text), round(random.uniform(0.60, 0.99), 2)
+
+
+def _stub_classify(ocr_text: str) -> str:
+    """Simple keyword-based classification stub."""
+    text_lower = ocr_text.lower()
+    if "factura" in text_lower or "invoice" in text_lower:
+        return "invoice"
+    if "nómina" in text_lower or "salario" in text_lower:
+        return "payslip"
+    if "documento nacional" in text_lower or "dni" in text_lower:
+        return "id_card"
+    if "recibo" in text_lower:
+        return "receipt"
+    if "contrato" in text_lower:
+        return "contract"
+    return random.choice(DOC_TYPES)
+
 
 class ClassifierComponent(BaseComponent):
 
     component_name = "classifier"
+    uses_process_pool = True
+    engine_version = CLASSIFIER_ENGINE_VERSION
 
     async def process_message(
         self,
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
-        ocr_text = message.payload.get("ocr_text", "")
+        ocr_text = await self.payload_value(message, "ocr_text", "")
 
-        # --- STUB: Classify based on keywords in OCR text, with random confidence ---
-        doc_type = self._stub_classify(ocr_text)
-        confidence = round(random.uniform(0.60, 0.99), 2)
+        doc_type, confidence = await self._classify(ocr_text, session)
 
         # Update page in DB
         result = await session.execute(
@@ -80,6 +109,8 @@ class ClassifierComponent(BaseComponent):
                 source_stage=message.current_stage,
                 workflow_name=message.workflow_name,
                 input_data={
+                    "workflow_version": message.workflow_version,
+                    "priority": message.priority,
                     "page_index": message.page_index,
                     "ocr_text": ocr_text,
                     "suggested_type": doc_type,
@@ -109,17 +140,14 @@ class ClassifierComponent(BaseComponent):
             )
             return [("__backoffice__", bo_message)]
 
-    def _stub_classify(self, ocr_text: str) -> str:
-        """Simple keyword-based classification stub."""
-        text_lower = ocr_text.lower()
-        if "factura" in text_lower or "invoice" in text_lower:
-            return "invoice"
-        if "nómina" in text_lower or "salario" in text_lower:
-            return "payslip"
-        if "documento nacional" in text_lower or "dni" in text_lower:
-            return "id_card"
-        if "recibo" in text_lower:
-            return "receipt"
-        if "contrato" in text_lower:
-            return "contract"
-        return random.choice(DOC_TYPES)
+    async def _classify(self, ocr_text: str, session: AsyncSession) -> tuple[str, float]:
+        """Classify a page, or reuse the result for the same (normalized) text from the result cache."""
+        if self.result_cache is None:
+            return await self.run_cpu_bound(classify_text, ocr_text)
+        key = self.result_cache.key(normalize_text(ocr_text))
+        cached = await self.result_cache.get(session, key)
+        if cached is not None:
+            return cached["doc_type"], cached["confidence"]
+        doc_type, confidence = await self.run_cpu_bound(classify_text, ocr_text)
+        await self.result_cache.put(session, key, {"doc_type": doc_type, "confidence": confidence})
+        return doc_type, confidence
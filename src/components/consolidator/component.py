@@ -42,6 +42,10 @@ class ConsolidatorComponent(BaseComponent):
         }
 
         for doc in documents:
+            if doc.status == "created":
+                # Every document passed the extraction fan-in, so this one was never extracted:
+                # a `when` condition skipped its extract stage (e.g. a doc type without a schema)
+                doc.status = "skipped"
             result_payload["documents"].append({
                 "document_id": str(doc.id),
                 "doc_type": doc.doc_type,
@@ -50,7 +54,8 @@ class ConsolidatorComponent(BaseComponent):
                 "extraction_confidence": doc.extraction_confidence,
                 "status": doc.status,
             })
-            doc.status = "completed"
+            if doc.status != "skipped":
+                doc.status = "completed"
             doc.updated_at = datetime.now(timezone.utc)
 
         # Update request as completed
@@ -1,9 +1,10 @@
 """Extraction Aggregator: fan-in for extracted documents, triggers consolidation."""
 
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.aggregation import group_by_request, mark_received
 from src.core.base_component import BaseComponent
+from src.core.metrics import FANIN_COMPLETED, FANIN_DUPLICATES, FANIN_PARTS
 from src.core.schemas import PipelineMessage
 
 
@@ -16,45 +17,57 @@ class ExtractionAggregatorComponent(BaseComponent):
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
+        return await self._aggregate([message], session)
+
+    async def process_batch(
+        self,
+        messages: list[PipelineMessage],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        # One aggregation UPDATE per request instead of one per document
+        outgoing: list[tuple[str, PipelineMessage]] = []
+        for group in group_by_request(messages).values():
+            outgoing.extend(await self._aggregate(group, session))
+        return outgoing
+
+    async def _aggregate(
+        self,
+        messages: list[PipelineMessage],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Count extracted documents of one request and trigger consolidation once all arrived."""
+        message = messages[-1]
         request_id = message.request_id
 
-        # Atomically increment received_count
-        result = await session.execute(
-            text("""
-                UPDATE aggregation_state
-                SET received_count = received_count + 1,
-                    updated_at = NOW()
-                WHERE request_id = :request_id AND stage = 'extraction'
-                RETURNING received_count, expected_count
-            """),
-            {"request_id": str(request_id)},
+        # Atomically set the documents' bits; redelivered documents change nothing. Documents
+        # are emitted as they close, so the total may only be on the last ones (the
+        # Classification Aggregator also stores it in the state row).
+        progress = await mark_received(
+            session,
+            request_id,
+            "extraction",
+            [m.document_index for m in messages],
+            expected_count=next((m.document_count for m in messages if m.document_count is not None), None),
         )
-        row = result.fetchone()
-        if not row:
+        if progress is None:
             self.logger.error("aggregation_state_not_found", request_id=str(request_id), stage="extraction")
             return []
 
-        received, expected = row[0], row[1]
+        FANIN_PARTS.labels(self.component_name).inc(progress.new_parts)
+        if progress.new_parts < len(messages):
+            FANIN_DUPLICATES.labels(self.component_name).inc(len(messages) - progress.new_parts)
         self.logger.info(
             "extraction_progress",
             request_id=str(request_id),
-            received=received,
-            expected=expected,
+            received=progress.received,
+            expected=progress.expected,
         )
 
-        if received < expected:
+        if not progress.completed:
             return []
+        FANIN_COMPLETED.labels(self.component_name).inc()
 
-        # All documents extracted! Mark complete and send to consolidation
-        await session.execute(
-            text("""
-                UPDATE aggregation_state
-                SET is_complete = true, updated_at = NOW()
-                WHERE request_id = :request_id AND stage = 'extraction'
-            """),
-            {"request_id": str(request_id)},
-        )
-
+        # All documents extracted (mark_received already set is_complete): send to consolidation
         self.logger.info("extraction_aggregation_complete", request_id=str(request_id))
 
         out_message = message.model_copy(
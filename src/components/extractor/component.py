@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.base_component import BaseComponent
 from src.core.models import BackofficeTask, Document
+from src.core.result_cache import normalize_text
 from src.core.schemas import PipelineMessage
 
 # Stub extraction results per doc type
@@ -47,9 +48,24 @@ STUB_EXTRACTIONS = {
 }
 
 
+# Bump when the extraction engine, its schemas or settings change: cached results of other versions are not reused
+EXTRACTOR_ENGINE_VERSION = "stub-1"
+
+
+def extract_fields(doc_type: str, ocr_texts: list[str]) -> tuple[dict, float]:
+    """Extract the fields of a document from its pages' OCR texts, in page order.
+
+    Returns (extracted_data, confidence).
+    """
+    # --- STUB: Return mock extracted data ---
+    extracted_data = STUB_EXTRACTIONS.get(doc_type, {"raw_text": "Unrecognized document"})
+    return extracted_data, round(random.uniform(0.65, 0.99), 2)
+
+
 class ExtractorComponent(BaseComponent):
 
     component_name = "extractor"
+    engine_version = EXTRACTOR_ENGINE_VERSION
 
     async def process_message(
         self,
@@ -59,9 +75,9 @@ class ExtractorComponent(BaseComponent):
         doc_type = message.payload.get("doc_type", "unknown")
         document_id = message.document_id
 
-        # --- STUB: Return mock extracted data ---
-        extracted_data = STUB_EXTRACTIONS.get(doc_type, {"raw_text": "Unrecognized document"})
-        confidence = round(random.uniform(0.65, 0.99), 2)
+        ocr_texts = await self.payload_value(message, "ocr_texts", {})
+        page_texts = [ocr_texts[key] or "" for key in sorted(ocr_texts, key=int)]
+        extracted_data, confidence = await self._extract(doc_type, page_texts, session)
 
         # Update document in DB
         result = await session.execute(select(Document).where(Document.id == document_id))
@@ -105,11 +121,15 @@ class ExtractorComponent(BaseComponent):
                 source_stage=message.current_stage,
                 workflow_name=message.workflow_name,
                 input_data={
+                    "workflow_version": message.workflow_version,
+                    "priority": message.priority,
                     "document_id": str(doc.id),
+                    "document_index": message.document_index,
                     "doc_type": doc_type,
                     "extracted_data": extracted_data,
                     "confidence": confidence,
-                    "ocr_texts": message.payload.get("ocr_texts", {}),
+                    # Resolved: the task must outlive the claim-check blob, which is purged after a retention
+                    "ocr_texts": ocr_texts,
                 },
             )
             session.add(task)
@@ -134,3 +154,15 @@ class ExtractorComponent(BaseComponent):
                 }
             )
             return [("__backoffice__", bo_message)]
+
+    async def _extract(self, doc_type: str, page_texts: list[str], session: AsyncSession) -> tuple[dict, float]:
+        """Extract a document, or reuse the result for the same type and (normalized) page texts."""
+        if self.result_cache is None:
+            return extract_fields(doc_type, page_texts)
+        key = self.result_cache.key(doc_type, *(normalize_text(page_text) for page_text in page_texts))
+        cached = await self.result_cache.get(session, key)
+        if cached is not None:
+            return cached["extracted_data"], cached["confidence"]
+        extracted_data, confidence = extract_fields(doc_type, page_texts)
+        await self.result_cache.put(session, key, {"extracted_data": extracted_data, "confidence": confidence})
+        return extracted_data, confidence
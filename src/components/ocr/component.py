@@ -10,6 +10,9 @@ from src.core.base_component import BaseComponent
 from src.core.models import Page
 from src.core.schemas import PipelineMessage
 
+# Bump when the OCR engine or its settings change: cached results of other versions are not reused
+OCR_ENGINE_VERSION = "stub-1"
+
 # Stub OCR text samples
 STUB_TEXTS = [
     "FACTURA\nNúmero: F-2024-00142\nFecha: 15/01/2024\nEmisor: Empresa ABC S.L.\nCIF: B12345678\nImporte total: 1.250,00 EUR",
@@ -20,18 +23,29 @@ STUB_TEXTS = [
 ]
 
 
+def recognize_page(file_path: str, page_index: int) -> tuple[str, float]:
+    """OCR one page. Runs in the process pool, so it must stay a pure, picklable function.
+
+    Returns (text, confidence).
+    """
+    # --- STUB: Return mock OCR text ---
+    return random.choice(STUB_TEXTS), round(random.uniform(0.85, 0.99), 2)
+
+
 class OCRComponent(BaseComponent):
 
     component_name = "ocr"
+    uses_process_pool = True
+    engine_version = OCR_ENGINE_VERSION
 
     async def process_message(
         self,
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
-        # --- STUB: Return mock OCR text ---
-        ocr_text = random.choice(STUB_TEXTS)
-        ocr_confidence = round(random.uniform(0.85, 0.99), 2)
+        ocr_text, ocr_confidence = await self._recognize(
+            message.payload.get("file_path", ""), message.page_index, session,
+        )
 
         # Update page in DB
         result = await session.execute(
@@ -65,3 +79,15 @@ class OCRComponent(BaseComponent):
             }
         )
         return [("__next__", out_message)]
+
+    async def _recognize(self, file_path: str, page_index: int, session: AsyncSession) -> tuple[str, float]:
+        """OCR a page, or reuse the result of an identical page image (same bytes) from the result cache."""
+        if self.result_cache is None:
+            return await self.run_cpu_bound(recognize_page, file_path, page_index)
+        key = await self.result_cache.file_key(file_path)
+        cached = await self.result_cache.get(session, key)
+        if cached is not None:
+            return cached["text"], cached["confidence"]
+        ocr_text, ocr_confidence = await self.run_cpu_bound(recognize_page, file_path, page_index)
+        await self.result_cache.put(session, key, {"text": ocr_text, "confidence": ocr_confidence})
+        return ocr_text, ocr_confidence
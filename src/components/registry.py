@@ -0,0 +1,24 @@
+"""Registry of runnable components, keyed by DOCPROC_COMPONENT_NAME."""
+
+import importlib
+
+COMPONENT_REGISTRY: dict[str, str] = {
+    "workflow_router": "src.components.workflow_router.component.WorkflowRouterComponent",
+    "splitter": "src.components.splitter.component.SplitterComponent",
+    "ocr": "src.components.ocr.component.OCRComponent",
+    "classifier": "src.components.classifier.component.ClassifierComponent",
+    "classification_aggregator": "src.components.classification_aggregator.component.ClassificationAggregatorComponent",
+    "extractor": "src.components.extractor.component.ExtractorComponent",
+    "extraction_aggregator": "src.components.extraction_aggregator.component.ExtractionAggregatorComponent",
+    "consolidator": "src.components.consolidator.component.ConsolidatorComponent",
+    "sla_monitor": "src.components.sla_monitor.component.SLAMonitorComponent",
+}
+
+
+def load_component_class(component_name: str) -> type:
+    """Import and return the class registered for ``component_name``."""
+    if component_name not in COMPONENT_REGISTRY:
+        raise ValueError(f"Unknown component: '{component_name}'. Available: {list(COMPONENT_REGISTRY.keys())}")
+    module_path, class_name = COMPONENT_REGISTRY[component_name].rsplit(".", 1)
+    module = importlib.import_module(module_path)
+    return getattr(module, class_name)
@@ -1,10 +1,14 @@
 """SLA Monitor: polls for approaching deadlines and escalates.
 
-This is NOT a standard BaseComponent queue consumer. It runs a periodic polling loop.
+This is NOT a standard BaseComponent queue consumer. It runs a periodic polling loop,
+which also deletes expired rows of the engine result cache and old claim-check blobs.
 """
 
 import asyncio
+import signal
+import time
 from datetime import datetime, timezone
+from typing import Optional
 
 import aio_pika
 import structlog
@@ -13,11 +17,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.logging import setup_logging
 from config.settings import Settings
-from src.core.database import create_db_engine, create_session_factory
+from src.core.claim_check import ClaimCheckStore
+from src.core.database import create_db_engine, create_session_factory, engine_stats, register_pool_metrics
 from src.core.health import HealthServer
 from src.core.models import Request
 from src.core.rabbitmq import setup_rabbitmq_topology
 
+# Expired result_cache rows deleted per poll
+_RESULT_CACHE_PURGE_BATCH = 10_000
+
 
 class SLAMonitorComponent:
     """Periodically checks for requests approaching or exceeding their SLA deadline."""
@@ -26,26 +34,81 @@ class SLAMonitorComponent:
 
     def __init__(self, settings: Settings):
         self.settings = settings
-        setup_logging()
+        setup_logging(settings)
         self.logger = structlog.get_logger().bind(component=self.component_name)
-        self._db_engine = create_db_engine(settings)
+        self._db_engine = create_db_engine(settings, concurrency=1)
         self._session_factory = create_session_factory(self._db_engine)
         self._health_server = HealthServer(port=settings.health_port)
-        self._shutdown = False
+        self._health_server.add_stats("db", lambda: engine_stats(self._db_engine))
+        self._claim_checks = ClaimCheckStore(settings.storage_path, settings.claim_check_threshold_bytes)
+        self._claims_purged_at: Optional[float] = None
+        self._shutdown_event = asyncio.Event()
 
-    async def run(self) -> None:
+    async def run(self, handle_signals: bool = True) -> None:
+        if handle_signals:
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, self.stop)
+        register_pool_metrics(self._db_engine, self.component_name)
         await self._health_server.start()
         self._health_server.set_ready(True)
         self.logger.info("sla_monitor_started", poll_interval=5)
 
         try:
-            while not self._shutdown:
+            while not self._shutdown_event.is_set():
                 await self._check_deadlines()
-                await asyncio.sleep(5)
+                await self._purge_result_cache()
+                await self._purge_claim_checks()
+                try:
+                    await asyncio.wait_for(self._shutdown_event.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
         finally:
             await self._health_server.stop()
             await self._db_engine.dispose()
 
+    def stop(self) -> None:
+        self._shutdown_event.set()
+
+    async def _purge_result_cache(self) -> None:
+        """Delete expired result_cache rows, a bounded batch per poll so no single DELETE runs long."""
+        async with self._session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    text("""
+                        DELETE FROM result_cache
+                        WHERE (component, key) IN (
+                            SELECT component, key FROM result_cache
+                            WHERE expires_at <= NOW()
+                            LIMIT :limit
+                        )
+                    """),
+                    {"limit": _RESULT_CACHE_PURGE_BATCH},
+                )
+        if result.rowcount:
+            self.logger.info("result_cache_purged", rows=result.rowcount)
+
+    async def _purge_claim_checks(self) -> None:
+        """Delete claim-check blobs no message has referenced within the retention, at most once per interval.
+
+        Messages only carry claims while they are in flight and back office
+        tasks store resolved values, so an old blob is no longer needed.
+        """
+        now = time.monotonic()
+        if (
+            self._claims_purged_at is not None
+            and now - self._claims_purged_at < self.settings.claim_check_purge_interval_s
+        ):
+            return
+        self._claims_purged_at = now
+        try:
+            deleted = await self._claim_checks.purge(self.settings.claim_check_retention_s)
+        except OSError:
+            self.logger.exception("claim_check_purge_failed")
+            return
+        if deleted:
+            self.logger.info("claim_checks_purged", files=deleted)
+
     async def _check_deadlines(self) -> None:
         """Find requests that are at risk or have breached their SLA."""
         async with self._session_factory() as session:
@@ -1,87 +1,232 @@
-"""Splitter: decompresses files and extracts individual pages (fan-out)."""
+"""Splitter: writes the pages of a PDF, multi-page TIFF or image as per-page files (fan-out)."""
 
+import dataclasses
 import uuid
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
-from sqlalchemy import select
+import pypdfium2 as pdfium
+from PIL import Image
+from sqlalchemy import func, insert, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.base_component import BaseComponent
 from src.core.models import AggregationState, Page, Request
 from src.core.schemas import PipelineMessage
 
+# Image modes PNG stores as they are; anything else (CMYK, YCbCr, ...) is converted to RGB
+_PNG_MODES = frozenset({"1", "L", "LA", "I", "I;16", "P", "RGB", "RGBA"})
+
+
+@dataclasses.dataclass(frozen=True)
+class SplitChunk:
+    """Pages written by one :func:`split_pages` call."""
+
+    paths: list[str]  # Per-page files, from the chunk's first page index on
+    page_count: Optional[int]  # Pages in the source, if known (PDF up front, images once exhausted)
+    exhausted: bool  # True if the source has no pages after this chunk
+
+
+def split_pages(source_path: str, first_index: int, max_pages: int, output_dir: str, dpi: int) -> SplitChunk:
+    """Write up to ``max_pages`` pages from ``first_index`` on as PNG files. Runs in the process pool.
+
+    PDF pages are rendered at ``dpi``; TIFF frames and single images are
+    written as they are. One page is in memory at a time, so memory does not
+    grow with the size of the source.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    with open(source_path, "rb") as source:
+        is_pdf = source.read(5) == b"%PDF-"
+    if is_pdf:
+        return _split_pdf(source_path, first_index, max_pages, output, dpi)
+    return _split_image(source_path, first_index, max_pages, output)
+
+
+def _page_path(output: Path, page_index: int) -> Path:
+    return output / f"page_{page_index:05d}.png"
+
+
+def _split_pdf(source_path: str, first_index: int, max_pages: int, output: Path, dpi: int) -> SplitChunk:
+    # pdfium loads pages on demand, so opening the document does not read the whole file
+    pdf = pdfium.PdfDocument(source_path)
+    try:
+        page_count = len(pdf)
+        end = min(first_index + max_pages, page_count)
+        paths: list[str] = []
+        for page_index in range(first_index, end):
+            page = pdf[page_index]
+            try:
+                bitmap = page.render(scale=dpi / 72)
+                try:
+                    path = _page_path(output, page_index)
+                    bitmap.to_pil().save(path, format="PNG")
+                finally:
+                    bitmap.close()
+            finally:
+                page.close()
+            paths.append(str(path))
+        return SplitChunk(paths=paths, page_count=page_count, exhausted=end >= page_count)
+    finally:
+        pdf.close()
+
+
+def _split_image(source_path: str, first_index: int, max_pages: int, output: Path) -> SplitChunk:
+    # Seeking a TIFF only reads frame headers; each frame is decoded when it is saved
+    paths: list[str] = []
+    page_index = first_index
+    with Image.open(source_path) as image:
+        try:
+            image.seek(page_index)
+            while len(paths) < max_pages:
+                frame = image if image.mode in _PNG_MODES else image.convert("RGB")
+                path = _page_path(output, page_index)
+                frame.save(path, format="PNG")
+                paths.append(str(path))
+                page_index += 1
+                image.seek(page_index)  # EOFError past the last frame
+        except EOFError:
+            return SplitChunk(paths=paths, page_count=page_index, exhausted=True)
+    return SplitChunk(paths=paths, page_count=None, exhausted=False)
+
 
 class SplitterComponent(BaseComponent):
 
     component_name = "splitter"
+    uses_process_pool = True
 
     async def process_message(
         self,
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
-        file_path = Path(message.payload.get("file_path", ""))
+        """Split the file in chunks, committing and publishing each chunk as soon as it is written.
 
-        # --- STUB: Simulate extracting pages from a document ---
-        # In production, this would use PyPDF2, pdf2image, Pillow, etc.
-        # For now, simulate 3-5 pages per file
-        import random
+        Every chunk but the last is registered in its own transaction
+        (``commit_and_publish``), so OCR starts on the first pages while later
+        ones are still being split. The last chunk is registered in this
+        message's transaction together with the total page count: the last
+        page is only published once ``expected_count`` is set, so the
+        classification fan-in cannot complete before it knows the total.
+        """
+        request_id = message.request_id
+        source_path = message.payload.get("file_path", "")
+        output_dir = str(Path(self.settings.storage_path) / str(request_id) / "pages")
+        chunk_pages = max(1, self.settings.splitter_chunk_pages)
 
-        page_count = random.randint(3, 5)
+        # Chunks of an earlier attempt were committed with their messages: resume after them
+        first_index = await session.scalar(
+            select(func.count()).select_from(Page).where(Page.request_id == request_id)
+        )
         self.logger.info(
             "splitting_file",
-            request_id=str(message.request_id),
-            file_path=str(file_path),
-            page_count=page_count,
+            request_id=str(request_id),
+            file_path=source_path,
+            resume_from=first_index,
         )
 
-        # Update request with page count
-        result = await session.execute(select(Request).where(Request.id == message.request_id))
-        request = result.scalar_one()
-        request.page_count = page_count
-        request.status = "splitting"
-        request.updated_at = datetime.now(timezone.utc)
-
-        # Create aggregation state for classification fan-in
-        agg_state = AggregationState(
-            request_id=message.request_id,
-            stage="classification",
-            expected_count=page_count,
+        page_index = first_index
+        while True:
+            chunk = await self.run_cpu_bound(
+                split_pages, source_path, page_index, chunk_pages, output_dir, self.settings.splitter_render_dpi,
+            )
+            if chunk.exhausted:
+                break
+            published = await self.commit_and_publish(
+                partial(self._register_pages, message, page_index, chunk.paths, chunk.page_count, False)
+            )
+            page_index += len(chunk.paths)
+            self.logger.info(
+                "split_chunk_published",
+                request_id=str(request_id),
+                pages=len(chunk.paths),
+                published_count=published,
+                next_page=page_index,
+            )
+
+        if not chunk.page_count:
+            raise ValueError(f"No pages found in {source_path}")
+        outgoing = await self._register_pages(message, page_index, chunk.paths, chunk.page_count, True, session)
+
+        self.logger.info(
+            "split_complete",
+            request_id=str(request_id),
+            pages_created=chunk.page_count,
         )
-        session.add(agg_state)
+        return outgoing
 
-        # Create page records and fan-out messages
-        outgoing: list[tuple[str, PipelineMessage]] = []
-        for i in range(page_count):
-            # Create page in DB
-            page = Page(
-                id=uuid.uuid4(),
-                request_id=message.request_id,
-                page_index=i,
-                status="extracted",
-                file_storage_path=str(file_path),  # In real impl, each page would have its own path
+    async def _register_pages(
+        self,
+        message: PipelineMessage,
+        first_index: int,
+        paths: list[str],
+        page_count: Optional[int],
+        final: bool,
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Create the page rows of one chunk (and the fan-in state with the first) and their OCR messages.
+
+        Rows are written with one multi-row INSERT per table and the page ids
+        are generated here, so the cost does not grow with one flush per page.
+        """
+        request_id = message.request_id
+        request_values: dict = {"status": "splitting", "updated_at": datetime.now(timezone.utc)}
+        if final:
+            request_values["page_count"] = page_count
+        await session.execute(update(Request).where(Request.id == request_id).values(**request_values))
+
+        if first_index == 0:
+            # Create aggregation state for classification fan-in (total still unknown for TIFF)
+            await session.execute(
+                insert(AggregationState).values(
+                    request_id=request_id, stage="classification", expected_count=page_count,
+                )
+            )
+        elif final:
+            await session.execute(
+                text("""
+                    UPDATE aggregation_state
+                    SET expected_count = :page_count, updated_at = NOW()
+                    WHERE request_id = :request_id AND stage = 'classification'
+                """),
+                {"request_id": str(request_id), "page_count": page_count},
             )
-            session.add(page)
 
-            # Create message for OCR
+        # Create all page records in one multi-row insert
+        page_ids = [uuid.uuid4() for _ in paths]
+        if paths:
+            await session.execute(
+                insert(Page),
+                [
+                    {
+                        "id": page_id,
+                        "request_id": request_id,
+                        "page_index": page_index,
+                        "status": "extracted",
+                        "file_storage_path": path,
+                    }
+                    for page_index, (page_id, path) in enumerate(zip(page_ids, paths), start=first_index)
+                ],
+            )
+
+        # Fan-out: one message per page for OCR
+        outgoing: list[tuple[str, PipelineMessage]] = []
+        for page_index, (page_id, path) in enumerate(zip(page_ids, paths), start=first_index):
             page_message = message.model_copy(
                 update={
-                    "page_index": i,
+                    "page_index": page_index,
                     "page_count": page_count,
                     "source_component": self.component_name,
                     "payload": {
                         **message.payload,
-                        "page_id": str(page.id),
-                        "page_index": i,
+                        "file_path": path,
+                        "source_file_path": message.payload.get("file_path", ""),
+                        "page_id": str(page_id),
+                        "page_index": page_index,
                     },
                 }
             )
             outgoing.append(("__next__", page_message))
-
-        self.logger.info(
-            "split_complete",
-            request_id=str(message.request_id),
-            pages_created=page_count,
-        )
         return outgoing
@@ -20,8 +20,9 @@ class WorkflowRouterComponent(BaseComponent):
         message: PipelineMessage,
         session: AsyncSession,
     ) -> list[tuple[str, PipelineMessage]]:
-        # Load workflow config
-        workflow = self._workflow_loader.load(message.workflow_name)
+        # Load workflow config; the request stays on this version until it finishes
+        compiled = self._workflow_loader.compiled(message.workflow_name)
+        workflow = compiled.config
         deadline = calculate_deadline(workflow.sla.deadline_seconds)
 
         # Update request in DB
@@ -31,18 +32,27 @@ class WorkflowRouterComponent(BaseComponent):
             self.logger.error("request_not_found", request_id=str(message.request_id))
             return []
 
+        # Priority from the client, else the workflow default; every later hop inherits it
+        priority = message.priority if message.priority is not None else workflow.priority
+        if priority is not None:
+            request.priority = priority
+
         request.status = "routing"
         request.deadline_utc = deadline
         request.sla_seconds = workflow.sla.deadline_seconds
         request.updated_at = datetime.now(timezone.utc)
 
-        # Resolve first stage from workflow definition
-        first_stage = self._workflow_loader.get_first_stage(message.workflow_name)
+        # Resolve first stage from workflow definition, skipping stages whose conditions don't match
+        first_stage = compiled.next_applicable_stage(None, message)
+        if first_stage is None:
+            self.logger.error("no_applicable_stage", request_id=str(message.request_id), workflow=message.workflow_name)
+            return []
 
         self.logger.info(
             "workflow_resolved",
             request_id=str(message.request_id),
             workflow=message.workflow_name,
+            workflow_version=compiled.version,
             sla_seconds=workflow.sla.deadline_seconds,
             first_stage=first_stage.name,
         )
@@ -51,6 +61,8 @@ class WorkflowRouterComponent(BaseComponent):
         out_message = message.model_copy(
             update={
                 "deadline_utc": deadline,
+                "workflow_version": compiled.version,
+                "priority": priority,
                 "current_stage": first_stage.name,
                 "source_component": self.component_name,
             }
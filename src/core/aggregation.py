@@ -0,0 +1,138 @@
+"""Helpers shared by the fan-in aggregator components."""
+
+import dataclasses
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.schemas import PipelineMessage
+
+# One statement under the row lock: OR the parts' bits into received_bitmap, add
+# the bits that were not set yet and flip is_complete once every part is in.
+# The bitmap grows with the highest index seen, so parts can be recorded before
+# the total is known (expected_count NULL); the first caller that knows it fills
+# it in. Parts without an index (messages from before the bitmap) are counted as
+# before, without deduplication. Rows that would not change are not written.
+_MARK_RECEIVED = text("""
+    WITH state AS (
+        SELECT id, received_count, is_complete,
+               COALESCE(expected_count, CAST(:expected_count AS integer)) AS expected_count,
+               COALESCE(received_bitmap, CAST('' AS bit varying)) AS bitmap
+        FROM aggregation_state
+        WHERE request_id = :request_id AND stage = :stage
+        FOR UPDATE
+    ),
+    parts AS (
+        SELECT DISTINCT part
+        FROM state, unnest(CAST(:indices AS integer[])) AS part
+        WHERE part >= 0 AND (state.expected_count IS NULL OR part < state.expected_count)
+    ),
+    sized AS (
+        SELECT state.*, GREATEST(length(state.bitmap), (SELECT COALESCE(max(part) + 1, 0) FROM parts)) AS width
+        FROM state
+    ),
+    marked AS (
+        SELECT sized.bitmap,
+               (sized.bitmap || CAST(repeat('0', sized.width - length(sized.bitmap)) AS bit varying))
+               | COALESCE(
+                   (SELECT bit_or(set_bit(CAST(repeat('0', sized.width) AS bit varying), part, 1)) FROM parts),
+                   CAST(repeat('0', sized.width) AS bit varying)
+               ) AS new_bitmap
+        FROM sized
+    ),
+    counted AS (
+        SELECT marked.new_bitmap,
+               bit_count(marked.new_bitmap) - bit_count(marked.bitmap) + CAST(:unindexed AS integer) AS added
+        FROM marked
+    ),
+    updated AS (
+        UPDATE aggregation_state
+        SET received_bitmap = counted.new_bitmap,
+            received_count = aggregation_state.received_count + counted.added,
+            expected_count = state.expected_count,
+            is_complete = aggregation_state.is_complete OR (
+                state.expected_count IS NOT NULL
+                AND aggregation_state.received_count + counted.added >= state.expected_count
+            ),
+            updated_at = NOW()
+        FROM state, counted
+        WHERE aggregation_state.id = state.id
+          AND (
+              counted.added > 0
+              OR aggregation_state.expected_count IS DISTINCT FROM state.expected_count
+          )
+        RETURNING aggregation_state.received_count, aggregation_state.is_complete
+    )
+    SELECT state.received_count AS before,
+           COALESCE((SELECT received_count FROM updated), state.received_count) AS after,
+           state.expected_count,
+           state.is_complete AS was_complete,
+           COALESCE((SELECT is_complete FROM updated), state.is_complete) AS is_complete,
+           COALESCE(
+               NULLIF(position('0' IN CAST(counted.new_bitmap AS text)), 0) - 1,
+               length(counted.new_bitmap)
+           ) AS contiguous
+    FROM state, counted
+""")
+
+
+@dataclasses.dataclass(frozen=True)
+class FanInProgress:
+    """Outcome of recording parts of a fan-in."""
+
+    received: int
+    expected: Optional[int]  # None while the total is not known yet
+    new_parts: int
+    contiguous: int  # Parts 0..contiguous-1 have all been received
+    completed: bool  # True only for the update that brought in the last missing part
+    already_complete: bool  # The fan-in had completed before this update (e.g. a redelivery)
+
+
+def group_by_request(messages: list[PipelineMessage]) -> dict[UUID, list[PipelineMessage]]:
+    """Group messages by request_id, preserving delivery order inside each group."""
+    groups: dict[UUID, list[PipelineMessage]] = {}
+    for message in messages:
+        groups.setdefault(message.request_id, []).append(message)
+    return groups
+
+
+async def mark_received(
+    session: AsyncSession,
+    request_id: UUID,
+    stage: str,
+    part_indices: list[Optional[int]],
+    expected_count: Optional[int] = None,
+) -> Optional[FanInProgress]:
+    """Record parts (page index or document ordinal) of a request's fan-in, idempotently.
+
+    Each part sets one bit of the ``received_bitmap`` column, so a redelivered
+    part changes nothing and completion is reported exactly once.
+    ``expected_count`` fills in the total if the state does not have it yet
+    (it never overrides a known one). Returns None if the request has no
+    aggregation state for ``stage``.
+    """
+    indices = sorted({index for index in part_indices if index is not None})
+    result = await session.execute(
+        _MARK_RECEIVED,
+        {
+            "request_id": str(request_id),
+            "stage": stage,
+            "indices": indices,
+            "unindexed": sum(1 for index in part_indices if index is None),
+            "expected_count": expected_count,
+        },
+    )
+    row = result.fetchone()
+    if row is None:
+        return None
+    before, after, expected, was_complete, is_complete, contiguous = row
+    return FanInProgress(
+        received=after,
+        expected=expected,
+        new_parts=after - before,
+        contiguous=contiguous,
+        completed=is_complete and not was_complete,
+        already_complete=was_complete,
+    )
@@ -2,23 +2,77 @@
 
 import abc
 import asyncio
-import uuid
+import importlib
+import multiprocessing
+import os
+import re
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional, TypeVar
 
-import aio_pika
 import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.logging import setup_logging
 from config.settings import Settings
-from src.core.database import create_db_engine, create_session_factory
+from src.core.claim_check import ClaimCheckStore
+from src.core.database import create_db_engine, create_session_factory, engine_stats, register_pool_metrics
 from src.core.health import HealthServer
-from src.core.rabbitmq import setup_rabbitmq_topology
-from src.core.routing import resolve_routing
-from src.core.schemas import PipelineMessage
+from src.core.metrics import (
+    BATCH_PROCESSING_SECONDS,
+    MESSAGES_DEAD_LETTERED,
+    MESSAGES_FAILED,
+    MESSAGES_IN_FLIGHT,
+    MESSAGES_PAST_DEADLINE,
+    MESSAGES_PROCESSED,
+    MESSAGES_RETRIED,
+    PROCESSING_SECONDS,
+)
+from src.core.outbox import OutboxRelay, stage_outbox
+from src.core.publisher import Publisher
+from src.core.rabbitmq import (
+    ATTEMPT_HEADER,
+    DEAD_LETTER_REASON_HEADER,
+    FAILED_COMPONENT_HEADER,
+    LAST_ERROR_HEADER,
+    ORIGINAL_EXCHANGE_HEADER,
+    ORIGINAL_ROUTING_KEY_HEADER,
+    QUEUE_BINDINGS,
+    SHARDABLE_QUEUES,
+    retry_delay_ms,
+    retry_exchange,
+    shard_queue,
+)
+from src.core.result_cache import ResultCache
+from src.core.routing import resolve_fused_stage, resolve_routing
+from src.core.scheduling import DeadlineScheduler
+from src.core.sla import is_breached
+from src.core.schemas import PipelineMessage, decode_message
+from src.core.timeline import TimelineRecorder, published_at
+from src.core.transport import Delivery, create_transport
 from src.core.workflow_loader import WorkflowLoader
 
+T = TypeVar("T")
+
+
+async def _settle_batch(raw_messages: list[Delivery], requeue: Optional[bool]) -> None:
+    """Ack (``requeue=None``) or nack a whole batch: one multiple-ack/nack per consumer (channel)."""
+    last_per_consumer = {raw.consumer_tag: raw for raw in raw_messages}
+    for last in last_per_consumer.values():
+        if requeue is None:
+            await last.ack(multiple=True)
+        else:
+            await last.nack(multiple=True, requeue=requeue)
+
+
+def _warm_up_worker(module_name: str) -> int:
+    """Runs once in each pool worker: import the component module (and its heavy dependencies)."""
+    importlib.import_module(module_name)
+    return os.getpid()
+
 
 class BaseComponent(abc.ABC):
     """Abstract base for all pipeline components.
@@ -29,22 +83,135 @@ class BaseComponent(abc.ABC):
 
     Subclasses MAY override:
         - input_queue (property): defaults to f"q.{component_name}"
+        - uses_process_pool: set to True to get a process pool for run_cpu_bound()
+        - engine_version: set to get a result_cache for the engine's results
+        - process_batch(messages, session): batch-aware business logic
         - setup(): one-time initialization
         - teardown(): cleanup
+
+    Subclasses MAY call:
+        - run_cpu_bound(fn, *args): CPU-bound work in the process pool
+        - commit_and_publish(work): commit and publish part of the output ahead of the message
+
+    Up to ``concurrency`` messages are processed at the same time, each with its
+    own DB session and its own ack/nack. When a batch size greater than 1 is
+    configured, deliveries are instead grouped into batches that share one
+    transaction and are acked together with a single multiple-ack. A batch
+    that fails is bisected until the failing deliveries are isolated, so only
+    those are retried.
+
+    Fan-in stages can be sharded (``DOCPROC_AGGREGATION_SHARDS``): the
+    replica consumes only the shard queues it owns, where every part of a
+    request lands, and checkpoints the parts it buffered in memory once per
+    ``aggregation_checkpoint_ms`` in batch mode.
+
+    A delivery that fails is republished to a delay queue (1s, 5s, 25s, ...)
+    that hands it back to the stage, with its attempt number in the
+    ``x-attempt`` header. After the stage's ``max_attempts``, or straight away
+    if it cannot be decoded, it goes to ``q.dead_letters`` instead.
     """
 
+    uses_process_pool: bool = False
+    # Version of the component's engine; set it to get a result_cache keyed by input hash + version
+    engine_version: Optional[str] = None
+
     def __init__(self, settings: Settings):
-        self.settings = settings
-        setup_logging()
-        self.logger = structlog.get_logger().bind(component=self.component_name)
-        self._connection: Optional[aio_pika.RobustConnection] = None
-        self._channel: Optional[aio_pika.Channel] = None
-        self._exchanges: dict[str, aio_pika.Exchange] = {}
-        self._db_engine = create_db_engine(settings)
+        setup_logging(settings)
+        self._init_stage(
+            settings,
+            WorkflowLoader(settings.workflows_dir, settings.workflow_reload_interval_s, settings.storage_path),
+        )
+        self._concurrency = self._resolve_concurrency()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._sharded = (
+            settings.aggregation_shards > 0 and settings.transport == "amqp" and self.input_queue in SHARDABLE_QUEUES
+        )
+        self._batch_size = self._resolve_batch_size()
+        self._batch_max_wait_s = (
+            settings.aggregation_checkpoint_ms if self._sharded else settings.batch_max_wait_ms
+        ) / 1000
+        # EDF replaces the semaphore; batches are acked by delivery-tag range, so they stay FIFO
+        self._deadline_scheduler: Optional[DeadlineScheduler] = None
+        if settings.scheduling == "edf" and self._batch_size == 1:
+            self._deadline_scheduler = DeadlineScheduler(self._concurrency)
+        # Batches are processed one at a time, so they need a single connection
+        self._db_engine = create_db_engine(
+            settings,
+            concurrency=self._concurrency if self._batch_size == 1 else 1,
+            name=self.component_name,
+        )
         self._session_factory = create_session_factory(self._db_engine)
+        self._transport = create_transport(settings)
+        self._publisher = Publisher.from_settings(self.component_name, settings, self._transport)
+        # The delay queues dead-letter back into doc.direct, so only stages fed from it can be retried
+        input_exchange, input_routing_key = QUEUE_BINDINGS.get(self.input_queue, (None, None))
+        self._retry_routing_key: Optional[str] = (
+            input_routing_key if settings.retry_enabled and input_exchange == "doc.direct" else None
+        )
+        self._fused_handlers: dict[str, BaseComponent] = {}
+        self._outbox_relay: Optional[OutboxRelay] = None
+        if settings.outbox_enabled:
+            self._outbox_relay = OutboxRelay(
+                self._session_factory,
+                self._publisher,
+                batch_size=settings.outbox_batch_size,
+                poll_interval_s=settings.outbox_poll_interval_ms / 1000,
+            )
+        self._timeline: Optional[TimelineRecorder] = None
+        if settings.timeline_enabled:
+            self._timeline = TimelineRecorder(
+                self._session_factory,
+                batch_size=settings.timeline_batch_size,
+                flush_interval_s=settings.timeline_flush_interval_ms / 1000,
+            )
         self._health_server = HealthServer(port=settings.health_port)
-        self._workflow_loader = WorkflowLoader(settings.workflows_dir)
+        self._health_server.add_stats("db", lambda: engine_stats(self._db_engine))
         self._shutdown_event = asyncio.Event()
+        self._in_flight = 0
+        self._idle_event = asyncio.Event()
+        self._idle_event.set()
+        # Metric children are resolved once; the hot path only updates numbers
+        self._metric_in_flight = MESSAGES_IN_FLIGHT.labels(self.component_name)
+        self._metric_failed = MESSAGES_FAILED.labels(self.component_name)
+        self._metric_processing = PROCESSING_SECONDS.labels(self.component_name)
+        self._metric_past_deadline = MESSAGES_PAST_DEADLINE.labels(self.component_name)
+        self._metric_retried = MESSAGES_RETRIED.labels(self.component_name)
+        self._batch_buffer: list[Delivery] = []
+        self._batch_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._batch_task: Optional[asyncio.Task] = None
+
+    def _init_stage(self, settings: Settings, workflow_loader: WorkflowLoader) -> None:
+        """State the stage logic needs: settings, logger, workflow, claim checks, result cache, process pool."""
+        self.settings = settings
+        self.logger = structlog.get_logger().bind(component=self.component_name)
+        self._workflow_loader = workflow_loader
+        self._claim_checks = ClaimCheckStore(settings.storage_path, settings.claim_check_threshold_bytes)
+        self.result_cache: Optional[ResultCache] = None
+        if self.engine_version and settings.result_cache_enabled:
+            self.result_cache = ResultCache(
+                self.component_name,
+                self.engine_version,
+                memory_entries=settings.result_cache_memory_entries,
+                ttl_s=settings.result_cache_ttl_s,
+            )
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_size = 0
+        self._process_pool_tasks = 0
+        self._retiring_pools: set[asyncio.Task] = set()
+
+    @classmethod
+    def handler_only(cls, settings: Settings, workflow_loader: WorkflowLoader) -> "BaseComponent":
+        """Build the component as the handler of a fused stage: its stage logic without a runtime.
+
+        ``setup``, ``process_message`` and ``run_cpu_bound`` work as usual, with
+        the session of the component the stage is fused into. There is no DB
+        engine, transport, publisher, health server, outbox relay or timeline
+        recorder: the host component's are used.
+        """
+        handler = cls.__new__(cls)
+        handler._init_stage(settings, workflow_loader)
+        return handler
 
     @property
     @abc.abstractmethod
@@ -57,6 +224,11 @@ class BaseComponent(abc.ABC):
         """Queue to consume from. Override if not standard."""
         return f"q.{self.component_name}"
 
+    @property
+    def concurrency(self) -> int:
+        """Maximum number of messages processed concurrently by this process."""
+        return self._concurrency
+
     @abc.abstractmethod
     async def process_message(
         self,
@@ -75,91 +247,576 @@ class BaseComponent(abc.ABC):
         """
         ...
 
-    async def run(self) -> None:
-        """Main entry point. Sets up connections and starts consuming."""
-        self._register_signals()
+    async def process_batch(
+        self,
+        messages: list[PipelineMessage],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Process several messages in a single DB transaction (batch mode only).
+
+        The default implementation calls :meth:`process_message` for each message.
+        Override it when the work can be shared across the batch (e.g. one
+        aggregation UPDATE per request instead of one per message).
+
+        Args:
+            messages: Deserialized incoming messages, in delivery order.
+            session: Database session shared by the whole batch.
+
+        Returns:
+            List of (routing_key, outgoing_message) tuples to publish.
+        """
+        outgoing: list[tuple[str, PipelineMessage]] = []
+        for message in messages:
+            outgoing.extend(await self.process_message(message, session))
+        return outgoing
+
+    async def commit_and_publish(
+        self,
+        work: Callable[[AsyncSession], Awaitable[list[tuple[str, PipelineMessage]]]],
+    ) -> int:
+        """Run ``work`` in a transaction of its own and publish what it returns, before the current message finishes.
+
+        For stages that stream a large fan-out (the splitter): each part is
+        durable and downstream stages start on it while the rest is still being
+        produced. The part stays committed if the message fails afterwards, so
+        the retry must resume after it. Returns the number of messages handed
+        over for publishing.
+        """
+        async with self._session_factory() as session:
+            async with session.begin():
+                outgoing = await work(session)
+                resolved = await self._stage_outgoing(outgoing, session)
+        return await self._deliver_outgoing(resolved)
+
+    async def payload_value(self, message: PipelineMessage, key: str, default: Any = None) -> Any:
+        """Read a payload field, fetching it from the claim-check store if it was offloaded."""
+        return await self._claim_checks.resolve(message.payload.get(key, default))
+
+    async def run_cpu_bound(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in the process pool without blocking the event loop.
+
+        ``fn`` must be a picklable module-level function and ``args`` picklable
+        values; keep DB access and message handling on the loop. Without a pool
+        (``uses_process_pool`` False or ``DOCPROC_PROCESS_POOL_SIZE=0``) the
+        function runs inline.
+        """
+        if self._process_pool is None:
+            return fn(*args)
+        recycle_after = self._process_pool_size * self.settings.process_pool_max_tasks_per_worker
+        if recycle_after and self._process_pool_tasks >= recycle_after:
+            self._replace_process_pool()
+        self._process_pool_tasks += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._process_pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): replace the pool and let the message be redelivered
+            self.logger.error("process_pool_broken")
+            self._replace_process_pool(cancel_pending=True)
+            raise
+
+    async def _start_process_pool(self) -> None:
+        """Create the process pool (if this component uses one) and wait until every worker is warm."""
+        size = self.settings.process_pool_size
+        if size is None:
+            size = os.cpu_count() or 1
+        if not self.uses_process_pool or size <= 0:
+            return
+        self._process_pool_size = size
+        self._process_pool, warm_up = self._create_process_pool()
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in warm_up))
+        self.logger.info("process_pool_started", workers=size)
+
+    async def _stop_process_pool(self) -> None:
+        if self._process_pool:
+            await asyncio.to_thread(self._process_pool.shutdown)
+        await asyncio.gather(*self._retiring_pools)
+
+    def _create_process_pool(self) -> tuple[ProcessPoolExecutor, list]:
+        # "spawn": forking a process that runs an event loop and driver threads is not safe
+        pool = ProcessPoolExecutor(
+            max_workers=self._process_pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        warm_up = [pool.submit(_warm_up_worker, type(self).__module__) for _ in range(self._process_pool_size)]
+        self._process_pool_tasks = 0
+        return pool, warm_up
+
+    def _replace_process_pool(self, cancel_pending: bool = False) -> None:
+        """Swap in a fresh pool; the old one finishes its tasks and shuts down in the background.
+
+        Recycling whole pools contains memory leaks in native OCR/imaging code
+        without ``max_tasks_per_child``, which can deadlock on Python 3.11.
+        """
+        old_pool = self._process_pool
+        self._process_pool, _ = self._create_process_pool()
+        task = asyncio.create_task(asyncio.to_thread(old_pool.shutdown, wait=True, cancel_futures=cancel_pending))
+        self._retiring_pools.add(task)
+        task.add_done_callback(self._retiring_pools.discard)
+        self.logger.info("process_pool_recycled", workers=self._process_pool_size)
+
+    async def run(self, handle_signals: bool = True) -> None:
+        """Main entry point. Sets up connections and starts consuming until :meth:`stop`.
+
+        Args:
+            handle_signals: Stop on SIGTERM/SIGINT. Disabled when several
+                components share the process and the caller handles signals.
+        """
+        if handle_signals:
+            self._register_signals()
+        register_pool_metrics(self._db_engine, self.component_name)
         await self._health_server.start()
+        await self._start_process_pool()
         await self.setup()
 
-        self._connection = await aio_pika.connect_robust(self.settings.rabbitmq_url)
-        self._channel = await self._connection.channel()
-        await self._channel.set_qos(prefetch_count=self.settings.prefetch_count)
-
-        # Declare full topology (idempotent)
-        self._exchanges = await setup_rabbitmq_topology(self._channel)
+        # Connect and declare full topology (idempotent)
+        await self._transport.connect()
+        if self._outbox_relay:
+            self._outbox_relay.start()
+        if self._timeline:
+            self._timeline.start()
 
         # Start consuming from our input queue
-        queue = await self._channel.get_queue(self.input_queue)
-        self.logger.info("consuming", queue=self.input_queue)
+        if self._batch_size > 1:
+            self._batch_task = asyncio.create_task(self._batch_loop())
+            on_message = self._on_batch_message
+        else:
+            on_message = self._on_message
+        queues = self._input_queues()
+        self.logger.info(
+            "consuming",
+            queue=self.input_queue,
+            shard_queues=queues[1:] or None,
+            concurrency=self._concurrency,
+            batch_size=self._batch_size,
+        )
         self._health_server.set_ready(True)
-        await queue.consume(self._on_message)
+        # Prefetch at least as many messages as we are allowed to process at once.
+        # In batch mode, leave room for the next batch to fill while one is processed;
+        # in EDF mode, keep a window of waiting deliveries to pick the most urgent from.
+        prefetch_count = max(self.settings.prefetch_count, self._concurrency, 2 * self._batch_size)
+        if self._deadline_scheduler:
+            prefetch_count = max(prefetch_count, self._concurrency + self.settings.edf_window)
+        consumer_tags = [
+            await self._transport.consume(queue, on_message, prefetch_count=prefetch_count) for queue in queues
+        ]
 
         # Wait until shutdown signal
         await self._shutdown_event.wait()
-        self.logger.info("shutting_down")
+        self.logger.info("shutting_down", in_flight=self._in_flight)
+        for consumer_tag in consumer_tags:
+            await self._transport.cancel(consumer_tag)
+        if self._batch_task:
+            self._batch_pending.set()
+            self._batch_full.set()
+            await self._batch_task
+        await self._idle_event.wait()
         await self.teardown()
 
-    async def _on_message(self, raw_message: aio_pika.IncomingMessage) -> None:
-        """Deserialize, open DB session, call process_message, publish results, ack/nack."""
-        async with raw_message.process(requeue=True):
-            message = PipelineMessage.model_validate_json(raw_message.body)
-            self.logger.info(
-                "message_received",
-                request_id=str(message.request_id),
-                trace_id=str(message.trace_id),
+    def stop(self) -> None:
+        """Ask :meth:`run` to stop consuming, finish in-flight work and tear down."""
+        self._shutdown_event.set()
+
+    def _stage_setting(self, field: str) -> int | None:
+        """Largest value of a numeric StageConfig field across the stages this component runs."""
+        values: list[int] = []
+        for workflow_name in self._workflow_loader.list_workflows():
+            try:
+                stage = self._workflow_loader.get_stage_by_component(workflow_name, self.component_name)
+            except ValueError:
+                continue
+            value = getattr(stage, field)
+            if value:
+                values.append(value)
+        return max(values, default=None)
+
+    def _resolve_concurrency(self) -> int:
+        """Concurrency from settings, else the largest ``max_concurrency`` of our workflow stages, else 1."""
+        if self.settings.max_concurrency:
+            return max(1, self.settings.max_concurrency)
+        return self._stage_setting("max_concurrency") or 1
+
+    def _resolve_batch_size(self) -> int:
+        """Batch size from settings, else the largest ``batch_size`` of our workflow stages, else 1 (no batching).
+
+        Sharded fan-in stages always run in batch mode, one batch per checkpoint.
+        """
+        if self._sharded:
+            return max(1, self.settings.aggregation_checkpoint_size)
+        if self.settings.batch_size:
+            return max(1, self.settings.batch_size)
+        return self._stage_setting("batch_size") or 1
+
+    def _input_queues(self) -> list[str]:
+        """Queues to consume: the input queue, plus the shard queues this replica owns when sharded.
+
+        Shard ``s`` belongs to replica ``s % aggregation_replicas``. The index
+        comes from settings, else from the hostname's ordinal suffix (e.g. a
+        StatefulSet pod ``classification-aggregator-2``), so a restarted
+        replica takes back the same shards. The shared input queue is still
+        consumed to drain messages queued before sharding was enabled.
+        """
+        if not self._sharded:
+            return [self.input_queue]
+        replicas = max(1, self.settings.aggregation_replicas)
+        index = self.settings.aggregation_replica_index
+        if index is None:
+            match = re.search(r"-(\d+)$", socket.gethostname())
+            index = int(match.group(1)) if match else 0
+        owned = [s for s in range(self.settings.aggregation_shards) if s % replicas == index % replicas]
+        return [self.input_queue, *(shard_queue(self.input_queue, s) for s in owned)]
+
+    def _track_in_flight(self, delta: int) -> None:
+        self._in_flight += delta
+        self._metric_in_flight.set(self._in_flight)
+        if self._in_flight == 0:
+            self._idle_event.set()
+        else:
+            self._idle_event.clear()
+
+    async def _on_message(self, raw_message: Delivery) -> None:
+        """Run one delivery, bounded by the component's concurrency limit (earliest deadline first in EDF mode)."""
+        message: Optional[PipelineMessage] = None
+        slot = self._semaphore
+        if self._deadline_scheduler:
+            try:
+                message = decode_message(raw_message.body, raw_message.content_type, raw_message.content_encoding)
+            except Exception:
+                pass  # _handle_message decodes it again and rejects it
+            slot = self._deadline_scheduler.slot(message.deadline_utc if message else None)
+        async with slot:
+            self._track_in_flight(1)
+            start = time.perf_counter()
+            try:
+                await self._handle_message(raw_message, message)
+            except Exception:
+                self._metric_failed.inc()
+                raise
+            else:
+                self._metric_processing.observe(time.perf_counter() - start)
+            finally:
+                self._track_in_flight(-1)
+
+    async def _handle_message(self, raw_message: Delivery, message: Optional[PipelineMessage] = None) -> None:
+        """Deserialize (unless already decoded) and process one delivery; ack, or retry / dead-letter it on failure.
+
+        If the retry cannot be published either, the delivery is rejected and requeued.
+        """
+        # Deliveries already acked after a retry publish are left alone by the context manager
+        async with raw_message.process(requeue=True, ignore_processed=True):
+            try:
+                if message is None:
+                    message = decode_message(raw_message.body, raw_message.content_type, raw_message.content_encoding)
+                await self._process_delivery(raw_message, message)
+            except Exception as exc:
+                if self._retry_routing_key and await self._retry_or_dead_letter(raw_message, message, exc):
+                    await raw_message.ack()
+                raise
+
+    async def _process_delivery(self, raw_message: Delivery, message: PipelineMessage) -> None:
+        """Open DB session, call process_message, commit and publish the results."""
+        self.logger.info(
+            "message_received",
+            request_id=str(message.request_id),
+            trace_id=str(message.trace_id),
+        )
+
+        start = datetime.now(timezone.utc)
+        if message.deadline_utc is not None and is_breached(message.deadline_utc):
+            self._metric_past_deadline.inc()
+        async with self._session_factory() as session:
+            async with session.begin():
+                outgoing = await self.process_message(message, session)
+                resolved = await self._stage_outgoing(outgoing, session)
+
+        # Publish all outgoing messages AFTER successful DB commit
+        published = await self._deliver_outgoing(resolved)
+        MESSAGES_PROCESSED.labels(self.component_name, message.current_stage or "unknown").inc()
+
+        completed = datetime.now(timezone.utc)
+        if self._timeline:
+            self._timeline.record(message, self.component_name, published_at(raw_message.headers), start, completed)
+        elapsed = (completed - start).total_seconds()
+        self.logger.info(
+            "message_processed",
+            request_id=str(message.request_id),
+            elapsed_s=round(elapsed, 3),
+            published_count=published,
+        )
+
+    def _max_attempts(self, message: PipelineMessage) -> int:
+        """The stage's ``max_attempts``, else ``retry_max_attempts`` from settings."""
+        try:
+            stage = self._workflow_loader.get_stage(
+                message.workflow_name, message.current_stage or "", message.workflow_version
             )
+        except (ValueError, OSError):
+            stage = None
+        if stage is not None and stage.max_attempts:
+            return stage.max_attempts
+        return self.settings.retry_max_attempts
+
+    async def _retry_or_dead_letter(
+        self,
+        raw_message: Delivery,
+        message: Optional[PipelineMessage],
+        error: BaseException,
+    ) -> bool:
+        """Republish a failed delivery to its next delay queue, or to q.dead_letters once out of attempts.
+
+        Returns whether the broker confirmed it, i.e. whether the delivery can
+        now be acked. Undecodable deliveries are dead-lettered at once.
+        """
+        try:
+            attempt = int((raw_message.headers or {}).get(ATTEMPT_HEADER, 1))
+        except (TypeError, ValueError):
+            attempt = 1
+        headers = {
+            ATTEMPT_HEADER: attempt,
+            LAST_ERROR_HEADER: f"{type(error).__name__}: {error}"[:500],
+            FAILED_COMPONENT_HEADER: self.component_name,
+        }
+        if message is not None and attempt < self._max_attempts(message):
+            reason = None
+            delay_ms = retry_delay_ms(attempt)
+            headers[ATTEMPT_HEADER] = attempt + 1
+            target = (retry_exchange(delay_ms), self._retry_routing_key)
+        else:
+            reason = "undecodable" if message is None else "max_attempts"
+            delay_ms = None
+            headers[DEAD_LETTER_REASON_HEADER] = reason
+            headers[ORIGINAL_EXCHANGE_HEADER] = "doc.direct"
+            headers[ORIGINAL_ROUTING_KEY_HEADER] = self._retry_routing_key
+            target = ("doc.dlx", "")
+
+        try:
+            await self._publisher.republish(*target, raw_message, headers)
+        except Exception:
+            self.logger.exception("retry_publish_failed", exchange=target[0], attempt=attempt)
+            return False
+
+        request_id = str(message.request_id) if message else (raw_message.headers or {}).get("request_id")
+        if reason is None:
+            self._metric_retried.inc()
+            self.logger.warning(
+                "message_retry_scheduled",
+                request_id=request_id,
+                attempt=attempt,
+                delay_ms=delay_ms,
+                error=headers[LAST_ERROR_HEADER],
+            )
+        else:
+            MESSAGES_DEAD_LETTERED.labels(self.component_name, reason).inc()
+            self.logger.error(
+                "message_dead_lettered",
+                request_id=request_id,
+                attempt=attempt,
+                reason=reason,
+                error=headers[LAST_ERROR_HEADER],
+            )
+        return True
+
+    async def _on_batch_message(self, raw_message: Delivery) -> None:
+        """Buffer a delivery for the batch loop; it is acked when its batch commits."""
+        self._batch_buffer.append(raw_message)
+        self._batch_pending.set()
+        if len(self._batch_buffer) >= self._batch_size:
+            self._batch_full.set()
+
+    async def _batch_loop(self) -> None:
+        """Flush the buffer when it holds ``batch_size`` deliveries or after ``batch_max_wait_ms``
+        (``aggregation_checkpoint_ms`` for a sharded fan-in).
+
+        Batches are processed one at a time so that a multiple-ack on the last
+        delivery tag only ever covers the deliveries of the current batch.
+        """
+        max_wait = self._batch_max_wait_s
+        while True:
+            await self._batch_pending.wait()
+            if not self._shutdown_event.is_set():
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._batch_buffer[: self._batch_size]
+            self._batch_buffer = self._batch_buffer[self._batch_size :]
+            if len(self._batch_buffer) < self._batch_size:
+                self._batch_full.clear()
+            if not self._batch_buffer:
+                self._batch_pending.clear()
 
-            start = datetime.now(timezone.utc)
+            if batch:
+                self._track_in_flight(len(batch))
+                try:
+                    await self._handle_batch(batch)
+                finally:
+                    self._track_in_flight(-len(batch))
+
+            if self._shutdown_event.is_set() and not self._batch_buffer:
+                return
+
+    async def _handle_batch(self, raw_messages: list[Delivery]) -> None:
+        """Process a batch in one transaction, publish results, then ack all deliveries at once.
+
+        Undecodable deliveries are dead-lettered before the batch runs. If the
+        batch fails it is split in halves that are processed (and split) in
+        turn, so only the deliveries that fail on their own are retried or
+        dead-lettered and the rest of the batch commits.
+        """
+        items: list[tuple[Delivery, PipelineMessage]] = []
+        for raw in raw_messages:
+            try:
+                items.append((raw, decode_message(raw.body, raw.content_type, raw.content_encoding)))
+            except Exception as exc:
+                self.logger.exception("batch_message_undecodable")
+                await self._fail_batch_delivery(raw, None, exc)
+        if items:
+            await self._process_batch_items(items)
+
+    async def _process_batch_items(self, items: list[tuple[Delivery, PipelineMessage]]) -> None:
+        """Run ``items`` as one batch; on failure bisect it until the failing deliveries are isolated.
+
+        Halves are processed in delivery order, so the multiple-ack of each
+        part only covers deliveries that are already settled or in that part.
+        """
+        raw_messages = [raw for raw, _ in items]
+        messages = [message for _, message in items]
+        start = datetime.now(timezone.utc)
+        try:
             async with self._session_factory() as session:
                 async with session.begin():
-                    outgoing = await self.process_message(message, session)
+                    outgoing = await self.process_batch(messages, session)
+                    resolved = await self._stage_outgoing(outgoing, session)
+            published = await self._deliver_outgoing(resolved)
+        except Exception as exc:
+            if len(items) == 1:
+                self.logger.exception("batch_message_failed", request_id=str(messages[0].request_id))
+                await self._fail_batch_delivery(raw_messages[0], messages[0], exc)
+                return
+            self.logger.warning(
+                "batch_failed_bisecting",
+                batch_size=len(items),
+                error=f"{type(exc).__name__}: {exc}"[:500],
+            )
+            middle = len(items) // 2
+            await self._process_batch_items(items[:middle])
+            await self._process_batch_items(items[middle:])
+            return
 
-            # Publish all outgoing messages AFTER successful DB commit
-            published = 0
-            for routing_key, out_msg in outgoing:
-                resolved = resolve_routing(
-                    routing_key, out_msg, self._workflow_loader, self.component_name,
+        await _settle_batch(raw_messages, requeue=None)
+        completed = datetime.now(timezone.utc)
+        for raw, message in items:
+            MESSAGES_PROCESSED.labels(self.component_name, message.current_stage or "unknown").inc()
+            if self._timeline:
+                # Every message of the batch shares the batch's service window
+                self._timeline.record(message, self.component_name, published_at(raw.headers), start, completed)
+        elapsed = (completed - start).total_seconds()
+        BATCH_PROCESSING_SECONDS.labels(self.component_name).observe(elapsed)
+        self.logger.info(
+            "batch_processed",
+            batch_size=len(messages),
+            requests=len({m.request_id for m in messages}),
+            elapsed_s=round(elapsed, 3),
+            published_count=published,
+        )
+
+    async def _fail_batch_delivery(
+        self,
+        raw_message: Delivery,
+        message: Optional[PipelineMessage],
+        error: BaseException,
+    ) -> None:
+        """Retry or dead-letter one delivery of a batch and ack it, or requeue it if that is not possible."""
+        self._metric_failed.inc()
+        if self._retry_routing_key and await self._retry_or_dead_letter(raw_message, message, error):
+            await raw_message.ack()
+        else:
+            await raw_message.nack(requeue=True)
+
+    async def _stage_outgoing(
+        self,
+        outgoing: list[tuple[str, PipelineMessage]],
+        session: AsyncSession,
+    ) -> list[tuple[str, str, PipelineMessage]]:
+        """Run fused stages, resolve routing sentinels and, with the outbox enabled, write the results.
+
+        Called inside the open transaction of the message (or batch).
+        """
+        outgoing = await self._run_fused_stages(outgoing, session)
+        resolved_messages: list[tuple[str, str, PipelineMessage]] = []
+        for routing_key, out_msg in outgoing:
+            resolved = resolve_routing(routing_key, out_msg, self._workflow_loader, self.component_name)
+            if resolved is None:
+                self.logger.debug(
+                    "terminal_stage_no_publish",
+                    request_id=str(out_msg.request_id),
                 )
-                if resolved is None:
-                    self.logger.debug(
-                        "terminal_stage_no_publish",
-                        request_id=str(out_msg.request_id),
-                    )
-                    continue
+                continue
+            if self._claim_checks.enabled:
                 exchange_name, actual_key, updated_msg = resolved
-                await self._publish(exchange_name, actual_key, updated_msg)
-                published += 1
-
-            elapsed = (datetime.now(timezone.utc) - start).total_seconds()
-            self.logger.info(
-                "message_processed",
-                request_id=str(message.request_id),
-                elapsed_s=round(elapsed, 3),
-                published_count=published,
+                payload = await self._claim_checks.offload(updated_msg.payload)
+                resolved = (exchange_name, actual_key, updated_msg.model_copy(update={"payload": payload}))
+            resolved_messages.append(resolved)
+
+        if self._outbox_relay:
+            await stage_outbox(session, resolved_messages, self.component_name)
+        return resolved_messages
+
+    async def _run_fused_stages(
+        self,
+        outgoing: list[tuple[str, PipelineMessage]],
+        session: AsyncSession,
+    ) -> list[tuple[str, PipelineMessage]]:
+        """Hand messages bound for a fused stage straight to that stage's handler, in the same session.
+
+        Whatever the fused handler returns is processed the same way, so chains
+        of fused stages collapse into a single transaction.
+        """
+        result: list[tuple[str, PipelineMessage]] = []
+        pending = list(outgoing)
+        while pending:
+            routing_key, out_msg = pending.pop(0)
+            fused_stage = resolve_fused_stage(routing_key, out_msg, self._workflow_loader, self.component_name)
+            if fused_stage is None:
+                result.append((routing_key, out_msg))
+                continue
+            handler = await self._get_fused_handler(fused_stage.component)
+            fused_msg = out_msg.model_copy(update={"current_stage": fused_stage.name})
+            self.logger.debug(
+                "fused_stage",
+                request_id=str(out_msg.request_id),
+                stage=fused_stage.name,
             )
+            pending[0:0] = await handler.process_message(fused_msg, session)
+        return result
+
+    async def _get_fused_handler(self, component_name: str) -> "BaseComponent":
+        """Build (once) and set up the stage handler of the component that runs a fused stage."""
+        if component_name not in self._fused_handlers:
+            from src.components.registry import load_component_class
+
+            handler = load_component_class(component_name).handler_only(self.settings, self._workflow_loader)
+            await handler._start_process_pool()
+            await handler.setup()
+            self._fused_handlers[component_name] = handler
+            self.logger.info("fused_handler_loaded", fused_component=component_name)
+        return self._fused_handlers[component_name]
+
+    async def _deliver_outgoing(self, resolved_messages: list[tuple[str, str, PipelineMessage]]) -> int:
+        """Called after commit: wake the outbox relay, or publish directly and wait for every confirm.
+
+        Returns the number of messages handed over for publishing.
+        """
+        if self._outbox_relay:
+            if resolved_messages:
+                self._outbox_relay.notify()
+        else:
+            await self._publisher.publish_many(resolved_messages)
+        return len(resolved_messages)
 
     async def _publish(self, exchange_name: str, routing_key: str, message: PipelineMessage) -> None:
-        """Publish a message to a named exchange."""
-        exchange = self._exchanges[exchange_name]
-        await exchange.publish(
-            aio_pika.Message(
-                body=message.model_dump_json().encode(),
-                content_type="application/json",
-                message_id=str(uuid.uuid4()),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                headers={
-                    "request_id": str(message.request_id),
-                    "component": self.component_name,
-                },
-            ),
-            routing_key=routing_key,
-        )
-        self.logger.debug(
-            "message_published",
-            exchange=exchange_name,
-            routing_key=routing_key,
-            request_id=str(message.request_id),
-        )
+        """Publish a message to a named exchange and wait for the broker confirm."""
+        await self._publisher.publish(exchange_name, routing_key, message)
 
     async def publish_to_backoffice(self, routing_key: str, message: PipelineMessage) -> None:
         """Publish to the backoffice exchange."""
@@ -171,8 +828,14 @@ class BaseComponent(abc.ABC):
     async def teardown(self) -> None:
         """Cleanup connections."""
         self._health_server.set_ready(False)
-        if self._connection and not self._connection.is_closed:
-            await self._connection.close()
+        for handler in self._fused_handlers.values():
+            await handler._stop_process_pool()
+        if self._outbox_relay:
+            await self._outbox_relay.stop()
+        if self._timeline:
+            await self._timeline.stop()
+        await self._transport.close()
+        await self._stop_process_pool()
         await self._db_engine.dispose()
         await self._health_server.stop()
 
@@ -184,4 +847,4 @@ class BaseComponent(abc.ABC):
 
             sig = getattr(signal, sig_name, None)
             if sig:
-                loop.add_signal_handler(sig, self._shutdown_event.set)
+                loop.add_signal_handler(sig, self.stop)
@@ -0,0 +1,114 @@
+"""Claim-check store: large payload values live on shared storage, messages carry a reference."""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# Payload values replaced by a claim look like {"$claim": "<sha256 hex>"}
+CLAIM_KEY = "$claim"
+
+
+def is_claim(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and CLAIM_KEY in value
+
+
+class ClaimCheckStore:
+    """Content-addressed JSON blobs under ``<storage_path>/claims``.
+
+    Blobs are named by the SHA-256 of their content, so identical values are
+    stored once and a reference never changes meaning. Resolved values are kept
+    in a small in-process LRU cache. File I/O runs in a worker thread.
+
+    Offloading a value that is already stored refreshes the blob's mtime, so
+    :meth:`purge` only deletes blobs no message has referenced for a while.
+    """
+
+    def __init__(self, storage_path: str, threshold_bytes: int, cache_size: int = 256):
+        self._root = Path(storage_path) / "claims"
+        self._threshold_bytes = threshold_bytes
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._threshold_bytes > 0
+
+    async def offload(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Return a copy of ``payload`` with every value of at least the threshold size replaced by a claim."""
+        if not self.enabled:
+            return payload
+        offloaded: dict[str, Any] = {}
+        for key, value in payload.items():
+            if is_claim(value) or isinstance(value, (bool, int, float)) or value is None:
+                offloaded[key] = value
+                continue
+            if isinstance(value, str) and len(value) < self._threshold_bytes:
+                # Cheap pre-check: the JSON encoding is never shorter than the string
+                offloaded[key] = value
+                continue
+            data = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+            if len(data) < self._threshold_bytes:
+                offloaded[key] = value
+                continue
+            digest = await asyncio.to_thread(self._write, data)
+            offloaded[key] = {CLAIM_KEY: digest}
+        return offloaded
+
+    async def resolve(self, value: Any) -> Any:
+        """Return the stored value if ``value`` is a claim, otherwise ``value`` itself."""
+        if not is_claim(value):
+            return value
+        digest = value[CLAIM_KEY]
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return self._cache[digest]
+
+        resolved = json.loads(await asyncio.to_thread(self._path(digest).read_bytes))
+        self._cache[digest] = resolved
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return resolved
+
+    async def purge(self, max_age_s: float) -> int:
+        """Delete blobs (and abandoned temp files) not written for ``max_age_s`` seconds. Returns how many."""
+        return await asyncio.to_thread(self._purge, time.time() - max_age_s)
+
+    def _path(self, digest: str) -> Path:
+        return self._root / digest[:2] / f"{digest}.json"
+
+    def _write(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            os.utime(path)  # Already stored: referenced again, so keep it from being purged
+            return digest
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial blob
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def _purge(self, cutoff: float) -> int:
+        deleted = 0
+        if not self._root.is_dir():
+            return deleted
+        for shard in self._root.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        deleted += 1
+                except FileNotFoundError:
+                    continue  # Removed by a concurrent purge
+        return deleted
@@ -1,18 +1,133 @@
 """SQLAlchemy async engine and session factory."""
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config.settings import Settings
+from src.core.metrics import (
+    DB_CHECKOUT_WAIT_SECONDS,
+    DB_POOL_IN_USE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_QUERY_SECONDS,
+    REGISTRY,
+)
+
+# Pool sizing for processes without a concurrency limit (the FastAPI apps)
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+
+class PoolStats:
+    """Checkout wait and query latency for one engine, recorded in the ``docproc_db_*`` metrics."""
+
+    def __init__(self, name: str):
+        self.checkout_wait = DB_CHECKOUT_WAIT_SECONDS.labels(name)
+        self.query_latency = DB_QUERY_SECONDS.labels(name)
+        self.checkout_errors = 0  # Timeouts and connect failures
+        self.peak_in_use = 0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that times how long each checkout waits for a connection."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.checkout_errors += 1
+            raise
+        finally:
+            self.stats.checkout_wait.observe(time.perf_counter() - start)
+        self.stats.peak_in_use = max(self.stats.peak_in_use, self.checkedout())
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def pool_sizes(settings: Settings, concurrency: int | None = None) -> tuple[int, int]:
+    """(pool_size, max_overflow) for a process handling ``concurrency`` messages at once.
 
+    One connection per in-flight message, plus one for the outbox relay. The
+    overflow absorbs short bursts (e.g. a relay drain) without keeping idle
+    connections open on Postgres. ``DOCPROC_DB_POOL_SIZE`` and
+    ``DOCPROC_DB_MAX_OVERFLOW`` override the derived values.
+    """
+    if concurrency is None:
+        pool_size, max_overflow = DEFAULT_POOL_SIZE, DEFAULT_MAX_OVERFLOW
+    else:
+        pool_size = concurrency + (1 if settings.outbox_enabled else 0)
+        max_overflow = max(2, pool_size // 2)
+    if settings.db_pool_size is not None:
+        pool_size = settings.db_pool_size
+    if settings.db_max_overflow is not None:
+        max_overflow = settings.db_max_overflow
+    return pool_size, max_overflow
 
-def create_db_engine(settings: Settings):
-    """Create an async SQLAlchemy engine."""
-    return create_async_engine(
+
+def create_db_engine(settings: Settings, concurrency: int | None = None, name: str | None = None) -> AsyncEngine:
+    """Create an instrumented async SQLAlchemy engine sized for ``concurrency`` (see :func:`pool_sizes`).
+
+    ``name`` labels the engine's metrics (defaults to the component name).
+    """
+    pool_size, max_overflow = pool_sizes(settings, concurrency)
+    engine = create_async_engine(
         settings.database_url,
-        pool_size=5,
-        max_overflow=10,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         echo=False,
     )
+    stats = PoolStats(name or settings.component_name)
+    engine.sync_engine.pool.stats = stats
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._docproc_query_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        stats.query_latency.observe(time.perf_counter() - context._docproc_query_start)
+
+    return engine
+
+
+def engine_stats(engine: AsyncEngine) -> dict:
+    """Pool occupancy and latency histograms of an engine created by :func:`create_db_engine`."""
+    pool = engine.sync_engine.pool
+    stats: PoolStats = pool.stats
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "peak_in_use": stats.peak_in_use,
+        "checkout_errors": stats.checkout_errors,
+        "checkout_wait_s": stats.checkout_wait.snapshot(),
+        "query_latency_s": stats.query_latency.snapshot(),
+    }
+
+
+def register_pool_metrics(engine: AsyncEngine, name: str) -> None:
+    """Refresh the ``docproc_db_pool_*`` gauges of ``engine`` on every /metrics scrape."""
+
+    def collect() -> None:
+        pool = engine.sync_engine.pool
+        DB_POOL_SIZE.labels(name).set(pool.size())
+        DB_POOL_IN_USE.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(0, pool.overflow()))
+
+    REGISTRY.add_collector(collect)
 
 
 def create_session_factory(engine) -> async_sessionmaker[AsyncSession]:
@@ -1,22 +1,33 @@
 """Minimal HTTP health check server for Kubernetes probes."""
 
+from typing import Callable
+
 from aiohttp import web
 
+from src.core.metrics import CONTENT_TYPE, REGISTRY
+
 
 class HealthServer:
-    """Lightweight HTTP server exposing /health and /ready endpoints."""
+    """Lightweight HTTP server exposing /health, /ready, /metrics and /stats/{name} endpoints."""
 
     def __init__(self, port: int = 8080):
         self._port = port
         self._app = web.Application()
         self._app.router.add_get("/health", self._health)
         self._app.router.add_get("/ready", self._ready)
+        self._app.router.add_get("/metrics", self._metrics)
+        self._app.router.add_get("/stats/{name}", self._stats)
         self._runner: web.AppRunner | None = None
         self._is_ready = False
+        self._stats_providers: dict[str, Callable[[], dict]] = {}
 
     def set_ready(self, ready: bool = True) -> None:
         self._is_ready = ready
 
+    def add_stats(self, name: str, provider: Callable[[], dict]) -> None:
+        """Serve ``provider()`` as JSON on /stats/{name}."""
+        self._stats_providers[name] = provider
+
     async def _health(self, _request: web.Request) -> web.Response:
         return web.json_response({"status": "ok"})
 
@@ -25,6 +36,15 @@ class HealthServer:
             return web.json_response({"status": "ready"})
         return web.json_response({"status": "not_ready"}, status=503)
 
+    async def _metrics(self, _request: web.Request) -> web.Response:
+        return web.Response(body=REGISTRY.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        provider = self._stats_providers.get(request.match_info["name"])
+        if provider is None:
+            raise web.HTTPNotFound()
+        return web.json_response(provider())
+
     async def start(self) -> None:
         self._runner = web.AppRunner(self._app)
         await self._runner.setup()
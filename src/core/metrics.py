@@ -0,0 +1,220 @@
+"""In-process metrics with Prometheus text exposition.
+
+Metric families are module-level and shared by everything in the process
+(several components in ``all`` mode are told apart by the ``component``
+label). Recording is a dict lookup plus an integer/float update, cheap enough
+for the per-message hot path; ``labels()`` children can be cached by callers.
+"""
+
+import bisect
+from typing import Callable, Generic, TypeVar
+
+# Latency buckets in seconds: 1 ms .. 30 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Histogram:
+    """Fixed-bucket histogram. ``observe`` is O(log buckets) and allocation free."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot: > largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with (+inf, count)."""
+        result: list[tuple[float, int]] = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> dict:
+        """JSON-friendly summary: count, sum and cumulative bucket counts."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {_format_bound(bound): n for bound, n in self.cumulative_counts()},
+        }
+
+
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+
+class MetricFamily(Generic[M]):
+    """A named metric with a fixed set of label names; one child per label-value combination."""
+
+    def __init__(self, kind: str, name: str, help_text: str, labelnames: tuple[str, ...], factory: Callable[[], M]):
+        self.kind = kind
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._factory = factory
+        self._children: dict[tuple[str, ...], M] = {}
+
+    def labels(self, *values: str) -> M:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._factory()
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._children.items():
+            pairs = list(zip(self.labelnames, values))
+            if isinstance(child, Histogram):
+                for bound, count in child.cumulative_counts():
+                    lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _format_bound(bound))])} {count}")
+                lines.append(f"{self.name}_sum{_labels(pairs)} {child.sum}")
+                lines.append(f"{self.name}_count{_labels(pairs)} {child.count}")
+            else:
+                lines.append(f"{self.name}{_labels(pairs)} {child.value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: dict[str, MetricFamily] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> MetricFamily[Counter]:
+        return self._register(MetricFamily("counter", name, help_text, labelnames, Counter))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> MetricFamily[Gauge]:
+        return self._register(MetricFamily("gauge", name, help_text, labelnames, Gauge))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> MetricFamily[Histogram]:
+        return self._register(MetricFamily("histogram", name, help_text, labelnames, lambda: Histogram(buckets)))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            collector()
+        lines: list[str] = []
+        for family in self._families.values():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} already registered")
+        self._families[family.name] = family
+        return family
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), "")}"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Pipeline metrics ---
+
+MESSAGES_PROCESSED = REGISTRY.counter(
+    "docproc_messages_processed_total", "Messages processed successfully", ("component", "stage")
+)
+MESSAGES_FAILED = REGISTRY.counter(
+    "docproc_messages_failed_total",
+    "Messages whose processing raised (then retried, dead-lettered or requeued)",
+    ("component",),
+)
+MESSAGES_RETRIED = REGISTRY.counter(
+    "docproc_messages_retried_total", "Failed messages sent to a retry delay queue", ("component",)
+)
+MESSAGES_DEAD_LETTERED = REGISTRY.counter(
+    "docproc_messages_dead_lettered_total",
+    "Failed messages sent to q.dead_letters (reason: max_attempts or undecodable)",
+    ("component", "reason"),
+)
+PROCESSING_SECONDS = REGISTRY.histogram(
+    "docproc_message_processing_seconds", "Time from delivery to ack per message", ("component",)
+)
+BATCH_PROCESSING_SECONDS = REGISTRY.histogram(
+    "docproc_batch_processing_seconds", "Time to process and ack one batch", ("component",)
+)
+MESSAGES_IN_FLIGHT = REGISTRY.gauge(
+    "docproc_messages_in_flight", "Deliveries currently being processed", ("component",)
+)
+MESSAGES_PAST_DEADLINE = REGISTRY.counter(
+    "docproc_messages_started_past_deadline_total",
+    "Messages whose processing started after their request's SLA deadline",
+    ("component",),
+)
+MESSAGES_PUBLISHED = REGISTRY.counter(
+    "docproc_messages_published_total", "Messages published and confirmed by the broker", ("component", "exchange")
+)
+FANIN_PARTS = REGISTRY.counter("docproc_fanin_parts_total", "Parts counted by a fan-in aggregator", ("component",))
+FANIN_DUPLICATES = REGISTRY.counter(
+    "docproc_fanin_duplicates_total", "Redelivered parts ignored by a fan-in aggregator", ("component",)
+)
+FANIN_COMPLETED = REGISTRY.counter(
+    "docproc_fanin_completed_total", "Fan-in aggregations that received all their parts", ("component",)
+)
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "docproc_result_cache_lookups_total",
+    "Engine result cache lookups (outcome: memory or shared hit, or miss)",
+    ("component", "outcome"),
+)
+
+# --- Database pool metrics (see src/core/database.py) ---
+
+DB_CHECKOUT_WAIT_SECONDS = REGISTRY.histogram(
+    "docproc_db_checkout_wait_seconds", "Time waiting for a pooled DB connection", ("component",)
+)
+DB_QUERY_SECONDS = REGISTRY.histogram("docproc_db_query_seconds", "DB statement latency", ("component",))
+DB_POOL_IN_USE = REGISTRY.gauge("docproc_db_pool_in_use", "Checked-out DB connections", ("component",))
+DB_POOL_OVERFLOW = REGISTRY.gauge("docproc_db_pool_overflow", "DB connections open beyond pool_size", ("component",))
+DB_POOL_SIZE = REGISTRY.gauge("docproc_db_pool_size", "Configured DB pool size", ("component",))
@@ -5,17 +5,18 @@ from datetime import datetime, timezone
 
 from sqlalchemy import (
     ARRAY,
+    REAL,
+    BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
     Index,
     Integer,
-    Real,
     String,
     Text,
     text,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import BIT, JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -76,9 +77,9 @@ class Page(Base):
     status: Mapped[str] = mapped_column(String(50), nullable=False, default="extracted")
     file_storage_path: Mapped[str | None] = mapped_column(String(1000))
     ocr_text: Mapped[str | None] = mapped_column(Text)
-    ocr_confidence: Mapped[float | None] = mapped_column(Real)
+    ocr_confidence: Mapped[float | None] = mapped_column(REAL)
     doc_type: Mapped[str | None] = mapped_column(String(100))
-    classification_confidence: Mapped[float | None] = mapped_column(Real)
+    classification_confidence: Mapped[float | None] = mapped_column(REAL)
     document_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id"))
     metadata_: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
     created_at: Mapped[datetime] = mapped_column(
@@ -108,7 +109,7 @@ class Document(Base):
     page_indices: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
     status: Mapped[str] = mapped_column(String(50), nullable=False, default="created")
     extracted_data: Mapped[dict | None] = mapped_column(JSONB)
-    extraction_confidence: Mapped[float | None] = mapped_column(Real)
+    extraction_confidence: Mapped[float | None] = mapped_column(REAL)
     metadata_: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
@@ -182,10 +183,16 @@ class AggregationState(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     request_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("requests.id"), nullable=False)
     stage: Mapped[str] = mapped_column(String(50), nullable=False)
-    expected_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # NULL while the total is not known yet (e.g. documents still being emitted)
+    expected_count: Mapped[int | None] = mapped_column(Integer)
     received_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
-    received_ids: Mapped[list[uuid.UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)), default=list)
+    # Bit i set = part i received (page_index, or document ordinal); see src/core/aggregation.py
+    received_bitmap: Mapped[str | None] = mapped_column(BIT(varying=True))
     is_complete: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Incremental document emission (classification stage): parts 0..grouped_until-1
+    # already belong to emitted documents, which got ordinals 0..documents_emitted-1
+    grouped_until: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    documents_emitted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
     )
@@ -194,3 +201,62 @@ class AggregationState(Base):
     )
 
     __table_args__ = (Index("idx_agg_state_lookup", "request_id", "stage", unique=True),)
+
+
+class OutboxMessage(Base):
+    """Outgoing pipeline messages written in the same transaction as the stage's DB changes.
+
+    Rows are published and deleted in bulk by the outbox relay.
+    """
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    exchange: Mapped[str] = mapped_column(String(100), nullable=False)
+    routing_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    message: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    source_component: Mapped[str | None] = mapped_column(String(100))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class StageTiming(Base):
+    """One hop of a request through a stage: when it was published, picked up and finished.
+
+    Written in batches by the timeline recorder; read by GET /timeline/{request_id}.
+    """
+
+    __tablename__ = "stage_timings"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    request_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    stage: Mapped[str] = mapped_column(String(100), nullable=False)
+    component: Mapped[str] = mapped_column(String(100), nullable=False)
+    page_index: Mapped[int | None] = mapped_column(Integer)
+    document_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    enqueued_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    dequeued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("idx_stage_timings_request", "request_id"),)
+
+
+class ResultCacheEntry(Base):
+    """Engine result for one stage input (shared tier of src/core/result_cache.py).
+
+    The key hashes the input content and the engine version; expired rows are
+    ignored by lookups and deleted by the SLA monitor.
+    """
+
+    __tablename__ = "result_cache"
+
+    component: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # SHA-256 hex
+    result: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("idx_result_cache_expires", "expires_at"),)
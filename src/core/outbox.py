@@ -0,0 +1,122 @@
+"""Transactional outbox: stage outgoing messages in the DB and relay them to RabbitMQ in bulk."""
+
+import asyncio
+
+import structlog
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.models import OutboxMessage
+from src.core.publisher import Publisher
+from src.core.schemas import PipelineMessage
+
+logger = structlog.get_logger()
+
+
+async def stage_outbox(
+    session: AsyncSession,
+    messages: list[tuple[str, str, PipelineMessage]],
+    source_component: str,
+) -> None:
+    """Insert resolved (exchange, routing_key, message) tuples into the outbox.
+
+    Must be called inside the transaction that holds the stage's DB changes, so
+    that the messages are persisted if and only if that transaction commits.
+    """
+    if not messages:
+        return
+    await session.execute(
+        insert(OutboxMessage),
+        [
+            {
+                "exchange": exchange_name,
+                "routing_key": routing_key,
+                "message": message.model_dump(mode="json"),
+                "source_component": source_component,
+            }
+            for exchange_name, routing_key, message in messages
+        ],
+    )
+
+
+class OutboxRelay:
+    """Drains the outbox table: locks a batch of rows, publishes them, deletes them.
+
+    Batches are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so relays in
+    several processes can drain concurrently. Delivery is at-least-once: a crash
+    after publishing but before the delete commits republishes the batch.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        publisher: Publisher,
+        batch_size: int = 500,
+        poll_interval_s: float = 1.0,
+    ):
+        self._session_factory = session_factory
+        self._publisher = publisher
+        self._batch_size = batch_size
+        self._poll_interval_s = poll_interval_s
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        """Wake the relay up right away (called after a transaction that wrote outbox rows commits)."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop polling after a final drain."""
+        self._stopped = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def drain(self) -> int:
+        """Relay batches until the outbox is empty. Returns the number of messages relayed."""
+        total = 0
+        while True:
+            relayed = await self._relay_batch()
+            total += relayed
+            if relayed < self._batch_size:
+                return total
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("outbox_relay_failed")
+            if self._stopped:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _relay_batch(self) -> int:
+        async with self._session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(OutboxMessage.id, OutboxMessage.exchange, OutboxMessage.routing_key, OutboxMessage.message)
+                    .order_by(OutboxMessage.id)
+                    .limit(self._batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = result.all()
+                if not rows:
+                    return 0
+
+                await self._publisher.publish_many(
+                    [(row.exchange, row.routing_key, PipelineMessage.model_validate(row.message)) for row in rows]
+                )
+                await session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_([row.id for row in rows])))
+
+        logger.debug("outbox_relayed", count=len(rows))
+        return len(rows)
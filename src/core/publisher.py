@@ -0,0 +1,131 @@
+"""Confirmed, pipelined publishing of pipeline messages."""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Optional
+
+import aio_pika
+import structlog
+
+from config.settings import Settings
+from src.core.metrics import MESSAGES_PUBLISHED
+from src.core.rabbitmq import amqp_priority
+from src.core.schemas import PipelineMessage, encode_message
+from src.core.timeline import PUBLISHED_AT_HEADER
+from src.core.transport import Delivery, Transport
+
+logger = structlog.get_logger()
+
+
+class Publisher:
+    """Encodes PipelineMessages and publishes them through a :class:`Transport`.
+
+    Publishes are issued concurrently (bounded by ``max_in_flight``) and every
+    call returns only once the broker has confirmed all of its messages.
+    """
+
+    def __init__(
+        self,
+        source_component: str,
+        transport: Transport,
+        max_in_flight: int = 256,
+        codec: str = "json",
+        compression_threshold: int = 0,
+        compression_level: int = 6,
+    ):
+        self._source_component = source_component
+        self._transport = transport
+        self._codec = codec
+        self._compression_threshold = compression_threshold
+        self._compression_level = compression_level
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    @classmethod
+    def from_settings(cls, source_component: str, settings: Settings, transport: Transport) -> "Publisher":
+        return cls(
+            source_component,
+            transport,
+            max_in_flight=settings.publisher_max_in_flight,
+            codec=settings.message_codec,
+            compression_threshold=settings.compression_threshold_bytes,
+            compression_level=settings.compression_level,
+        )
+
+    def build_message(self, message: PipelineMessage) -> aio_pika.Message:
+        """Encode a PipelineMessage with the configured codec and wrap it in a persistent AMQP message."""
+        body, content_type, content_encoding = encode_message(
+            message,
+            codec=self._codec,
+            compression_threshold=self._compression_threshold,
+            compression_level=self._compression_level,
+        )
+        return aio_pika.Message(
+            body=body,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            message_id=str(uuid.uuid4()),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            priority=amqp_priority(message.priority),
+            headers={
+                "request_id": str(message.request_id),
+                "component": self._source_component,
+                PUBLISHED_AT_HEADER: time.time(),
+            },
+        )
+
+    async def publish(self, exchange_name: str, routing_key: str, message: PipelineMessage) -> None:
+        """Publish one message and wait for the broker confirm."""
+        async with self._semaphore:
+            await self._transport.publish(exchange_name, routing_key, self.build_message(message))
+        MESSAGES_PUBLISHED.labels(self._source_component, exchange_name).inc()
+        logger.debug(
+            "message_published",
+            exchange=exchange_name,
+            routing_key=routing_key,
+            request_id=str(message.request_id),
+        )
+
+    async def republish(
+        self,
+        exchange_name: str,
+        routing_key: str,
+        delivery: Delivery,
+        headers: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Publish a received delivery again, body untouched, and wait for the broker confirm.
+
+        Keeps the encoding and priority; drops the broker's ``x-death``
+        history, stamps a new publish time and applies ``headers`` on top.
+        """
+        merged = {key: value for key, value in (delivery.headers or {}).items() if key != "x-death"}
+        merged.update(headers or {})
+        merged[PUBLISHED_AT_HEADER] = time.time()
+        message = aio_pika.Message(
+            body=delivery.body,
+            content_type=delivery.content_type,
+            content_encoding=delivery.content_encoding,
+            message_id=str(uuid.uuid4()),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            priority=delivery.priority,
+            headers=merged,
+        )
+        async with self._semaphore:
+            await self._transport.publish(exchange_name, routing_key, message)
+        MESSAGES_PUBLISHED.labels(self._source_component, exchange_name).inc()
+
+    async def publish_many(self, items: list[tuple[str, str, PipelineMessage]]) -> None:
+        """Publish (exchange, routing_key, message) tuples concurrently; wait for every confirm.
+
+        Raises the first publish error once all publishes have settled.
+        """
+        if not items:
+            return
+        results = await asyncio.gather(
+            *(self.publish(exchange_name, routing_key, message) for exchange_name, routing_key, message in items),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.error("publish_failed", failed=len(errors), total=len(items))
+            raise errors[0]
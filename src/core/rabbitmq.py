@@ -1,6 +1,7 @@
 """RabbitMQ connection management and exchange/queue declaration."""
 
 import aio_pika
+import aiormq
 import structlog
 
 logger = structlog.get_logger()
@@ -27,16 +28,91 @@ QUEUE_BINDINGS: dict[str, tuple[str, str]] = {
     "q.dead_letters": ("doc.dlx", ""),
 }
 
+# Retry delay tiers in ms (x5 per tier). Each tier is a fanout exchange plus a queue
+# whose TTL dead-letters the message back to doc.direct with its original routing key.
+RETRY_DELAYS_MS = (1_000, 5_000, 25_000, 125_000)
+
+
+def retry_exchange(delay_ms: int) -> str:
+    return f"doc.retry.{delay_ms // 1000}s"
+
+
+def retry_queue(delay_ms: int) -> str:
+    return f"q.retry.{delay_ms // 1000}s"
+
+
+for _delay_ms in RETRY_DELAYS_MS:
+    EXCHANGES[retry_exchange(_delay_ms)] = aio_pika.ExchangeType.FANOUT
+    QUEUE_BINDINGS[retry_queue(_delay_ms)] = (retry_exchange(_delay_ms), "")
+RETRY_QUEUE_DELAYS_MS = {retry_queue(delay_ms): delay_ms for delay_ms in RETRY_DELAYS_MS}
+
+# Fan-in queues that can be split into shards, each consumed by a single aggregator replica.
+# A consistent-hash exchange (rabbitmq_consistent_hash_exchange plugin) bound to doc.direct
+# spreads their messages over the shard queues by request_id, so every part of a request
+# reaches the same shard and its aggregation_state row has a single writer.
+SHARDABLE_QUEUES = ("q.classification_aggregator", "q.extraction_aggregator")
+SHARD_EXCHANGE_TYPE = "x-consistent-hash"
+SHARD_HASH_HEADER = "request_id"
+
+
+def shard_exchange(queue_name: str) -> str:
+    return f"doc.shard.{queue_name.removeprefix('q.')}"
+
+
+def shard_queue(queue_name: str, shard: int) -> str:
+    return f"{queue_name}.{shard}"
+
+
+# Headers of retried and dead-lettered messages
+ATTEMPT_HEADER = "x-attempt"  # 1-based attempt number of the delivery (absent = 1)
+LAST_ERROR_HEADER = "x-last-error"
+DEAD_LETTER_REASON_HEADER = "x-dead-letter-reason"  # max_attempts | undecodable (broker dead letters: see x-death)
+FAILED_COMPONENT_HEADER = "x-failed-component"
+ORIGINAL_EXCHANGE_HEADER = "x-original-exchange"
+ORIGINAL_ROUTING_KEY_HEADER = "x-original-routing-key"
+
+
+def retry_delay_ms(attempt: int) -> int:
+    """Delay before retrying a message whose ``attempt``-th delivery failed (the last tier repeats)."""
+    return RETRY_DELAYS_MS[min(max(attempt, 1), len(RETRY_DELAYS_MS)) - 1]
+
+
+# Pipeline priorities follow Request.priority: 0 = most urgent .. MAX_PRIORITY = least urgent
+MAX_PRIORITY = 9
+DEFAULT_PRIORITY = 5
+
 # Default queue arguments
 DEFAULT_QUEUE_ARGS = {
     "x-dead-letter-exchange": "doc.dlx",
     "x-message-ttl": 300_000,  # 5 minutes
+    "x-max-priority": MAX_PRIORITY,
 }
 
 
-async def setup_rabbitmq_topology(channel: aio_pika.Channel) -> dict[str, aio_pika.Exchange]:
+def amqp_priority(priority: int | None) -> int:
+    """Map a pipeline priority (lower = more urgent) to an AMQP priority (higher = served first)."""
+    if priority is None:
+        priority = DEFAULT_PRIORITY
+    return MAX_PRIORITY - min(max(priority, 0), MAX_PRIORITY)
+
+
+def queue_arguments(queue_name: str) -> dict:
+    """Declaration arguments for a pipeline queue."""
+    if queue_name in RETRY_QUEUE_DELAYS_MS:
+        # Nobody consumes a delay queue: its messages expire back into the pipeline
+        return {"x-message-ttl": RETRY_QUEUE_DELAYS_MS[queue_name], "x-dead-letter-exchange": "doc.direct"}
+    # Dead letter queue has no DLX of its own
+    return {} if queue_name == "q.dead_letters" else dict(DEFAULT_QUEUE_ARGS)
+
+
+async def setup_rabbitmq_topology(
+    channel: aio_pika.Channel, aggregation_shards: int = 0
+) -> dict[str, aio_pika.Exchange]:
     """Declare all exchanges and queues for the pipeline.
 
+    With ``aggregation_shards`` > 0 the fan-in queues in ``SHARDABLE_QUEUES``
+    are fed through their shard queues instead (see :func:`declare_shards`).
+
     Returns a dict of exchange_name -> Exchange objects.
     """
     exchanges: dict[str, aio_pika.Exchange] = {}
@@ -49,11 +125,47 @@ async def setup_rabbitmq_topology(channel: aio_pika.Channel) -> dict[str, aio_pi
 
     # Declare queues and bind them
     for queue_name, (exchange_name, routing_key) in QUEUE_BINDINGS.items():
-        # Dead letter queue has no DLX of its own
-        args = {} if queue_name == "q.dead_letters" else dict(DEFAULT_QUEUE_ARGS)
-
-        queue = await channel.declare_queue(queue_name, durable=True, arguments=args)
+        try:
+            queue = await channel.declare_queue(queue_name, durable=True, arguments=queue_arguments(queue_name))
+        except aiormq.exceptions.ChannelPreconditionFailed:
+            # Declared earlier with other arguments (e.g. before priorities): keep using it as it is
+            logger.error(
+                "queue_arguments_mismatch",
+                queue=queue_name,
+                hint="drain it and run `make migrate-queues` to redeclare it",
+            )
+            await channel.reopen()
+            queue = await channel.declare_queue(queue_name, passive=True)
+        if aggregation_shards and queue_name in SHARDABLE_QUEUES:
+            # Kept (and drained by the aggregators) but no longer fed: the shards are
+            await queue.unbind(exchanges[exchange_name], routing_key=routing_key)
+            continue
         await queue.bind(exchanges[exchange_name], routing_key=routing_key)
         logger.info("queue_declared", queue=queue_name, exchange=exchange_name, routing_key=routing_key)
 
+    if aggregation_shards:
+        await declare_shards(channel, exchanges, aggregation_shards)
     return exchanges
+
+
+async def declare_shards(channel: aio_pika.Channel, exchanges: dict[str, aio_pika.Exchange], shards: int) -> None:
+    """Feed each shardable fan-in queue's routing key to ``shards`` queues through a consistent-hash exchange.
+
+    Shard queues are single-active-consumer: if two replicas ever consume the
+    same shard, only one gets its messages, and the other takes over when the
+    first one goes away.
+    """
+    for queue_name in SHARDABLE_QUEUES:
+        exchange_name, routing_key = QUEUE_BINDINGS[queue_name]
+        hash_exchange = await channel.declare_exchange(
+            shard_exchange(queue_name),
+            SHARD_EXCHANGE_TYPE,
+            durable=True,
+            arguments={"hash-header": SHARD_HASH_HEADER},
+        )
+        await hash_exchange.bind(exchanges[exchange_name], routing_key=routing_key)
+        arguments = {**queue_arguments(queue_name), "x-single-active-consumer": True}
+        for shard in range(shards):
+            queue = await channel.declare_queue(shard_queue(queue_name, shard), durable=True, arguments=arguments)
+            await queue.bind(hash_exchange, routing_key="1")  # Binding key = weight of the shard in the hash ring
+        logger.info("shards_declared", queue=queue_name, exchange=hash_exchange.name, shards=shards)
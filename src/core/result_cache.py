@@ -0,0 +1,107 @@
+"""Engine result cache: an in-process LRU in front of a ``result_cache`` table shared by every replica."""
+
+import asyncio
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import RESULT_CACHE_LOOKUPS
+from src.core.models import ResultCacheEntry
+
+
+def normalize_text(value: str) -> str:
+    """Unicode NFKC with whitespace runs collapsed, so re-OCRed or re-flowed copies of a text hash alike."""
+    return " ".join(unicodedata.normalize("NFKC", value).split())
+
+
+def _file_digest(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").digest()
+
+
+class ResultCache:
+    """Results of one component's engine, keyed by a hash of the engine version and the stage input.
+
+    Lookups try the in-process LRU first, then the shared table; a shared hit
+    is copied into the LRU. Entries expire ``ttl_s`` after they are written:
+    lookups ignore expired rows and the SLA monitor deletes them. A new
+    engine version changes every key, so upgrades never see old results.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, component: str, engine_version: str, memory_entries: int, ttl_s: int):
+        self._component = component
+        self._engine_version = engine_version
+        self._memory_entries = memory_entries
+        self._ttl = timedelta(seconds=ttl_s)
+        self._memory: OrderedDict[str, tuple[datetime, Any]] = OrderedDict()
+        self._memory_hits = RESULT_CACHE_LOOKUPS.labels(component, "memory")
+        self._shared_hits = RESULT_CACHE_LOOKUPS.labels(component, "shared")
+        self._misses = RESULT_CACHE_LOOKUPS.labels(component, "miss")
+
+    def key(self, *parts: str | bytes) -> str:
+        """SHA-256 hex of the engine version and ``parts`` (length-prefixed, so part boundaries count)."""
+        digest = hashlib.sha256(self._engine_version.encode())
+        for part in parts:
+            data = part.encode() if isinstance(part, str) else part
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    async def file_key(self, path: str, *parts: str | bytes) -> str:
+        """Key of a file's bytes (hashed in a worker thread, without loading the file whole) and ``parts``."""
+        return self.key(await asyncio.to_thread(_file_digest, path), *parts)
+
+    async def get(self, session: AsyncSession, key: str) -> Optional[Any]:
+        """The cached result for ``key``, or None on a miss."""
+        now = datetime.now(timezone.utc)
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._memory_hits.inc()
+                return value
+            del self._memory[key]
+
+        result = await session.execute(
+            select(ResultCacheEntry.result, ResultCacheEntry.expires_at).where(
+                ResultCacheEntry.component == self._component,
+                ResultCacheEntry.key == key,
+                ResultCacheEntry.expires_at > now,
+            )
+        )
+        row = result.first()
+        if row is None:
+            self._misses.inc()
+            return None
+        self._shared_hits.inc()
+        self._remember(key, row.result, row.expires_at)
+        return row.result
+
+    async def put(self, session: AsyncSession, key: str, value: Any) -> None:
+        """Store a result in both tiers; the shared row is written in the caller's transaction."""
+        now = datetime.now(timezone.utc)
+        expires_at = now + self._ttl
+        self._remember(key, value, expires_at)
+        statement = insert(ResultCacheEntry).values(
+            component=self._component, key=key, result=value, created_at=now, expires_at=expires_at
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ResultCacheEntry.component, ResultCacheEntry.key],
+                set_={"result": statement.excluded.result, "created_at": now, "expires_at": expires_at},
+            )
+        )
+
+    def _remember(self, key: str, value: Any, expires_at: datetime) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
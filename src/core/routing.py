@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from src.core.schemas import PipelineMessage
-from src.core.workflow_loader import WorkflowLoader
+from src.core.workflow_loader import CompiledWorkflow, StageConfig, WorkflowLoader
 
 # Sentinel routing keys returned by components
 NEXT = "__next__"
@@ -19,34 +19,72 @@ def resolve_routing(
     """Resolve a sentinel routing key to a concrete (exchange, routing_key, message).
 
     Returns ``None`` when the sentinel is :data:`NEXT` but the current stage is
-    terminal (last stage in the workflow).
+    terminal (last stage in the workflow, or every later stage is skipped by
+    its ``when`` conditions).
 
     For non-sentinel routing keys the message is returned unchanged (backward
     compatibility).
     """
-    workflow_name = message.workflow_name
+    workflow = workflow_loader.compiled(message.workflow_name, message.workflow_version)
     current_stage_name = message.current_stage
 
     if current_stage_name is None:
         # Fallback: infer current stage from component_name
-        stage = workflow_loader.get_stage_by_component(workflow_name, component_name)
-        current_stage_name = stage.name
+        current_stage_name = _stage_by_component(workflow, component_name).name
 
     if sentinel == NEXT:
-        next_stage = workflow_loader.get_next_stage(workflow_name, current_stage_name)
+        if current_stage_name not in workflow.next_stages:
+            raise ValueError(f"Stage '{current_stage_name}' not found in workflow '{workflow.name}'")
+        # Stages whose `when` conditions the message does not meet are skipped
+        next_stage = workflow.next_applicable_stage(current_stage_name, message)
         if next_stage is None:
             return None  # Terminal stage, nothing to publish
         updated_msg = message.model_copy(update={"current_stage": next_stage.name})
         return ("doc.direct", next_stage.routing_key, updated_msg)
 
     if sentinel == BACKOFFICE:
-        stage = workflow_loader.get_stage(workflow_name, current_stage_name)
-        if not stage.backoffice_queue:
+        backoffice_queue = workflow.backoffice_queues.get(current_stage_name)
+        if not backoffice_queue:
             raise ValueError(
                 f"Stage '{current_stage_name}' has no backoffice_queue configured "
                 f"but component tried to route to {BACKOFFICE}"
             )
-        return ("doc.backoffice", stage.backoffice_queue, message)
+        return ("doc.backoffice", backoffice_queue, message)
 
     # Not a sentinel -- pass through as-is
     return ("doc.direct", sentinel, message)
+
+
+def resolve_fused_stage(
+    sentinel: str,
+    message: PipelineMessage,
+    workflow_loader: WorkflowLoader,
+    component_name: str,
+) -> StageConfig | None:
+    """Return the next stage when it is fused into the current one (``fuse_with``), else ``None``.
+
+    A fused stage runs in the current component's process and transaction, so
+    the message must not be published for it.
+    """
+    if sentinel != NEXT:
+        return None
+    workflow = workflow_loader.compiled(message.workflow_name, message.workflow_version)
+    if message.current_stage is None:
+        stage = _stage_by_component(workflow, component_name)
+    else:
+        stage = workflow.stages.get(message.current_stage)
+        if stage is None:
+            raise ValueError(f"Stage '{message.current_stage}' not found in workflow '{workflow.name}'")
+    if stage.fuse_with is None:
+        return None
+    fused_stage = workflow.stages[stage.fuse_with]
+    if not workflow.applies_to(fused_stage, message):
+        return None  # Skipped: resolve_routing moves on to the stage after it
+    return fused_stage
+
+
+def _stage_by_component(workflow: CompiledWorkflow, component_name: str) -> StageConfig:
+    stage = workflow.stages_by_component.get(component_name)
+    if stage is None:
+        raise ValueError(f"No stage with component '{component_name}' in workflow '{workflow.name}'")
+    return stage
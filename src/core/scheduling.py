@@ -0,0 +1,74 @@
+"""Earliest-deadline-first admission for a component's concurrency slots."""
+
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+# Messages without a deadline sort after every on-time message with one
+_NO_DEADLINE = datetime.max.replace(tzinfo=timezone.utc)
+
+
+class DeadlineScheduler:
+    """A concurrency limiter that hands each free slot to the waiter with the earliest deadline.
+
+    Used instead of ``asyncio.Semaphore`` in EDF mode: deliveries prefetched
+    beyond the concurrency limit wait here, and the most urgent one runs
+    next. Deliveries whose deadline has already passed go behind every
+    on-time one (earliest breach first), since they can no longer make it.
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters: list[tuple[tuple[int, datetime], int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[datetime]) -> AsyncIterator[None]:
+        await self.acquire(deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, deadline: Optional[datetime]) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self._key(deadline), next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # Got the slot just as we were cancelled: pass it on
+            raise
+
+    def release(self) -> None:
+        now = datetime.now(timezone.utc)
+        while self._waiters:
+            key, sequence, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # Cancelled while waiting
+            breached, deadline = key
+            if not breached and deadline < now:
+                # Breached while waiting: requeue it behind the on-time waiters
+                heapq.heappush(self._waiters, ((1, deadline), sequence, future))
+                continue
+            future.set_result(None)
+            return
+        self._free += 1
+
+    @staticmethod
+    def _key(deadline: Optional[datetime]) -> tuple[int, datetime]:
+        if deadline is None:
+            return (0, _NO_DEADLINE)
+        if deadline.tzinfo is None:
+            deadline = deadline.replace(tzinfo=timezone.utc)
+        return (1 if deadline < datetime.now(timezone.utc) else 0, deadline)
@@ -1,12 +1,22 @@
-"""Universal message envelope and shared Pydantic schemas."""
+"""Universal message envelope, its wire codecs and shared Pydantic schemas."""
 
 import uuid as uuid_mod
+import zlib
 from datetime import datetime, timezone
 from typing import Any, Optional
 from uuid import UUID
 
+import msgpack
 from pydantic import BaseModel, Field
 
+# Wire formats, selected from the AMQP content_type / content_encoding properties
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+DEFLATE_ENCODING = "deflate"
+CODECS = {"json": JSON_CONTENT_TYPE, "msgpack": MSGPACK_CONTENT_TYPE}
+
+_MSGPACK_UUID_EXT = 1
+
 
 class PipelineMessage(BaseModel):
     """Message envelope carried through every RabbitMQ queue in the pipeline."""
@@ -17,8 +27,10 @@ class PipelineMessage(BaseModel):
 
     # Workflow
     workflow_name: str = "default"
+    workflow_version: Optional[int] = None  # Pinned by the workflow router (None = current version)
     current_stage: Optional[str] = None
     deadline_utc: Optional[datetime] = None
+    priority: Optional[int] = None  # 0 = most urgent .. 9 (None = workflow default); AMQP priority on publish
 
     # Page-level context (set by splitter, carried through page stages)
     page_index: Optional[int] = None
@@ -28,6 +40,7 @@ class PipelineMessage(BaseModel):
     # Document-level context (set by classification aggregator)
     document_id: Optional[UUID] = None
     document_count: Optional[int] = None
+    document_index: Optional[int] = None  # Ordinal of the document within the request (fan-in deduplication)
 
     # Flexible payload for stage-specific data
     payload: dict[str, Any] = Field(default_factory=dict)
@@ -37,6 +50,75 @@ class PipelineMessage(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, UUID):
+        return msgpack.ExtType(_MSGPACK_UUID_EXT, obj.bytes)
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            return obj.isoformat()
+        return msgpack.Timestamp.from_datetime(obj)
+    return str(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _MSGPACK_UUID_EXT:
+        return UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+def encode_message(
+    message: PipelineMessage,
+    codec: str = "json",
+    compression_threshold: int = 0,
+    compression_level: int = 6,
+) -> tuple[bytes, str, Optional[str]]:
+    """Serialize a message for the wire.
+
+    Args:
+        message: Message to encode.
+        codec: "json" or "msgpack" (UUIDs as 16-byte extensions, datetimes as timestamps).
+        compression_threshold: Deflate bodies of at least this many bytes (0 = never).
+        compression_level: zlib compression level.
+
+    Returns:
+        (body, content_type, content_encoding); content_encoding is None when not compressed.
+    """
+    if codec == "msgpack":
+        body = msgpack.packb(message.model_dump(), default=_msgpack_default, use_bin_type=True)
+    elif codec == "json":
+        body = message.model_dump_json().encode()
+    else:
+        raise ValueError(f"Unknown message codec '{codec}'. Available: {list(CODECS)}")
+
+    content_encoding = None
+    if compression_threshold and len(body) >= compression_threshold:
+        body = zlib.compress(body, compression_level)
+        content_encoding = DEFLATE_ENCODING
+    return body, CODECS[codec], content_encoding
+
+
+def decode_message(
+    body: bytes,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> PipelineMessage:
+    """Deserialize a message from the wire, whatever codec the producer used.
+
+    Messages without a content type are treated as plain JSON (pre-codec producers).
+    """
+    if content_encoding == DEFLATE_ENCODING:
+        body = zlib.decompress(body)
+    elif content_encoding:
+        raise ValueError(f"Unsupported content encoding '{content_encoding}'")
+
+    if content_type == MSGPACK_CONTENT_TYPE:
+        data = msgpack.unpackb(body, ext_hook=_msgpack_ext_hook, timestamp=3, strict_map_key=False)
+        return PipelineMessage.model_validate(data)
+    if content_type in (None, "", JSON_CONTENT_TYPE):
+        return PipelineMessage.model_validate_json(body)
+    raise ValueError(f"Unsupported content type '{content_type}'")
+
+
 class JobStatusResponse(BaseModel):
     """Response for GET /status/{request_id}."""
 
@@ -57,3 +139,45 @@ class ProcessResponse(BaseModel):
 
     request_id: UUID
     status: str = "received"
+
+
+class StageHop(BaseModel):
+    """One message's pass through a stage, as shown by GET /timeline/{request_id}."""
+
+    stage: str
+    component: str
+    page_index: Optional[int] = None
+    document_id: Optional[UUID] = None
+    enqueued_at: Optional[datetime] = None
+    dequeued_at: datetime
+    completed_at: datetime
+    queue_wait_s: Optional[float] = None  # enqueued -> dequeued
+    service_s: float  # dequeued -> completed
+    handoff_s: Optional[float] = None  # upstream completed -> enqueued (outbox relay delay); critical path only
+
+
+class StageSummary(BaseModel):
+    """All hops of one stage: fan-out width and the worst queue wait / service time."""
+
+    stage: str
+    hops: int
+    first_dequeued_at: datetime
+    last_completed_at: datetime
+    span_s: float
+    max_queue_wait_s: Optional[float] = None
+    max_service_s: float
+
+
+class TimelineResponse(BaseModel):
+    """Response for GET /timeline/{request_id}."""
+
+    request_id: UUID
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    hops: list[StageHop]
+    stages: list[StageSummary]
+    critical_path: list[StageHop]
+    critical_queue_wait_s: float
+    critical_service_s: float
+    critical_handoff_s: float
+    bottleneck_stage: Optional[str] = None
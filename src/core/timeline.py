@@ -0,0 +1,199 @@
+"""Per-request stage timeline: batched recording of hop timings and critical-path analysis."""
+
+import asyncio
+import bisect
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID
+
+import structlog
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.models import StageTiming
+from src.core.schemas import PipelineMessage, StageHop, StageSummary, TimelineResponse
+
+logger = structlog.get_logger()
+
+# AMQP header with the publish time (epoch seconds), stamped by the Publisher
+PUBLISHED_AT_HEADER = "published_at"
+
+
+def published_at(headers: Optional[dict[str, Any]]) -> Optional[datetime]:
+    """When the delivery was published, from its header (None for messages from older publishers)."""
+    value = (headers or {}).get(PUBLISHED_AT_HEADER)
+    if value is None:
+        return None
+    return datetime.fromtimestamp(float(value), tz=timezone.utc)
+
+
+class TimelineRecorder:
+    """Buffers stage timings in memory and inserts them in bulk, off the message path.
+
+    Timings are diagnostics: if the buffer overflows the oldest entries are
+    dropped, and a failed insert is logged and discarded rather than retried.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int = 500,
+        flush_interval_s: float = 1.0,
+        max_buffer: int = 20_000,
+    ):
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._flush_interval_s = flush_interval_s
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=max_buffer)
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def record(
+        self,
+        message: PipelineMessage,
+        component: str,
+        enqueued_at: Optional[datetime],
+        dequeued_at: datetime,
+        completed_at: datetime,
+    ) -> None:
+        self._buffer.append(
+            {
+                "request_id": message.request_id,
+                "stage": message.current_stage or component,
+                "component": component,
+                "page_index": message.page_index,
+                "document_id": message.document_id,
+                "enqueued_at": enqueued_at,
+                "dequeued_at": dequeued_at,
+                "completed_at": completed_at,
+            }
+        )
+        if len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop after flushing everything still buffered."""
+        self._stopped = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            while self._buffer:
+                await self._flush()
+                if len(self._buffer) < self._batch_size and not self._stopped:
+                    break
+            if self._stopped:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _flush(self) -> None:
+        rows = [self._buffer.popleft() for _ in range(min(self._batch_size, len(self._buffer)))]
+        try:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    await session.execute(insert(StageTiming), rows)
+        except Exception:
+            logger.exception("timeline_flush_failed", dropped=len(rows))
+
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round((end - start).total_seconds(), 6)
+
+
+def build_timeline(
+    request_id: UUID,
+    created_at: datetime,
+    completed_at: Optional[datetime],
+    timings: list[StageTiming],
+) -> TimelineResponse:
+    """Turn a request's stage timings into hops, per-stage summaries and its critical path.
+
+    The critical path is walked backwards from the hop that finished last: each
+    hop's predecessor is the latest hop that completed before it was published
+    (for a fan-in, the last part to arrive) and strictly before it completed, so
+    the walk ends even with skewed pod clocks or zero-length hops. Its queue
+    wait, service time and outbox handoff are what the request actually waited
+    for.
+    """
+    hops = sorted(
+        (
+            StageHop(
+                stage=t.stage,
+                component=t.component,
+                page_index=t.page_index,
+                document_id=t.document_id,
+                enqueued_at=t.enqueued_at,
+                dequeued_at=t.dequeued_at,
+                completed_at=t.completed_at,
+                queue_wait_s=_seconds(t.enqueued_at, t.dequeued_at),
+                service_s=_seconds(t.dequeued_at, t.completed_at),
+            )
+            for t in timings
+        ),
+        key=lambda hop: hop.dequeued_at,
+    )
+
+    by_stage: dict[str, list[StageHop]] = {}
+    for hop in hops:
+        by_stage.setdefault(hop.stage, []).append(hop)
+    stages = [
+        StageSummary(
+            stage=stage,
+            hops=len(stage_hops),
+            first_dequeued_at=min(h.dequeued_at for h in stage_hops),
+            last_completed_at=max(h.completed_at for h in stage_hops),
+            span_s=_seconds(min(h.dequeued_at for h in stage_hops), max(h.completed_at for h in stage_hops)),
+            max_queue_wait_s=max((h.queue_wait_s for h in stage_hops if h.queue_wait_s is not None), default=None),
+            max_service_s=max(h.service_s for h in stage_hops),
+        )
+        for stage, stage_hops in by_stage.items()
+    ]
+
+    critical_path: list[StageHop] = []
+    if hops:
+        by_completion = sorted(hops, key=lambda hop: hop.completed_at)
+        completion_times = [hop.completed_at for hop in by_completion]
+        position = len(by_completion) - 1
+        current = by_completion[position]
+        while True:
+            # Clocks of different pods can be skewed: a hop cannot start after it completed
+            started = min(current.enqueued_at or current.dequeued_at, current.completed_at)
+            # Only hops that completed strictly before the current one can precede it
+            earlier = bisect.bisect_left(completion_times, current.completed_at, 0, position)
+            index = bisect.bisect_right(completion_times, started, 0, earlier)
+            if index == 0:
+                critical_path.append(current)
+                break
+            position = index - 1
+            predecessor = by_completion[position]
+            critical_path.append(current.model_copy(update={"handoff_s": _seconds(predecessor.completed_at, started)}))
+            current = predecessor
+        critical_path.reverse()
+
+    bottleneck = max(critical_path, key=lambda hop: (hop.queue_wait_s or 0) + hop.service_s, default=None)
+    return TimelineResponse(
+        request_id=request_id,
+        created_at=created_at,
+        completed_at=completed_at,
+        hops=hops,
+        stages=stages,
+        critical_path=critical_path,
+        critical_queue_wait_s=round(sum(h.queue_wait_s or 0 for h in critical_path), 6),
+        critical_service_s=round(sum(h.service_s for h in critical_path), 6),
+        critical_handoff_s=round(sum(h.handoff_s or 0 for h in critical_path), 6),
+        bottleneck_stage=bottleneck.stage if bottleneck else None,
+    )
@@ -0,0 +1,457 @@
+"""Message transport: RabbitMQ (aio_pika) or an in-process broker for single-process deployments."""
+
+import abc
+import asyncio
+import dataclasses
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Protocol
+
+import aio_pika
+import structlog
+
+from config.settings import Settings
+from src.core.rabbitmq import EXCHANGES, QUEUE_BINDINGS, queue_arguments, setup_rabbitmq_topology
+
+logger = structlog.get_logger()
+
+
+class Delivery(Protocol):
+    """What a consumer callback receives: ``aio_pika.IncomingMessage`` or :class:`InMemoryDelivery`."""
+
+    body: bytes
+    content_type: Optional[str]
+    content_encoding: Optional[str]
+    headers: dict[str, Any]
+    priority: Optional[int]
+    consumer_tag: Optional[str]
+    delivery_tag: Optional[int]
+    redelivered: Optional[bool]
+
+    def process(self, requeue: bool = False, ignore_processed: bool = False) -> Any: ...
+
+    async def ack(self, multiple: bool = False) -> None: ...
+
+    async def nack(self, multiple: bool = False, requeue: bool = True) -> None: ...
+
+
+ConsumerCallback = Callable[[Any], Awaitable[None]]
+
+
+class UnroutableError(Exception):
+    """A published message matched no queue binding."""
+
+
+class Transport(abc.ABC):
+    """Declares the pipeline topology, consumes queues and publishes messages."""
+
+    @abc.abstractmethod
+    async def connect(self) -> None:
+        """Connect and declare the topology (idempotent)."""
+
+    @abc.abstractmethod
+    async def consume(self, queue_name: str, callback: ConsumerCallback, prefetch_count: int) -> str:
+        """Start delivering messages from ``queue_name`` to ``callback``. Returns a consumer tag."""
+
+    @abc.abstractmethod
+    async def cancel(self, consumer_tag: str) -> None:
+        """Stop a consumer. Deliveries already handed out can still be acked."""
+
+    @abc.abstractmethod
+    async def publish(self, exchange_name: str, routing_key: str, message: aio_pika.Message) -> None:
+        """Publish a message; returns once the broker has accepted it."""
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        """Release connections and consumers."""
+
+
+def create_transport(settings: Settings) -> Transport:
+    """Build the transport selected by ``settings.transport`` ("amqp" or "memory")."""
+    if settings.transport == "amqp":
+        return AmqpTransport(
+            settings.rabbitmq_url,
+            publisher_channels=settings.publisher_channels,
+            aggregation_shards=settings.aggregation_shards,
+        )
+    if settings.transport == "memory":
+        return InMemoryTransport(get_memory_broker())
+    raise ValueError(f"Unknown transport: '{settings.transport}'. Available: ['amqp', 'memory']")
+
+
+# ---------------------------------------------------------------------------
+# RabbitMQ
+# ---------------------------------------------------------------------------
+
+
+class AmqpTransport(Transport):
+    """RabbitMQ transport.
+
+    Each consumer gets its own channel (so prefetch is per consumer) and
+    publishes go round-robin over a small pool of channels with publisher
+    confirms, separate from the consuming channels so they are not throttled by
+    consumer flow control.
+    """
+
+    def __init__(self, url: str, publisher_channels: int = 2, aggregation_shards: int = 0):
+        self._url = url
+        self._aggregation_shards = aggregation_shards
+        self._pool_size = max(1, publisher_channels)
+        self._connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self._publish_exchanges: list[dict[str, aio_pika.abc.AbstractExchange]] = []
+        self._next_index = itertools.cycle(range(self._pool_size))
+        self._queues: dict[str, aio_pika.abc.AbstractQueue] = {}
+
+    async def connect(self) -> None:
+        self._connection = await aio_pika.connect_robust(self._url)
+        channel = await self._connection.channel()
+        await setup_rabbitmq_topology(channel, self._aggregation_shards)
+        await channel.close()
+
+        for _ in range(self._pool_size):
+            channel = await self._connection.channel(publisher_confirms=True)
+            self._publish_exchanges.append({name: await channel.get_exchange(name) for name in EXCHANGES})
+        logger.info("amqp_transport_connected", publisher_channels=self._pool_size)
+
+    async def consume(self, queue_name: str, callback: ConsumerCallback, prefetch_count: int) -> str:
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=prefetch_count)
+        queue = await channel.get_queue(queue_name)
+        consumer_tag = await queue.consume(callback)
+        self._queues[consumer_tag] = queue
+        return consumer_tag
+
+    async def cancel(self, consumer_tag: str) -> None:
+        queue = self._queues.pop(consumer_tag)
+        await queue.cancel(consumer_tag)
+
+    async def publish(self, exchange_name: str, routing_key: str, message: aio_pika.Message) -> None:
+        exchange = self._publish_exchanges[next(self._next_index)][exchange_name]
+        await exchange.publish(message, routing_key=routing_key)
+
+    async def close(self) -> None:
+        if self._connection and not self._connection.is_closed:
+            await self._connection.close()
+        self._publish_exchanges.clear()
+        self._queues.clear()
+
+
+# ---------------------------------------------------------------------------
+# In-process broker
+# ---------------------------------------------------------------------------
+
+
+@dataclasses.dataclass
+class _Envelope:
+    """A message sitting in an in-memory queue."""
+
+    body: bytes
+    content_type: Optional[str]
+    content_encoding: Optional[str]
+    headers: dict[str, Any]
+    priority: Optional[int]
+    message_id: Optional[str]
+    exchange: str
+    routing_key: str
+    expires_at: Optional[float] = None
+    redelivered: bool = False
+
+
+class InMemoryDelivery:
+    """Mirrors the parts of ``aio_pika.IncomingMessage`` the components use."""
+
+    def __init__(self, consumer: "_MemoryConsumer", envelope: _Envelope, delivery_tag: int):
+        self._consumer = consumer
+        self.envelope = envelope
+        self.consumer_tag = consumer.tag
+        self.delivery_tag = delivery_tag
+        self.body = envelope.body
+        self.content_type = envelope.content_type
+        self.content_encoding = envelope.content_encoding
+        self.headers = envelope.headers
+        self.priority = envelope.priority
+        self.message_id = envelope.message_id
+        self.exchange = envelope.exchange
+        self.routing_key = envelope.routing_key
+        self.redelivered = envelope.redelivered
+        self.processed = False
+
+    async def ack(self, multiple: bool = False) -> None:
+        self._consumer.settle(self.delivery_tag, multiple=multiple, requeue=None)
+
+    async def nack(self, multiple: bool = False, requeue: bool = True) -> None:
+        self._consumer.settle(self.delivery_tag, multiple=multiple, requeue=requeue)
+
+    async def reject(self, requeue: bool = False) -> None:
+        self._consumer.settle(self.delivery_tag, multiple=False, requeue=requeue)
+
+    @asynccontextmanager
+    async def process(self, requeue: bool = False, ignore_processed: bool = False) -> AsyncIterator["InMemoryDelivery"]:
+        """Ack on success, reject on error (same semantics as aio_pika).
+
+        Deliveries settled inside the block are always left alone, so
+        ``ignore_processed`` is accepted only for interface compatibility.
+        """
+        try:
+            yield self
+        except BaseException:
+            if not self.processed:
+                await self.reject(requeue=requeue)
+            raise
+        if not self.processed:
+            await self.ack()
+
+
+class _MessageBuffer:
+    """Ready messages of a queue: FIFO per priority level, highest level served first.
+
+    With ``max_priority`` 0 it is a plain FIFO. Priorities above the maximum
+    count as the maximum, like in a RabbitMQ priority queue.
+    """
+
+    def __init__(self, max_priority: int = 0):
+        self._levels: list[deque[_Envelope]] = [deque() for _ in range(max_priority + 1)]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _level(self, envelope: _Envelope) -> deque[_Envelope]:
+        return self._levels[min(max(envelope.priority or 0, 0), len(self._levels) - 1)]
+
+    def append(self, envelope: _Envelope) -> None:
+        self._level(envelope).append(envelope)
+        self._size += 1
+
+    def appendleft(self, envelope: _Envelope) -> None:
+        self._level(envelope).appendleft(envelope)
+        self._size += 1
+
+    def popleft(self) -> _Envelope:
+        for level in reversed(self._levels):
+            if level:
+                self._size -= 1
+                return level.popleft()
+        raise IndexError("pop from an empty queue")
+
+    def pop_expired(self, now: float) -> list[_Envelope]:
+        """Remove and return expired messages found at the head of each level."""
+        expired: list[_Envelope] = []
+        for level in self._levels:
+            while level and level[0].expires_at is not None and level[0].expires_at <= now:
+                expired.append(level.popleft())
+        self._size -= len(expired)
+        return expired
+
+
+class _MemoryQueue:
+    def __init__(self, broker: "InMemoryBroker", name: str, arguments: dict[str, Any]):
+        self.broker = broker
+        self.name = name
+        self.arguments = arguments
+        self.messages = _MessageBuffer(arguments.get("x-max-priority", 0))
+        self.consumers: list[_MemoryConsumer] = []
+
+    def put(self, envelope: _Envelope, front: bool = False) -> None:
+        ttl_ms = self.arguments.get("x-message-ttl")
+        if ttl_ms is not None and not envelope.redelivered:
+            expires_at = time.monotonic() + ttl_ms / 1000
+            envelope.expires_at = min(expires_at, envelope.expires_at or expires_at)
+        if front:
+            self.messages.appendleft(envelope)
+        else:
+            self.messages.append(envelope)
+        if envelope.expires_at is not None:
+            asyncio.get_running_loop().call_later(max(0.0, envelope.expires_at - time.monotonic()), self.expire)
+        for consumer in self.consumers:
+            consumer.wakeup.set()
+
+    def expire(self) -> None:
+        """Dead-letter expired messages at the head of the queue (RabbitMQ only expires at the head)."""
+        for envelope in self.messages.pop_expired(time.monotonic()):
+            self.broker.dead_letter(self, envelope, reason="expired")
+
+
+class _MemoryConsumer:
+    def __init__(self, queue: _MemoryQueue, callback: ConsumerCallback, prefetch_count: int, tag: str):
+        self.queue = queue
+        self.callback = callback
+        self.prefetch_count = prefetch_count
+        self.tag = tag
+        self.wakeup = asyncio.Event()
+        self.unacked: dict[int, InMemoryDelivery] = {}
+        self._delivery_tags = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        while True:
+            self.queue.expire()
+            at_capacity = self.prefetch_count and len(self.unacked) >= self.prefetch_count
+            if not self.queue.messages or at_capacity:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            delivery = InMemoryDelivery(self, self.queue.messages.popleft(), next(self._delivery_tags))
+            self.unacked[delivery.delivery_tag] = delivery
+            # One task per delivery, like aiormq does
+            task = asyncio.create_task(self.callback(delivery))
+            self._tasks.add(task)
+            task.add_done_callback(self._on_callback_done)
+
+    def _on_callback_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("consumer_callback_failed", queue=self.queue.name, exc_info=task.exception())
+
+    def settle(self, delivery_tag: int, multiple: bool, requeue: Optional[bool]) -> None:
+        """Ack (``requeue=None``), requeue or dead-letter one delivery, or all up to ``delivery_tag``."""
+        if delivery_tag not in self.unacked:
+            raise ValueError(f"Unknown or already settled delivery tag {delivery_tag} on {self.queue.name}")
+        tags = sorted(tag for tag in self.unacked if tag <= delivery_tag) if multiple else [delivery_tag]
+        # Requeued messages go back to the head in their original order
+        for tag in reversed(tags):
+            delivery = self.unacked.pop(tag)
+            delivery.processed = True
+            if requeue is None:
+                continue
+            if requeue:
+                self.queue.put(dataclasses.replace(delivery.envelope, redelivered=True), front=True)
+            else:
+                self.queue.broker.dead_letter(self.queue, delivery.envelope, reason="rejected")
+        self.wakeup.set()
+
+    async def cancel(self, requeue_unacked: bool) -> None:
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self.queue.consumers.remove(self)
+        if requeue_unacked and self.unacked:
+            self.settle(max(self.unacked), multiple=True, requeue=True)
+
+
+class InMemoryBroker:
+    """A process-wide asyncio message broker with the same topology as RabbitMQ.
+
+    Honours ``EXCHANGES`` (direct and fanout routing), ``QUEUE_BINDINGS``,
+    per-consumer prefetch, multiple acks, requeue on nack, and the queue
+    arguments ``x-message-ttl``, ``x-dead-letter-exchange`` and ``x-max-priority``. Nothing is
+    persisted: messages still queued when the process exits are lost.
+    """
+
+    def __init__(self):
+        self.queues: dict[str, _MemoryQueue] = {}
+        self._exchange_types = dict(EXCHANGES)
+        self._bindings: dict[str, list[tuple[str, _MemoryQueue]]] = {name: [] for name in EXCHANGES}
+        self._consumer_tags = itertools.count(1)
+        for queue_name, (exchange_name, routing_key) in QUEUE_BINDINGS.items():
+            queue = _MemoryQueue(self, queue_name, queue_arguments(queue_name))
+            self.queues[queue_name] = queue
+            self._bindings[exchange_name].append((routing_key, queue))
+
+    def route(self, exchange_name: str, routing_key: str) -> list[_MemoryQueue]:
+        if exchange_name not in self._exchange_types:
+            raise UnroutableError(f"Unknown exchange '{exchange_name}'")
+        if self._exchange_types[exchange_name] == aio_pika.ExchangeType.FANOUT:
+            return [queue for _, queue in self._bindings[exchange_name]]
+        return [queue for key, queue in self._bindings[exchange_name] if key == routing_key]
+
+    def publish(self, exchange_name: str, routing_key: str, envelope: _Envelope) -> int:
+        """Copy the message into every bound queue. Returns the number of queues it reached."""
+        queues = self.route(exchange_name, routing_key)
+        for queue in queues:
+            queue.put(dataclasses.replace(envelope, headers=dict(envelope.headers)))
+        return len(queues)
+
+    def dead_letter(self, queue: _MemoryQueue, envelope: _Envelope, reason: str) -> None:
+        dlx = queue.arguments.get("x-dead-letter-exchange")
+        if not dlx:
+            logger.warning("message_dropped", queue=queue.name, reason=reason)
+            return
+        headers = dict(envelope.headers)
+        death = {
+            "queue": queue.name,
+            "reason": reason,
+            "exchange": envelope.exchange,
+            "routing-keys": [envelope.routing_key],
+            "count": 1,
+        }
+        headers["x-death"] = [death, *headers.get("x-death", [])]
+        routing_key = queue.arguments.get("x-dead-letter-routing-key", envelope.routing_key)
+        dead = dataclasses.replace(
+            envelope, exchange=dlx, routing_key=routing_key, headers=headers, expires_at=None, redelivered=False
+        )
+        # Like RabbitMQ, a dead letter that matches no binding is silently dropped
+        self.publish(dlx, routing_key, dead)
+
+    def add_consumer(self, queue_name: str, callback: ConsumerCallback, prefetch_count: int) -> _MemoryConsumer:
+        queue = self.queues[queue_name]
+        consumer = _MemoryConsumer(queue, callback, prefetch_count, f"memory-{next(self._consumer_tags)}")
+        queue.consumers.append(consumer)
+        return consumer
+
+    def depths(self) -> dict[str, int]:
+        """Ready messages per queue (unacked deliveries not included)."""
+        return {name: len(queue.messages) for name, queue in self.queues.items()}
+
+
+_memory_broker: Optional[InMemoryBroker] = None
+
+
+def get_memory_broker() -> InMemoryBroker:
+    """The broker shared by every in-memory transport of this process."""
+    global _memory_broker
+    if _memory_broker is None:
+        _memory_broker = InMemoryBroker()
+    return _memory_broker
+
+
+class InMemoryTransport(Transport):
+    """Transport over the process-wide :class:`InMemoryBroker`.
+
+    Only useful when every component runs in the same process (see the
+    ``all`` component mode); publishes never leave the process.
+    """
+
+    def __init__(self, broker: InMemoryBroker):
+        self._broker = broker
+        self._consumers: dict[str, _MemoryConsumer] = {}
+
+    async def connect(self) -> None:
+        """Nothing to do: the broker declares the topology when it is created."""
+
+    async def consume(self, queue_name: str, callback: ConsumerCallback, prefetch_count: int) -> str:
+        consumer = self._broker.add_consumer(queue_name, callback, prefetch_count)
+        self._consumers[consumer.tag] = consumer
+        return consumer.tag
+
+    async def cancel(self, consumer_tag: str) -> None:
+        await self._consumers[consumer_tag].cancel(requeue_unacked=False)
+
+    async def publish(self, exchange_name: str, routing_key: str, message: aio_pika.Message) -> None:
+        envelope = _Envelope(
+            body=message.body,
+            content_type=message.content_type,
+            content_encoding=message.content_encoding,
+            headers=dict(message.headers or {}),
+            priority=message.priority,
+            message_id=message.message_id,
+            exchange=exchange_name,
+            routing_key=routing_key,
+            expires_at=time.monotonic() + message.expiration if message.expiration is not None else None,
+        )
+        if not self._broker.publish(exchange_name, routing_key, envelope):
+            raise UnroutableError(f"No queue bound to '{exchange_name}' with routing key '{routing_key}'")
+
+    async def close(self) -> None:
+        """Cancel our consumers; deliveries that were never acked go back to their queues."""
+        for consumer in self._consumers.values():
+            if consumer in consumer.queue.consumers:
+                await consumer.cancel(requeue_unacked=True)
+            elif consumer.unacked:
+                consumer.settle(max(consumer.unacked), multiple=True, requeue=True)
+        self._consumers.clear()
@@ -1,10 +1,18 @@
 """YAML workflow configuration loader."""
 
+import os
+import time
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
 
+import structlog
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+logger = structlog.get_logger()
 
 
 class AggregationConfig(BaseModel):
@@ -13,15 +21,58 @@ class AggregationConfig(BaseModel):
     expect_count_from: str  # "page_count" or "document_count"
 
 
+# Value of ``in`` / ``not_in`` that stands for the doc types listed under extraction_schemas
+EXTRACTION_SCHEMAS = "extraction_schemas"
+
+
+class FieldCondition(BaseModel):
+    """Tests on one message field; every test that is set must pass.
+
+    In YAML a bare value is shorthand for ``equals`` and a list for ``in``.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    equals: Any = None
+    in_: Optional[list[Any] | str] = Field(default=None, alias="in")
+    not_in: Optional[list[Any] | str] = None
+    gt: Optional[float] = None
+    gte: Optional[float] = None
+    lt: Optional[float] = None
+    lte: Optional[float] = None
+    exists: Optional[bool] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _shorthand(cls, data: Any) -> Any:
+        if isinstance(data, list):
+            return {"in": data}
+        if not isinstance(data, dict):
+            return {"equals": data}
+        return data
+
+    @model_validator(mode="after")
+    def _check_sets(self) -> "FieldCondition":
+        for values in (self.in_, self.not_in):
+            if isinstance(values, str) and values != EXTRACTION_SCHEMAS:
+                raise ValueError(f"'in' / 'not_in' take a list or '{EXTRACTION_SCHEMAS}', not '{values}'")
+        return self
+
+
 class StageConfig(BaseModel):
     name: str
     component: str
     routing_key: str
     timeout_seconds: int = 30
     parallel: bool = False
+    max_concurrency: Optional[int] = None  # In-flight messages per consumer process
+    batch_size: Optional[int] = None  # Messages processed per transaction (batch mode)
     confidence_threshold: Optional[float] = None
     backoffice_queue: Optional[str] = None
     aggregation: Optional[AggregationConfig] = None
+    fuse_with: Optional[str] = None  # Next stage to run in this stage's process and transaction
+    when: Optional[dict[str, FieldCondition]] = None  # Run only for messages matching every condition, else skip
+    max_attempts: Optional[int] = None  # Attempts before a failing message is dead-lettered (None = settings)
 
 
 class SLAConfig(BaseModel):
@@ -44,60 +95,287 @@ class WorkflowConfig(BaseModel):
     name: str
     description: str
     version: int
+    priority: Optional[int] = None  # Default request priority, 0 = most urgent .. 9 (None = 5)
     sla: SLAConfig
     stages: list[StageConfig]
     extraction_schemas: dict[str, ExtractionSchemaConfig] = {}
 
+    @model_validator(mode="after")
+    def _check_fusion(self) -> "WorkflowConfig":
+        """A stage can only be fused with the stage that immediately follows it."""
+        for i, stage in enumerate(self.stages):
+            if stage.fuse_with is None:
+                continue
+            if i + 1 >= len(self.stages) or self.stages[i + 1].name != stage.fuse_with:
+                raise ValueError(f"Stage '{stage.name}' can only fuse with the next stage, not '{stage.fuse_with}'")
+        return self
+
+    @model_validator(mode="after")
+    def _check_conditions(self) -> "WorkflowConfig":
+        """Fan-in stages count every part, so they can never be skipped."""
+        for stage in self.stages:
+            if stage.when and stage.aggregation:
+                raise ValueError(f"Stage '{stage.name}' aggregates a fan-in and cannot have a 'when' condition")
+        return self
+
+
+def _field_value(message: Any, field: str) -> Any:
+    """A payload value, else a message attribute (page_count, document_count, ...), else None."""
+    payload = getattr(message, "payload", None) or {}
+    if field in payload:
+        return payload[field]
+    return getattr(message, field, None)
+
+
+def _compile_field(field: str, condition: FieldCondition, schema_types: frozenset[str]) -> Callable[[Any], bool]:
+    in_ = schema_types if condition.in_ == EXTRACTION_SCHEMAS else condition.in_
+    not_in = schema_types if condition.not_in == EXTRACTION_SCHEMAS else condition.not_in
+    tests: list[Callable[[Any], bool]] = []
+    if condition.exists is not None:
+        tests.append(lambda v: (v is not None) == condition.exists)
+    if condition.equals is not None:
+        tests.append(lambda v: v == condition.equals)
+    if in_ is not None:
+        tests.append(lambda v: v in in_)
+    if not_in is not None:
+        tests.append(lambda v: v not in not_in)
+    for bound, compare in (
+        (condition.gt, lambda v, b: v > b),
+        (condition.gte, lambda v, b: v >= b),
+        (condition.lt, lambda v, b: v < b),
+        (condition.lte, lambda v, b: v <= b),
+    ):
+        if bound is not None:
+            tests.append(lambda v, b=bound, c=compare: isinstance(v, (int, float)) and c(v, b))
+
+    def matches(message: Any) -> bool:
+        value = _field_value(message, field)
+        return all(test(value) for test in tests)
+
+    return matches
+
+
+def _compile_condition(stage: StageConfig, workflow: WorkflowConfig) -> Callable[[Any], bool]:
+    schema_types = frozenset(workflow.extraction_schemas)
+    fields = [_compile_field(field, condition, schema_types) for field, condition in stage.when.items()]
+    return lambda message: all(matches(message) for matches in fields)
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """Read-only routing tables for one version of a workflow.
+
+    Built once per (re)load so that routing a message is a few dict lookups
+    instead of scans over ``stages``.
+    """
+
+    config: WorkflowConfig
+    stages: Mapping[str, StageConfig]
+    next_stages: Mapping[str, Optional[StageConfig]]
+    stages_by_component: Mapping[str, StageConfig]
+    backoffice_queues: Mapping[str, str]
+    conditions: Mapping[str, Callable[[Any], bool]]
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def version(self) -> int:
+        return self.config.version
+
+    @classmethod
+    def compile(cls, config: WorkflowConfig) -> "CompiledWorkflow":
+        stages = config.stages
+        by_component: dict[str, StageConfig] = {}
+        for stage in stages:
+            by_component.setdefault(stage.component, stage)
+        return cls(
+            config=config,
+            stages=MappingProxyType({stage.name: stage for stage in stages}),
+            next_stages=MappingProxyType(
+                {stage.name: stages[i + 1] if i + 1 < len(stages) else None for i, stage in enumerate(stages)}
+            ),
+            stages_by_component=MappingProxyType(by_component),
+            backoffice_queues=MappingProxyType(
+                {stage.name: stage.backoffice_queue for stage in stages if stage.backoffice_queue}
+            ),
+            conditions=MappingProxyType(
+                {stage.name: _compile_condition(stage, config) for stage in stages if stage.when}
+            ),
+        )
+
+    def applies_to(self, stage: StageConfig, message: Any) -> bool:
+        """Whether ``message`` satisfies the stage's ``when`` conditions (stages without any always apply)."""
+        condition = self.conditions.get(stage.name)
+        return condition is None or condition(message)
+
+    def next_applicable_stage(self, stage_name: Optional[str], message: Any) -> Optional[StageConfig]:
+        """First stage after ``stage_name`` (or from the start, if None) that applies to ``message``."""
+        if stage_name is None:
+            stage = self.config.stages[0] if self.config.stages else None
+        else:
+            stage = self.next_stages[stage_name]
+        while stage is not None and not self.applies_to(stage, message):
+            stage = self.next_stages[stage.name]
+        return stage
+
 
 class WorkflowLoader:
-    """Loads and caches workflow YAML configurations."""
+    """Loads workflow YAML configurations, compiles them and picks up changes.
+
+    With ``reload_interval_s`` > 0 the YAML file's mtime is checked at most
+    that often and a changed file is recompiled; if the new file does not
+    parse, the previous version keeps being served.
 
-    def __init__(self, config_dir: str = "config/workflows"):
+    With ``storage_path`` set, the YAML of every version loaded is copied to
+    ``<storage_path>/workflows/<name>/v<version>.yaml``. Messages pinned to an
+    older ``workflow_version`` then finish on the stages they started with,
+    even on a replica that started after the file changed.
+    """
+
+    def __init__(
+        self, config_dir: str = "config/workflows", reload_interval_s: float = 0, storage_path: Optional[str] = None
+    ):
         self._config_dir = Path(config_dir)
-        self._cache: dict[str, WorkflowConfig] = {}
+        self._reload_interval_s = reload_interval_s
+        self._versions_dir = Path(storage_path) / "workflows" if storage_path else None
+        self._current: dict[str, CompiledWorkflow] = {}
+        self._versions: dict[tuple[str, int], CompiledWorkflow] = {}
+        self._mtimes: dict[str, int] = {}
+        self._checked_at: dict[str, float] = {}
+        self._missing_versions: set[tuple[str, int]] = set()
+
+    def compiled(self, workflow_name: str, version: Optional[int] = None) -> CompiledWorkflow:
+        """The current compiled workflow, or the given version if it was ever loaded (falls back to current)."""
+        current = self._current.get(workflow_name)
+        if current is None or (
+            self._reload_interval_s > 0
+            and time.monotonic() - self._checked_at[workflow_name] >= self._reload_interval_s
+        ):
+            current = self._refresh(workflow_name, current)
+        if version is None or version == current.version:
+            return current
+        pinned = self._versions.get((workflow_name, version))
+        if pinned is None and (workflow_name, version) not in self._missing_versions:
+            # Loaded before this process started (e.g. after a restart): read the stored copy
+            pinned = self._load_version(workflow_name, version)
+        if pinned is None:
+            if (workflow_name, version) not in self._missing_versions:
+                self._missing_versions.add((workflow_name, version))
+                logger.warning(
+                    "workflow_version_unavailable",
+                    workflow=workflow_name,
+                    version=version,
+                    current_version=current.version,
+                )
+            return current
+        return pinned
 
-    def load(self, workflow_name: str) -> WorkflowConfig:
-        if workflow_name not in self._cache:
-            path = self._config_dir / f"{workflow_name}.yaml"
-            if not path.exists():
+    def _refresh(self, workflow_name: str, current: Optional[CompiledWorkflow]) -> CompiledWorkflow:
+        path = self._config_dir / f"{workflow_name}.yaml"
+        self._checked_at[workflow_name] = time.monotonic()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if current is None:
                 raise FileNotFoundError(f"Workflow config not found: {path}")
-            with open(path) as f:
-                data = yaml.safe_load(f)
-            self._cache[workflow_name] = WorkflowConfig(**data)
-        return self._cache[workflow_name]
-
-    def get_stage(self, workflow_name: str, stage_name: str) -> StageConfig:
-        wf = self.load(workflow_name)
-        for stage in wf.stages:
-            if stage.name == stage_name:
-                return stage
-        raise ValueError(f"Stage '{stage_name}' not found in workflow '{workflow_name}'")
-
-    def get_first_stage(self, workflow_name: str) -> StageConfig:
+            return current  # Deleted: keep serving the last version
+        if current is not None and mtime == self._mtimes.get(workflow_name):
+            return current
+
+        self._mtimes[workflow_name] = mtime
+        try:
+            text = path.read_text()
+            compiled = CompiledWorkflow.compile(WorkflowConfig(**yaml.safe_load(text)))
+        except Exception:
+            if current is None:
+                raise
+            logger.exception("workflow_reload_failed", workflow=workflow_name, version=current.version)
+            return current
+
+        if current is not None:
+            if compiled.version == current.version and compiled.config != current.config:
+                logger.warning(
+                    "workflow_changed_without_version_bump", workflow=workflow_name, version=compiled.version
+                )
+            logger.info(
+                "workflow_reloaded",
+                workflow=workflow_name,
+                version=compiled.version,
+                previous_version=current.version,
+            )
+        self._current[workflow_name] = compiled
+        self._versions[(workflow_name, compiled.version)] = compiled
+        self._missing_versions.discard((workflow_name, compiled.version))
+        self._store_version(workflow_name, compiled.version, text)
+        return compiled
+
+    def _version_path(self, workflow_name: str, version: int) -> Path:
+        return self._versions_dir / workflow_name / f"v{version}.yaml"
+
+    def _store_version(self, workflow_name: str, version: int, text: str) -> None:
+        """Copy the YAML of a loaded version to shared storage, so every replica can route pinned messages."""
+        if self._versions_dir is None:
+            return
+        path = self._version_path(workflow_name, version)
+        try:
+            if path.exists() and path.read_text() == text:
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            tmp.write_text(text)
+            os.replace(tmp, path)  # Atomic: readers never see a partial file
+        except OSError:
+            logger.exception("workflow_version_store_failed", workflow=workflow_name, version=version)
+
+    def _load_version(self, workflow_name: str, version: int) -> Optional[CompiledWorkflow]:
+        """A version stored by any replica, or None if it was never stored."""
+        if self._versions_dir is None:
+            return None
+        path = self._version_path(workflow_name, version)
+        try:
+            compiled = CompiledWorkflow.compile(WorkflowConfig(**yaml.safe_load(path.read_text())))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("workflow_version_load_failed", workflow=workflow_name, version=version)
+            return None
+        self._versions[(workflow_name, version)] = compiled
+        logger.info("workflow_version_loaded", workflow=workflow_name, version=version)
+        return compiled
+
+    def load(self, workflow_name: str, version: Optional[int] = None) -> WorkflowConfig:
+        return self.compiled(workflow_name, version).config
+
+    def list_workflows(self) -> list[str]:
+        """Names of all workflow YAML files available in the config directory."""
+        return sorted(path.stem for path in self._config_dir.glob("*.yaml"))
+
+    def get_stage(self, workflow_name: str, stage_name: str, version: Optional[int] = None) -> StageConfig:
+        stage = self.compiled(workflow_name, version).stages.get(stage_name)
+        if stage is None:
+            raise ValueError(f"Stage '{stage_name}' not found in workflow '{workflow_name}'")
+        return stage
+
+    def get_first_stage(self, workflow_name: str, version: Optional[int] = None) -> StageConfig:
         """Return the first stage of the workflow."""
-        wf = self.load(workflow_name)
+        wf = self.load(workflow_name, version)
         if not wf.stages:
             raise ValueError(f"Workflow '{workflow_name}' has no stages")
         return wf.stages[0]
 
-    def get_next_stage(self, workflow_name: str, current_stage_name: str) -> StageConfig | None:
-        """Return the stage that follows current_stage_name, or None if terminal."""
-        wf = self.load(workflow_name)
-        for i, stage in enumerate(wf.stages):
-            if stage.name == current_stage_name:
-                if i + 1 < len(wf.stages):
-                    return wf.stages[i + 1]
-                return None
-        raise ValueError(f"Stage '{current_stage_name}' not found in workflow '{workflow_name}'")
-
-    def get_stage_by_component(self, workflow_name: str, component_name: str) -> StageConfig:
+    def get_stage_by_component(
+        self, workflow_name: str, component_name: str, version: Optional[int] = None
+    ) -> StageConfig:
         """Find the stage that runs a given component (fallback for messages without current_stage)."""
-        wf = self.load(workflow_name)
-        for stage in wf.stages:
-            if stage.component == component_name:
-                return stage
-        raise ValueError(f"No stage with component '{component_name}' in workflow '{workflow_name}'")
-
-    def get_extraction_schema(self, workflow_name: str, doc_type: str) -> ExtractionSchemaConfig | None:
-        wf = self.load(workflow_name)
+        stage = self.compiled(workflow_name, version).stages_by_component.get(component_name)
+        if stage is None:
+            raise ValueError(f"No stage with component '{component_name}' in workflow '{workflow_name}'")
+        return stage
+
+    def get_extraction_schema(
+        self, workflow_name: str, doc_type: str, version: Optional[int] = None
+    ) -> ExtractionSchemaConfig | None:
+        wf = self.load(workflow_name, version)
         return wf.extraction_schemas.get(doc_type)
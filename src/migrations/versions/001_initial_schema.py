@@ -57,7 +57,7 @@ def upgrade() -> None:
         sa.Column("page_indices", postgresql.ARRAY(sa.Integer), nullable=False),
         sa.Column("status", sa.String(50), nullable=False, server_default="created"),
         sa.Column("extracted_data", postgresql.JSONB),
-        sa.Column("extraction_confidence", sa.Real),
+        sa.Column("extraction_confidence", sa.REAL),
         sa.Column("metadata", postgresql.JSONB, server_default="{}"),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
         sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
@@ -73,9 +73,9 @@ def upgrade() -> None:
         sa.Column("status", sa.String(50), nullable=False, server_default="extracted"),
         sa.Column("file_storage_path", sa.String(1000)),
         sa.Column("ocr_text", sa.Text),
-        sa.Column("ocr_confidence", sa.Real),
+        sa.Column("ocr_confidence", sa.REAL),
         sa.Column("doc_type", sa.String(100)),
-        sa.Column("classification_confidence", sa.Real),
+        sa.Column("classification_confidence", sa.REAL),
         sa.Column("document_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("documents.id")),
         sa.Column("metadata", postgresql.JSONB, server_default="{}"),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
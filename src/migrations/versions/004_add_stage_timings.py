@@ -0,0 +1,38 @@
+"""Add the stage_timings table for per-request timelines.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stage_timings",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("request_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("stage", sa.String(100), nullable=False),
+        sa.Column("component", sa.String(100), nullable=False),
+        sa.Column("page_index", sa.Integer),
+        sa.Column("document_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("enqueued_at", sa.DateTime(timezone=True)),
+        sa.Column("dequeued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("idx_stage_timings_request", "stage_timings", ["request_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_stage_timings_request", table_name="stage_timings")
+    op.drop_table("stage_timings")
@@ -0,0 +1,31 @@
+"""Replace aggregation_state.received_ids with a received_bitmap for idempotent fan-in.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL until the first indexed part arrives; rows of in-flight requests keep their received_count
+    op.add_column("aggregation_state", sa.Column("received_bitmap", postgresql.BIT(varying=True)))
+    op.drop_column("aggregation_state", "received_ids")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "aggregation_state",
+        sa.Column("received_ids", postgresql.ARRAY(postgresql.UUID(as_uuid=True)), server_default="{}"),
+    )
+    op.drop_column("aggregation_state", "received_bitmap")
@@ -0,0 +1,29 @@
+"""Track emitted documents in aggregation_state and allow an unknown expected_count.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The extraction fan-in is opened with the first emitted document, before the total is known
+    op.alter_column("aggregation_state", "expected_count", existing_type=sa.Integer(), nullable=True)
+    op.add_column("aggregation_state", sa.Column("grouped_until", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("aggregation_state", sa.Column("documents_emitted", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("aggregation_state", "documents_emitted")
+    op.drop_column("aggregation_state", "grouped_until")
+    op.alter_column("aggregation_state", "expected_count", existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,34 @@
+"""Add the result_cache table (shared tier of the engine result cache).
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "result_cache",
+        sa.Column("component", sa.String(100), primary_key=True),
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("result", postgresql.JSONB, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("idx_result_cache_expires", "result_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_result_cache_expires", table_name="result_cache")
+    op.drop_table("result_cache")
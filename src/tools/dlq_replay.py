@@ -0,0 +1,213 @@
+"""Move selected messages from q.dead_letters back to the stage they failed in.
+
+Usage: python -m src.tools.dlq_replay [--queue q.ocr ...] [--request-id ID ...]
+                                      [--reason max_attempts ...] [--limit N] [--rate 50] [--dry-run]
+
+Each message goes back to the exchange and routing key it was originally
+published to: the ``x-original-*`` headers set by the retry policy, else the
+broker's ``x-death`` record (expired or rejected messages). It is republished
+with publisher confirms and a fresh attempt count, then acked in the DLQ.
+Messages that do not match the filters stay in the DLQ. ``--rate`` caps the
+replay in messages per second so a large replay does not flood the stage.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any, Optional
+
+import aio_pika
+import structlog
+
+from config.logging import setup_logging
+from config.settings import Settings
+from src.core.rabbitmq import (
+    ATTEMPT_HEADER,
+    DEAD_LETTER_REASON_HEADER,
+    FAILED_COMPONENT_HEADER,
+    LAST_ERROR_HEADER,
+    ORIGINAL_EXCHANGE_HEADER,
+    ORIGINAL_ROUTING_KEY_HEADER,
+    QUEUE_BINDINGS,
+)
+from src.core.timeline import PUBLISHED_AT_HEADER
+
+logger = structlog.get_logger()
+
+DEAD_LETTER_QUEUE = "q.dead_letters"
+REPLAYED_AT_HEADER = "x-replayed-at"
+# Failure bookkeeping that must not follow the message back into the pipeline
+_DROPPED_HEADERS = frozenset(
+    {
+        "x-death",
+        ATTEMPT_HEADER,
+        LAST_ERROR_HEADER,
+        DEAD_LETTER_REASON_HEADER,
+        FAILED_COMPONENT_HEADER,
+        ORIGINAL_EXCHANGE_HEADER,
+        ORIGINAL_ROUTING_KEY_HEADER,
+    }
+)
+# Only pipeline stages are replay targets
+_STAGE_QUEUES = {queue: binding for queue, binding in QUEUE_BINDINGS.items() if binding[0] == "doc.direct"}
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return None if value is None else str(value)
+
+
+def _last_death(headers: dict[str, Any]) -> dict[str, Any]:
+    deaths = headers.get("x-death") or []
+    return deaths[0] if deaths else {}
+
+
+def original_target(headers: dict[str, Any]) -> Optional[tuple[str, str]]:
+    """(exchange, routing key) a dead letter was published to before it failed, if known."""
+    if headers.get(ORIGINAL_EXCHANGE_HEADER):
+        return _text(headers[ORIGINAL_EXCHANGE_HEADER]), _text(headers.get(ORIGINAL_ROUTING_KEY_HEADER)) or ""
+    death = _last_death(headers)
+    routing_keys = death.get("routing-keys") or []
+    if death.get("exchange") and routing_keys:
+        return _text(death["exchange"]), _text(routing_keys[0])
+    return None
+
+
+def dead_letter_reason(headers: dict[str, Any]) -> Optional[str]:
+    """``max_attempts`` / ``undecodable`` from the retry policy, else the broker's reason (``expired``, ``rejected``)."""
+    return _text(headers.get(DEAD_LETTER_REASON_HEADER) or _last_death(headers).get("reason"))
+
+
+def _replay_message(message: aio_pika.abc.AbstractIncomingMessage) -> aio_pika.Message:
+    headers = {key: value for key, value in (message.headers or {}).items() if key not in _DROPPED_HEADERS}
+    now = time.time()
+    headers[PUBLISHED_AT_HEADER] = now
+    headers[REPLAYED_AT_HEADER] = now
+    return aio_pika.Message(
+        body=message.body,
+        content_type=message.content_type,
+        content_encoding=message.content_encoding,
+        message_id=message.message_id,
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        priority=message.priority,
+        headers=headers,
+    )
+
+
+async def replay_dead_letters(
+    settings: Settings,
+    queues: Optional[list[str]] = None,
+    request_ids: Optional[list[str]] = None,
+    reasons: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    rate: Optional[float] = None,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Replay matching dead letters; returns counts of scanned, replayed, skipped and failed messages.
+
+    Only the messages in the DLQ when the replay starts are scanned. Skipped
+    ones are held unacked until the end and then requeued, so each message is
+    looked at once.
+    """
+    routing_keys = {_STAGE_QUEUES[queue][1] for queue in queues} if queues else None
+    stats = {"scanned": 0, "replayed": 0, "skipped": 0, "failed": 0}
+    held: list[aio_pika.abc.AbstractIncomingMessage] = []
+    interval = 1 / rate if rate else 0.0
+    next_publish = time.monotonic()
+
+    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+    async with connection:
+        channel = await connection.channel(publisher_confirms=True)
+        queue = await channel.declare_queue(DEAD_LETTER_QUEUE, passive=True)
+        depth = queue.declaration_result.message_count
+        try:
+            while stats["scanned"] < depth and (limit is None or stats["replayed"] < limit):
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                stats["scanned"] += 1
+                headers = message.headers or {}
+                target = original_target(headers)
+                if (
+                    target is None
+                    or target[0] != "doc.direct"
+                    or (routing_keys is not None and target[1] not in routing_keys)
+                    or (request_ids and _text(headers.get("request_id")) not in request_ids)
+                    or (reasons and dead_letter_reason(headers) not in reasons)
+                ):
+                    stats["skipped"] += 1
+                    held.append(message)
+                    continue
+
+                if dry_run:
+                    logger.info(
+                        "dead_letter_matched",
+                        request_id=_text(headers.get("request_id")),
+                        routing_key=target[1],
+                        reason=dead_letter_reason(headers),
+                        error=_text(headers.get(LAST_ERROR_HEADER)),
+                    )
+                    stats["replayed"] += 1
+                    held.append(message)
+                    continue
+
+                if interval:
+                    next_publish = max(next_publish + interval, time.monotonic())
+                    await asyncio.sleep(next_publish - time.monotonic())
+                exchange = await channel.get_exchange(target[0], ensure=False)
+                try:
+                    await exchange.publish(_replay_message(message), routing_key=target[1])
+                except Exception:
+                    logger.exception("dead_letter_replay_failed", routing_key=target[1])
+                    stats["failed"] += 1
+                    held.append(message)
+                    continue
+                await message.ack()
+                stats["replayed"] += 1
+        finally:
+            for message in held:
+                await message.nack(requeue=True)
+
+    logger.info("dlq_replay_finished", dry_run=dry_run, depth=depth, **stats)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--queue",
+        action="append",
+        choices=list(_STAGE_QUEUES),
+        help="Only messages that failed in this stage queue (repeatable)",
+    )
+    parser.add_argument("--request-id", action="append", help="Only messages of this request (repeatable)")
+    parser.add_argument(
+        "--reason",
+        action="append",
+        help="Only messages dead-lettered for this reason: max_attempts, undecodable, expired, rejected (repeatable)",
+    )
+    parser.add_argument("--limit", type=int, help="Replay at most this many messages")
+    parser.add_argument("--rate", type=float, help="Replay at most this many messages per second")
+    parser.add_argument("--dry-run", action="store_true", help="Only log the messages that would be replayed")
+    args = parser.parse_args()
+
+    settings = Settings()
+    setup_logging(settings)
+    stats = asyncio.run(
+        replay_dead_letters(
+            settings,
+            queues=args.queue,
+            request_ids=args.request_id,
+            reasons=args.reason,
+            limit=args.limit,
+            rate=args.rate,
+            dry_run=args.dry_run,
+        )
+    )
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Redeclare RabbitMQ queues whose declaration arguments changed (e.g. ``x-max-priority``).
+
+Usage: python -m src.tools.migrate_queues [--queue q.ocr ...]
+
+RabbitMQ cannot change a queue's arguments in place. For every queue declared
+with other arguments than ``queue_arguments()`` this deletes it, but only if it
+is empty and has no consumers, then redeclares and rebinds it. Queues that are
+not empty or still consumed are reported and left alone: stop publishing to
+them, let them drain, stop their consumers and run the command again.
+"""
+
+import argparse
+import asyncio
+import sys
+
+import aio_pika
+import aiormq
+import structlog
+
+from config.logging import setup_logging
+from config.settings import Settings
+from src.core.rabbitmq import EXCHANGES, QUEUE_BINDINGS, queue_arguments
+
+logger = structlog.get_logger()
+
+
+async def migrate_queues(settings: Settings, queue_names: list[str]) -> int:
+    """Returns the number of queues that still need migrating."""
+    pending = 0
+    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+    async with connection:
+        channel = await connection.channel()
+        for queue_name in queue_names:
+            exchange_name, routing_key = QUEUE_BINDINGS[queue_name]
+            try:
+                await channel.declare_queue(queue_name, durable=True, arguments=queue_arguments(queue_name))
+                logger.info("queue_up_to_date", queue=queue_name)
+                continue
+            except aiormq.exceptions.ChannelPreconditionFailed:
+                await channel.reopen()
+
+            queue = await channel.declare_queue(queue_name, passive=True)
+            try:
+                await queue.delete(if_unused=True, if_empty=True)
+            except aiormq.exceptions.ChannelPreconditionFailed:
+                await channel.reopen()
+                logger.error("queue_not_migrated", queue=queue_name, reason="queue is not empty or has consumers")
+                pending += 1
+                continue
+
+            queue = await channel.declare_queue(queue_name, durable=True, arguments=queue_arguments(queue_name))
+            exchange = await channel.declare_exchange(exchange_name, EXCHANGES[exchange_name], durable=True)
+            await queue.bind(exchange, routing_key=routing_key)
+            logger.info("queue_migrated", queue=queue_name, arguments=queue_arguments(queue_name))
+    return pending
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--queue",
+        action="append",
+        choices=list(QUEUE_BINDINGS),
+        help="Queue to migrate (repeatable; default: all pipeline queues)",
+    )
+    args = parser.parse_args()
+
+    settings = Settings()
+    setup_logging(settings)
+    pending = asyncio.run(migrate_queues(settings, args.queue or list(QUEUE_BINDINGS)))
+    sys.exit(1 if pending else 0)
+
+
+if __name__ == "__main__":
+    main()
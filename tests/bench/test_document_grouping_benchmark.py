@@ -0,0 +1,174 @@
+"""Benchmark: closing the classification fan-in of a large request, per-page ORM updates vs set-based SQL.
+
+Needs a migrated Postgres: runs only when ``DOCPROC_DATABASE_URL`` is set. Every
+run creates its own request, pages and documents and deletes them afterwards.
+"""
+
+import os
+import random
+import time
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+import structlog
+from sqlalchemy import delete, func, insert, select
+
+from config.settings import Settings
+from src.components.classification_aggregator.component import ClassificationAggregatorComponent
+from src.core.aggregation import FanInProgress
+from src.core.database import create_db_engine, create_session_factory
+from src.core.models import AggregationState, Document, Page, Request
+from src.core.schemas import PipelineMessage
+
+PAGE_COUNTS = (1_000, 10_000)
+DOC_TYPES = ("invoice", "contract", "id_card", "payslip", None)
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not os.environ.get("DOCPROC_DATABASE_URL"), reason="DOCPROC_DATABASE_URL is not set"),
+]
+
+
+def _doc_types(count: int) -> list[str | None]:
+    """Page types in runs of 1-20 pages, like a batch of scanned documents."""
+    rng = random.Random(42)
+    doc_types: list[str | None] = []
+    while len(doc_types) < count:
+        doc_type = rng.choice(DOC_TYPES)
+        doc_types.extend([doc_type] * min(rng.randint(1, 20), count - len(doc_types)))
+    return doc_types
+
+
+async def _emit_documents_per_page(aggregator, message: PipelineMessage, session) -> int:
+    """The aggregator's completion path before set-based grouping: ORM pages, linked one at a time."""
+    pages_result = await session.execute(
+        select(Page).where(Page.request_id == message.request_id).order_by(Page.page_index)
+    )
+    pages = list(pages_result.scalars().all())
+    documents = aggregator._group_pages_into_documents(pages)
+
+    request = (await session.execute(select(Request).where(Request.id == message.request_id))).scalar_one()
+    request.document_count = len(documents)
+    request.status = "extracting"
+    request.updated_at = datetime.now(UTC)
+    session.add(AggregationState(request_id=message.request_id, stage="extraction", expected_count=len(documents)))
+
+    for document_index, (doc_type, page_indices) in enumerate(documents):
+        doc = Document(
+            id=uuid.uuid4(),
+            request_id=message.request_id,
+            doc_type=doc_type,
+            page_indices=page_indices,
+            status="created",
+        )
+        session.add(doc)
+        for pi in page_indices:
+            page = next(p for p in pages if p.page_index == pi)
+            page.document_id = doc.id
+            page.status = "grouped"
+            page.updated_at = datetime.now(UTC)
+        message.model_copy(
+            update={
+                "document_id": doc.id,
+                "document_count": len(documents),
+                "document_index": document_index,
+                "payload": {
+                    "doc_type": doc_type,
+                    "page_indices": page_indices,
+                    "document_id": str(doc.id),
+                    "ocr_texts": {pi: next(p.ocr_text for p in pages if p.page_index == pi) for pi in page_indices},
+                },
+            }
+        )
+    return len(documents)
+
+
+async def _emit_documents_set_based(aggregator, message: PipelineMessage, session) -> int:
+    page_count = message.page_count
+    progress = FanInProgress(
+        received=page_count,
+        expected=page_count,
+        new_parts=1,
+        contiguous=page_count,
+        completed=True,
+        already_complete=False,
+    )
+    return len(await aggregator._emit_closed_documents(message, progress, session))
+
+
+async def _time(session_factory, emit, page_count: int) -> tuple[float, int]:
+    """Wall time, in ms, of grouping ``page_count`` classified pages and committing, and the documents created."""
+    # Grouping only needs a logger: skip __init__ (engine, transport)
+    aggregator = ClassificationAggregatorComponent.__new__(ClassificationAggregatorComponent)
+    aggregator.logger = structlog.get_logger().bind(component="bench")
+    request_id = uuid.uuid4()
+    try:
+        async with session_factory() as session, session.begin():
+            session.add(Request(id=request_id, channel="bench", workflow_name="default", status="classifying"))
+            await session.flush()
+            session.add(
+                AggregationState(
+                    request_id=request_id, stage="classification", expected_count=page_count, is_complete=True
+                )
+            )
+            await session.execute(
+                insert(Page),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "request_id": request_id,
+                        "page_index": page_index,
+                        "status": "classified",
+                        "doc_type": doc_type,
+                        "ocr_text": f"text of page {page_index}",
+                    }
+                    for page_index, doc_type in enumerate(_doc_types(page_count))
+                ],
+            )
+        message = PipelineMessage(
+            request_id=request_id,
+            workflow_name="default",
+            page_count=page_count,
+            source_component="bench",
+            payload={},
+        )
+
+        started = time.perf_counter()
+        async with session_factory() as session, session.begin():
+            documents = await emit(aggregator, message, session)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        async with session_factory() as session:
+            grouped = await session.scalar(
+                select(func.count())
+                .select_from(Page)
+                .where(Page.request_id == request_id, Page.document_id.is_not(None), Page.status == "grouped")
+            )
+        assert grouped == page_count
+        return elapsed_ms, documents
+    finally:
+        async with session_factory() as session, session.begin():
+            await session.execute(delete(Page).where(Page.request_id == request_id))
+            await session.execute(delete(Document).where(Document.request_id == request_id))
+            await session.execute(delete(AggregationState).where(AggregationState.request_id == request_id))
+            await session.execute(delete(Request).where(Request.id == request_id))
+
+
+async def test_emit_documents_per_page_vs_set_based(record_property):
+    engine = create_db_engine(Settings(), name="bench")
+    session_factory = create_session_factory(engine)
+    try:
+        print(f"\n{'pages':>6} {'documents':>10} {'per page (ms)':>14} {'set-based (ms)':>15} {'speedup':>8}")
+        for page_count in PAGE_COUNTS:
+            per_page_ms, per_page_documents = await _time(session_factory, _emit_documents_per_page, page_count)
+            set_based_ms, documents = await _time(session_factory, _emit_documents_set_based, page_count)
+            assert documents == per_page_documents
+            record_property(f"emit_{page_count}_pages_per_page_ms", round(per_page_ms, 3))
+            record_property(f"emit_{page_count}_pages_set_based_ms", round(set_based_ms, 3))
+            print(
+                f"{page_count:>6} {documents:>10} {per_page_ms:>14.1f} {set_based_ms:>15.1f}"
+                f" {per_page_ms / set_based_ms:>7.1f}x"
+            )
+    finally:
+        await engine.dispose()
@@ -0,0 +1,105 @@
+"""Benchmark: registering split pages one ORM object at a time vs with one multi-row INSERT.
+
+Needs a migrated Postgres: runs only when ``DOCPROC_DATABASE_URL`` is set. Every
+run creates its own request rows and deletes them afterwards.
+"""
+
+import os
+import time
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from config.settings import Settings
+from src.components.splitter.component import SplitterComponent
+from src.core.database import create_db_engine, create_session_factory
+from src.core.models import AggregationState, Page, Request
+from src.core.schemas import PipelineMessage
+
+PAGE_COUNTS = (10, 100, 5_000)
+ROUNDS = 3  # Best of
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not os.environ.get("DOCPROC_DATABASE_URL"), reason="DOCPROC_DATABASE_URL is not set"),
+]
+
+
+async def _register_pages_per_page(message: PipelineMessage, paths: list[str], session) -> None:
+    """The splitter's page registration before the multi-row insert: one ORM object per row."""
+    result = await session.execute(select(Request).where(Request.id == message.request_id))
+    request = result.scalar_one()
+    request.status = "splitting"
+    request.updated_at = datetime.now(UTC)
+    request.page_count = len(paths)
+    session.add(AggregationState(request_id=message.request_id, stage="classification", expected_count=len(paths)))
+    for page_index, path in enumerate(paths):
+        page = Page(
+            id=uuid.uuid4(),
+            request_id=message.request_id,
+            page_index=page_index,
+            status="extracted",
+            file_storage_path=path,
+        )
+        session.add(page)
+        message.model_copy(
+            update={
+                "page_index": page_index,
+                "page_count": len(paths),
+                "source_component": "splitter",
+                "payload": {**message.payload, "file_path": path, "page_id": str(page.id), "page_index": page_index},
+            }
+        )
+
+
+async def _register_pages_bulk(message: PipelineMessage, paths: list[str], session) -> None:
+    # Registration touches no component state: skip __init__ (engine, transport)
+    splitter = SplitterComponent.__new__(SplitterComponent)
+    await splitter._register_pages(message, 0, paths, len(paths), True, session)
+
+
+async def _time(session_factory, register, page_count: int) -> float:
+    """Best wall time, in ms, of registering ``page_count`` pages and committing."""
+    paths = [f"/data/bench/pages/page_{i:05d}.png" for i in range(page_count)]
+    best = float("inf")
+    request_ids: list[uuid.UUID] = []
+    try:
+        for _ in range(ROUNDS):
+            request_id = uuid.uuid4()
+            request_ids.append(request_id)
+            async with session_factory() as session, session.begin():
+                session.add(Request(id=request_id, channel="bench", workflow_name="default", status="splitting"))
+            message = PipelineMessage(
+                request_id=request_id,
+                workflow_name="default",
+                source_component="bench",
+                payload={},
+            )
+
+            started = time.perf_counter()
+            async with session_factory() as session, session.begin():
+                await register(message, paths, session)
+            best = min(best, (time.perf_counter() - started) * 1000)
+    finally:
+        async with session_factory() as session, session.begin():
+            await session.execute(delete(Page).where(Page.request_id.in_(request_ids)))
+            await session.execute(delete(AggregationState).where(AggregationState.request_id.in_(request_ids)))
+            await session.execute(delete(Request).where(Request.id.in_(request_ids)))
+    return best
+
+
+async def test_register_pages_per_page_vs_multi_row_insert(record_property):
+    engine = create_db_engine(Settings(), name="bench")
+    session_factory = create_session_factory(engine)
+    try:
+        print(f"\n{'pages':>6} {'per page (ms)':>14} {'multi-row (ms)':>15} {'speedup':>8}")
+        for page_count in PAGE_COUNTS:
+            per_page_ms = await _time(session_factory, _register_pages_per_page, page_count)
+            bulk_ms = await _time(session_factory, _register_pages_bulk, page_count)
+            record_property(f"register_{page_count}_pages_per_page_ms", round(per_page_ms, 3))
+            record_property(f"register_{page_count}_pages_multi_row_ms", round(bulk_ms, 3))
+            print(f"{page_count:>6} {per_page_ms:>14.1f} {bulk_ms:>15.1f} {per_page_ms / bulk_ms:>7.1f}x")
+    finally:
+        await engine.dispose()
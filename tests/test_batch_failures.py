@@ -0,0 +1,106 @@
+"""Batch mode: a failing message is isolated, so the rest of its batch commits and keeps its retry budget."""
+
+import asyncio
+import uuid
+
+import pytest
+
+import src.core.transport as transport_module
+from config.settings import Settings
+from src.core.base_component import BaseComponent
+from src.core.rabbitmq import ATTEMPT_HEADER, retry_queue
+from src.core.schemas import PipelineMessage
+
+BATCH = 16
+
+
+class _FlakyComponent(BaseComponent):
+    """Consumes q.ocr in batches; fails every batch that contains the poison request."""
+
+    component_name = "ocr"
+
+    def __init__(self, settings: Settings, poison: uuid.UUID):
+        super().__init__(settings)
+        self.poison = poison
+        self.batches: list[list[uuid.UUID]] = []
+
+    async def process_message(self, message, session):
+        return []
+
+    async def process_batch(self, messages, session):
+        request_ids = [message.request_id for message in messages]
+        self.batches.append(request_ids)
+        if self.poison in request_ids:
+            raise RuntimeError("poison message")
+        return []
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    monkeypatch.setattr(transport_module, "_memory_broker", None)
+    return transport_module.get_memory_broker()
+
+
+async def _deliveries(component: _FlakyComponent, request_ids: list[uuid.UUID], attempt: int) -> list:
+    """Publish one OCR message per request and collect the deliveries from q.ocr."""
+    deliveries = []
+    received = asyncio.Event()
+
+    async def collect(delivery):
+        deliveries.append(delivery)
+        if len(deliveries) == len(request_ids):
+            received.set()
+
+    await component._transport.consume("q.ocr", collect, prefetch_count=0)
+    for request_id in request_ids:
+        message = PipelineMessage(request_id=request_id, workflow_name="default", source_component="test", payload={})
+        raw = component._publisher.build_message(message)
+        raw.headers[ATTEMPT_HEADER] = attempt
+        await component._transport.publish("doc.direct", "page.ocr", raw)
+    await asyncio.wait_for(received.wait(), timeout=5)
+    return deliveries
+
+
+def _component(poison: uuid.UUID) -> _FlakyComponent:
+    settings = Settings(transport="memory", outbox_enabled=False, timeline_enabled=False, batch_size=BATCH)
+    return _FlakyComponent(settings, poison)
+
+
+@pytest.mark.parametrize("position", [0, BATCH // 2, BATCH - 1])
+async def test_only_the_failing_message_of_a_batch_is_retried(broker, position):
+    request_ids = [uuid.uuid4() for _ in range(BATCH)]
+    poison = request_ids[position]
+    component = _component(poison)
+    deliveries = await _deliveries(component, request_ids, attempt=1)
+
+    await component._handle_batch(deliveries)
+
+    # Every other message committed exactly once, in a batch without the poison one
+    committed = [request_id for batch in component.batches if poison not in batch for request_id in batch]
+    assert sorted(committed) == sorted(request_id for request_id in request_ids if request_id != poison)
+    # Only the poison message went to the first delay queue, with its attempt counted
+    retried = broker.queues[retry_queue(1_000)].messages
+    assert len(retried) == 1
+    envelope = retried.popleft()
+    assert envelope.headers["request_id"] == str(poison)
+    assert envelope.headers[ATTEMPT_HEADER] == 2
+    # Every delivery is settled and nothing is dead-lettered
+    assert all(delivery.processed for delivery in deliveries)
+    assert len(broker.queues["q.dead_letters"].messages) == 0
+    await component._transport.close()
+
+
+async def test_failing_message_on_its_last_attempt_is_dead_lettered_alone(broker):
+    request_ids = [uuid.uuid4() for _ in range(BATCH)]
+    poison = request_ids[3]
+    component = _component(poison)
+    deliveries = await _deliveries(component, request_ids, attempt=component.settings.retry_max_attempts)
+
+    await component._handle_batch(deliveries)
+
+    dead_letters = broker.queues["q.dead_letters"].messages
+    assert len(dead_letters) == 1
+    assert dead_letters.popleft().headers["request_id"] == str(poison)
+    assert sum(len(broker.queues[retry_queue(delay)].messages) for delay in (1_000, 5_000, 25_000, 125_000)) == 0
+    assert all(delivery.processed for delivery in deliveries)
+    await component._transport.close()
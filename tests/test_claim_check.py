@@ -0,0 +1,63 @@
+"""Claim-check store: offloading, resolving and purging blobs no message references any more."""
+
+import os
+import time
+
+from src.core.claim_check import CLAIM_KEY, ClaimCheckStore
+
+DAY_S = 86_400
+
+
+def _blobs(store: ClaimCheckStore) -> list:
+    return sorted(store._root.glob("*/*.json"))
+
+
+def _age(path, seconds: float) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+async def test_large_values_are_offloaded_and_resolved(tmp_path):
+    store = ClaimCheckStore(str(tmp_path), threshold_bytes=100)
+    texts = {"0": "x" * 500}
+
+    payload = await store.offload({"ocr_texts": texts, "doc_type": "invoice"})
+
+    assert set(payload["ocr_texts"]) == {CLAIM_KEY}
+    assert payload["doc_type"] == "invoice"
+    assert await store.resolve(payload["ocr_texts"]) == texts
+
+
+async def test_purge_deletes_only_blobs_older_than_the_retention(tmp_path):
+    store = ClaimCheckStore(str(tmp_path), threshold_bytes=100)
+    await store.offload({"old": "a" * 500, "new": "b" * 500})
+    old, new = sorted(_blobs(store), key=lambda path: path.read_text())
+    _age(old, 8 * DAY_S)
+    stale_tmp = old.with_suffix(".abc.tmp")
+    stale_tmp.write_bytes(b"{")
+    _age(stale_tmp, 8 * DAY_S)
+
+    deleted = await store.purge(7 * DAY_S)
+
+    assert deleted == 2
+    assert _blobs(store) == [new]
+    assert not stale_tmp.exists()
+
+
+async def test_offloading_a_stored_value_again_keeps_its_blob(tmp_path):
+    store = ClaimCheckStore(str(tmp_path), threshold_bytes=100)
+    value = "c" * 500
+    await store.offload({"ocr_texts": value})
+    (blob,) = _blobs(store)
+    _age(blob, 8 * DAY_S)
+
+    # A new message carries the same content: the existing blob is reused and refreshed
+    payload = await store.offload({"ocr_texts": value})
+    deleted = await store.purge(7 * DAY_S)
+
+    assert deleted == 0
+    assert await ClaimCheckStore(str(tmp_path), threshold_bytes=100).resolve(payload["ocr_texts"]) == value
+
+
+async def test_purge_without_any_claims_is_a_no_op(tmp_path):
+    assert await ClaimCheckStore(str(tmp_path), threshold_bytes=100).purge(0) == 0
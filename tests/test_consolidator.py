@@ -0,0 +1,65 @@
+"""Consolidation: documents whose extract stage was skipped end with a terminal status.
+
+Needs a migrated Postgres: runs only when ``DOCPROC_DATABASE_URL`` is set.
+"""
+
+import os
+import uuid
+
+import pytest
+from sqlalchemy import delete, select
+
+from config.settings import Settings
+from src.components.consolidator.component import ConsolidatorComponent
+from src.core.database import create_db_engine, create_session_factory
+from src.core.models import Document, Request
+from src.core.schemas import PipelineMessage
+from src.core.workflow_loader import WorkflowLoader
+
+pytestmark = pytest.mark.skipif(not os.environ.get("DOCPROC_DATABASE_URL"), reason="DOCPROC_DATABASE_URL is not set")
+
+
+async def test_document_that_skipped_extraction_is_reported_as_skipped():
+    settings = Settings()
+    engine = create_db_engine(settings, name="test")
+    session_factory = create_session_factory(engine)
+    consolidator = ConsolidatorComponent.handler_only(settings, WorkflowLoader(settings.workflows_dir))
+    request_id = uuid.uuid4()
+    try:
+        async with session_factory() as session, session.begin():
+            session.add(Request(id=request_id, channel="test", workflow_name="default", status="extracting"))
+            await session.flush()
+            session.add_all(
+                [
+                    Document(
+                        request_id=request_id,
+                        doc_type="invoice",
+                        page_indices=[0],
+                        status="extracted",
+                        extracted_data={"total_amount": 10.0},
+                    ),
+                    Document(request_id=request_id, doc_type="unknown", page_indices=[1], status="created"),
+                ]
+            )
+        message = PipelineMessage(request_id=request_id, workflow_name="default", source_component="test", payload={})
+
+        async with session_factory() as session, session.begin():
+            assert await consolidator.process_message(message, session) == []
+
+        async with session_factory() as session:
+            request = await session.scalar(select(Request).where(Request.id == request_id))
+            rows = await session.execute(
+                select(Document.doc_type, Document.status).where(Document.request_id == request_id)
+            )
+            statuses = dict(rows.tuples().all())
+        assert request.status == "completed"
+        result = {document["doc_type"]: document for document in request.result_payload["documents"]}
+        assert result["invoice"]["status"] == "extracted"
+        assert result["unknown"]["status"] == "skipped"
+        assert result["unknown"]["extracted_data"] == {}
+        assert statuses == {"invoice": "completed", "unknown": "skipped"}
+    finally:
+        async with session_factory() as session, session.begin():
+            await session.execute(delete(Document).where(Document.request_id == request_id))
+            await session.execute(delete(Request).where(Request.id == request_id))
+        await engine.dispose()
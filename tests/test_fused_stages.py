@@ -0,0 +1,28 @@
+"""Fused stages: the fused component runs as a stage handler inside the host, without a runtime of its own."""
+
+import pytest
+
+import src.core.transport as transport_module
+from config.settings import Settings
+from src.components.consolidator.component import ConsolidatorComponent
+from src.components.extraction_aggregator.component import ExtractionAggregatorComponent
+
+RUNTIME = ("_db_engine", "_session_factory", "_transport", "_publisher", "_health_server", "_outbox_relay", "_timeline")
+
+
+@pytest.fixture(autouse=True)
+def broker(monkeypatch):
+    monkeypatch.setattr(transport_module, "_memory_broker", None)
+
+
+async def test_fused_handler_has_no_runtime_of_its_own():
+    host = ExtractionAggregatorComponent(Settings(transport="memory", outbox_enabled=True, timeline_enabled=True))
+
+    handler = await host._get_fused_handler("consolidator")
+
+    assert isinstance(handler, ConsolidatorComponent)
+    assert await host._get_fused_handler("consolidator") is handler
+    assert not [attribute for attribute in RUNTIME if hasattr(handler, attribute)]
+    assert handler._workflow_loader is host._workflow_loader
+    assert handler.settings is host.settings
+    await host.teardown()
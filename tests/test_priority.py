@@ -0,0 +1,129 @@
+"""Priority delivery: AMQP priority mapping, in-memory priority queues and the topology fallback."""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import aio_pika
+import aiormq
+import pytest
+
+from src.core.rabbitmq import MAX_PRIORITY, amqp_priority, setup_rabbitmq_topology
+from src.core.transport import InMemoryBroker, InMemoryTransport, _Envelope, _MessageBuffer
+
+BACKLOG = 500
+LOW = MAX_PRIORITY  # Least urgent pipeline priority
+URGENT = 0
+
+
+def _message(priority: int) -> aio_pika.Message:
+    """An OCR message with a pipeline priority, encoded the way ``Publisher.build_message`` does."""
+    return aio_pika.Message(
+        body=b"{}",
+        message_id=str(uuid.uuid4()),
+        priority=amqp_priority(priority),
+        headers={"request_id": str(uuid.uuid4())},
+    )
+
+
+def _envelope(priority: int | None, body: bytes = b"") -> _Envelope:
+    return _Envelope(
+        body=body,
+        content_type=None,
+        content_encoding=None,
+        headers={},
+        priority=priority,
+        message_id=None,
+        exchange="doc.direct",
+        routing_key="page.ocr",
+    )
+
+
+@pytest.mark.parametrize(
+    ("priority", "expected"),
+    [(0, 9), (1, 8), (5, 4), (9, 0), (None, 4), (-1, 9), (42, 0)],
+)
+def test_amqp_priority_inverts_pipeline_priority(priority, expected):
+    assert amqp_priority(priority) == expected
+
+
+def test_message_buffer_serves_highest_priority_first_and_fifo_within_a_level():
+    buffer = _MessageBuffer(max_priority=MAX_PRIORITY)
+    for body, priority in [(b"a", 1), (b"b", 9), (b"c", 1), (b"d", 50), (b"e", None)]:
+        buffer.append(_envelope(priority, body))
+
+    # Priorities above the maximum count as the maximum; no priority counts as 0
+    assert [buffer.popleft().body for _ in range(len(buffer))] == [b"b", b"d", b"a", b"c", b"e"]
+
+
+async def test_urgent_message_is_delivered_before_a_queued_backlog():
+    transport = InMemoryTransport(InMemoryBroker())
+    for _ in range(BACKLOG):
+        await transport.publish("doc.direct", "page.ocr", _message(LOW))
+    urgent = _message(URGENT)
+    await transport.publish("doc.direct", "page.ocr", urgent)
+
+    delivered: list[str] = []
+    done = asyncio.Event()
+
+    async def consume(delivery):
+        delivered.append(delivery.headers["request_id"])
+        await delivery.ack()
+        if len(delivered) == BACKLOG + 1:
+            done.set()
+
+    await transport.consume("q.ocr", consume, prefetch_count=1)
+    await asyncio.wait_for(done.wait(), timeout=5)
+    await transport.close()
+
+    assert delivered[0] == urgent.headers["request_id"]
+
+
+async def test_urgent_message_overtakes_a_backlog_being_consumed():
+    prefetch = 10
+    transport = InMemoryTransport(InMemoryBroker())
+
+    delivered: list[str] = []
+    done = asyncio.Event()
+
+    async def consume(delivery):
+        delivered.append(delivery.headers["request_id"])
+        await asyncio.sleep(0)
+        await delivery.ack()
+        if len(delivered) == BACKLOG + 1:
+            done.set()
+
+    await transport.consume("q.ocr", consume, prefetch_count=prefetch)
+    for _ in range(BACKLOG):
+        await transport.publish("doc.direct", "page.ocr", _message(LOW))
+    while len(delivered) < BACKLOG // 10:
+        await asyncio.sleep(0)  # Let the consumer start on the backlog
+    delivered_before = len(delivered)
+    urgent = _message(URGENT)
+    await transport.publish("doc.direct", "page.ocr", urgent)
+    await asyncio.wait_for(done.wait(), timeout=5)
+    await transport.close()
+
+    # Only deliveries already in flight (at most one prefetch window) can come before it
+    assert delivered_before + prefetch < BACKLOG
+    assert delivered.index(urgent.headers["request_id"]) <= delivered_before + prefetch
+
+
+async def test_topology_keeps_a_queue_declared_without_priorities():
+    exchange = MagicMock()
+    queue = AsyncMock()
+    channel = AsyncMock()
+    channel.declare_exchange.return_value = exchange
+
+    async def declare_queue(name, durable=False, arguments=None, passive=False):
+        if name == "q.ocr" and not passive:
+            raise aiormq.exceptions.ChannelPreconditionFailed("inequivalent arg 'x-max-priority'")
+        return queue
+
+    channel.declare_queue.side_effect = declare_queue
+
+    await setup_rabbitmq_topology(channel)
+
+    channel.reopen.assert_awaited_once()
+    channel.declare_queue.assert_any_await("q.ocr", passive=True)
+    queue.bind.assert_any_await(exchange, routing_key="page.ocr")
@@ -0,0 +1,79 @@
+"""Critical-path analysis of request timelines, including skewed pod clocks."""
+
+import threading
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from src.core.models import StageTiming
+from src.core.timeline import build_timeline
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+REQUEST_ID = uuid.uuid4()
+
+
+def _timing(stage: str, enqueued: float | None, dequeued: float, completed: float, page_index=None) -> StageTiming:
+    return StageTiming(
+        request_id=REQUEST_ID,
+        stage=stage,
+        component=stage,
+        page_index=page_index,
+        enqueued_at=T0 + timedelta(seconds=enqueued) if enqueued is not None else None,
+        dequeued_at=T0 + timedelta(seconds=dequeued),
+        completed_at=T0 + timedelta(seconds=completed),
+    )
+
+
+def _build(timings: list[StageTiming]):
+    """build_timeline in a thread, so a walk that never ends fails the test instead of hanging it."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(timeline=build_timeline(REQUEST_ID, T0, None, timings)))
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "critical-path walk did not terminate"
+    return result["timeline"]
+
+
+def test_critical_path_follows_the_last_part_of_a_fan_in():
+    timeline = _build(
+        [
+            _timing("split", None, 0.0, 1.0),
+            _timing("ocr", 1.1, 1.2, 2.0, page_index=0),
+            _timing("ocr", 1.1, 1.5, 4.0, page_index=1),
+            _timing("aggregate", 4.2, 4.5, 5.0),
+        ]
+    )
+
+    assert [(hop.stage, hop.page_index) for hop in timeline.critical_path] == [
+        ("split", None),
+        ("ocr", 1),
+        ("aggregate", None),
+    ]
+    assert timeline.critical_path[-1].handoff_s == 0.2
+    assert timeline.bottleneck_stage == "ocr"
+
+
+def test_critical_path_ends_when_a_hop_is_published_after_it_completed():
+    # Publisher clock 0.5 s ahead of the consumer's: enqueued_at is later than completed_at
+    timeline = _build(
+        [
+            _timing("split", None, 0.0, 1.0),
+            _timing("ocr", 2.5, 1.5, 2.0),
+        ]
+    )
+
+    assert [hop.stage for hop in timeline.critical_path] == ["split", "ocr"]
+    assert timeline.critical_path[1].handoff_s == 1.0  # Publish time clamped to completion
+
+
+def test_critical_path_ends_with_zero_length_hops():
+    timeline = _build(
+        [
+            _timing("split", None, 0.0, 0.5),
+            _timing("ocr", 1.0, 1.0, 1.0),
+            _timing("classify", 1.0, 1.0, 1.0),
+        ]
+    )
+
+    # Hops that completed at the same instant cannot precede each other
+    assert [hop.stage for hop in timeline.critical_path] == ["split", "classify"]
@@ -0,0 +1,47 @@
+"""Workflow version pinning across replicas: every loaded version is stored next to the other shared data."""
+
+from pathlib import Path
+
+import yaml
+
+from src.core.workflow_loader import WorkflowLoader
+
+DEFAULT_WORKFLOW = Path(__file__).parent.parent / "config" / "workflows" / "default.yaml"
+
+
+def _write_workflow(config_dir: Path, version: int, drop_stage: str | None = None) -> None:
+    data = yaml.safe_load(DEFAULT_WORKFLOW.read_text())
+    data["version"] = version
+    data["stages"] = [stage for stage in data["stages"] if stage["name"] != drop_stage]
+    (config_dir / "default.yaml").write_text(yaml.safe_dump(data))
+
+
+def _stage_names(loader: WorkflowLoader, version: int | None = None) -> list[str]:
+    return [stage.name for stage in loader.load("default", version).stages]
+
+
+def test_replica_started_after_an_edit_routes_pinned_messages_with_their_version(tmp_path):
+    config_dir = tmp_path / "workflows"
+    config_dir.mkdir()
+    storage = str(tmp_path / "storage")
+    _write_workflow(config_dir, version=1)
+    old_stages = _stage_names(WorkflowLoader(str(config_dir), storage_path=storage))
+
+    # The workflow changes, then a new replica starts: it has only ever read version 2
+    _write_workflow(config_dir, version=2, drop_stage="classify")
+    replica = WorkflowLoader(str(config_dir), storage_path=storage)
+
+    assert replica.compiled("default").version == 2
+    assert "classify" not in _stage_names(replica)
+    assert replica.compiled("default", 1).version == 1
+    assert _stage_names(replica, 1) == old_stages
+
+
+def test_unknown_version_falls_back_to_the_current_one(tmp_path):
+    config_dir = tmp_path / "workflows"
+    config_dir.mkdir()
+    _write_workflow(config_dir, version=3)
+    loader = WorkflowLoader(str(config_dir), storage_path=str(tmp_path / "storage"))
+
+    assert loader.compiled("default", 1).version == 3
+    assert WorkflowLoader(str(config_dir)).compiled("default", 1).version == 3